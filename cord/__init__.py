@@ -1,6 +1,12 @@
 from .model import Model
 from .reservoir import Reservoir
-from .inputter import Inputter
+from .reservoirbank import ReservoirBank
+from .hydrologyrecord import HydrologyRecord
+from .inputter import Inputter, read_realization
 from .delta import Delta
 from .util import *
+from .results import *
+from .regulations import *
+from .preprocess import projection_file_name, preprocess_projections
+from .pipeline import PipelineMetrics, simulate_projection, find_release_results, write_release_results, run_projection_pipeline
 from .plotter import *
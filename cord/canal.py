@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 import json
 from .util import *
+from .results import recorded_series, series_summary_as_df
 
 class Canal():
 
@@ -113,11 +114,14 @@ class Canal():
     self.daily_turnout[name][t] = self.turnout_use[counter]
     self.daily_flow[name][t] = self.flow[counter]
 	
-  def accounting_as_df(self, index):
+  def accounting_as_df(self, index, resolution = 'daily'):
     df = pd.DataFrame()
-    for n in self.daily_flow:    
-      df['%s_%s' % (self.key,n)] = pd.Series(self.daily_flow[n], index = index)
+    for n, values, series_index in recorded_series(self.daily_flow, index, resolution):
+      df['%s_%s' % (self.key,n)] = pd.Series(values, index = series_index)
     return df
+
+  def summary_as_df(self, recording_spec, resolution):
+    return series_summary_as_df(self.key + '_%s', self.daily_flow, recording_spec, resolution)
 	
 
       
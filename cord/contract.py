@@ -3,10 +3,11 @@ import numpy as np
 import pandas as pd
 import json
 from .util import *
+from .results import RecordingSpec, recorded_series, is_recorded, series_summary_as_df
 
 class Contract():
 
-  def __init__(self, df, key):
+  def __init__(self, df, key, recording_spec = None):
     self.T = len(df)
     self.number_years = df.index.year[-1]-df.index.year[0]
     self.key = key
@@ -35,9 +36,12 @@ class Contract():
     self.daily_supplies = {}
     self.annual_supplies = {}
     supply_types = ['contract', 'carryover', 'turnback', 'flood']
+    #recording spec sets which output timeseries are stored (and at what resolution)
+    if recording_spec is None:
+      recording_spec = RecordingSpec()
     for x in supply_types:
-      self.daily_supplies[x] = np.zeros(self.T)
-      self.annual_supplies[x] = np.zeros(self.number_years)
+      self.daily_supplies[x] = recording_spec.daily_series(self.key, x, self.T)
+      self.annual_supplies[x] = recording_spec.annual_series(self.key, 'annual_' + x, self.number_years)
 
 
   def calc_allocation(self, t, dowy, forecast_available, priority_contract, secondary_contract, wyt):
@@ -123,18 +127,22 @@ class Contract():
       self.annual_supplies['turnback'][wateryear] += max(min(turnback, deliveries - carryover), 0.0)
       self.annual_supplies['flood'][wateryear] += flood
 	  
-  def accounting_as_df(self, index):
+  def accounting_as_df(self, index, resolution = 'daily'):
     df = pd.DataFrame()
-    for n in self.daily_supplies:    
-      df['%s_%s' % (self.key,n)] = pd.Series(self.daily_supplies[n], index = index)
+    for n, values, series_index in recorded_series(self.daily_supplies, index, resolution):
+      df['%s_%s' % (self.key,n)] = pd.Series(values, index = series_index)
     return df
 	
   def annual_results_as_df(self):
     df = pd.DataFrame()
     for n in self.annual_supplies:
-      df['%s_%s' % (self.key,n)] = pd.Series(self.annual_supplies[n])
+      if is_recorded(self.annual_supplies[n]):
+        df['%s_%s' % (self.key,n)] = pd.Series(self.annual_supplies[n])
     return df
 
+  def summary_as_df(self, recording_spec, resolution):
+    return series_summary_as_df(self.key + '_%s', self.daily_supplies, recording_spec, resolution)
+
 
 
 
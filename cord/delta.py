@@ -11,19 +11,19 @@ class Delta():
   def __init__(self, df, df_short, key, model_mode):
     self.model_mode = model_mode
     self.T = len(df)
-    self.day_year = df.index.dayofyear
-    self.day_month = df.index.day
-    self.month = df.index.month
-    self.year = df.index.year
+    self.day_year = np.asarray(df.index.dayofyear)
+    self.day_month = np.asarray(df.index.day)
+    self.month = np.asarray(df.index.month)
+    self.year = np.asarray(df.index.year)
     self.starting_year = self.year[0]
     self.ending_year = self.year[-1]
     self.number_years = self.ending_year - self.starting_year
     self.dowy = water_day(self.day_year, self.year)
     self.water_year = water_year(self.month, self.year, self.starting_year)
     self.T_short = len(df_short)
-    self.short_day_year = df_short.index.dayofyear
-    self.short_month = df_short.index.month
-    self.short_year = df_short.index.year
+    self.short_day_year = np.asarray(df_short.index.dayofyear)
+    self.short_month = np.asarray(df_short.index.month)
+    self.short_year = np.asarray(df_short.index.year)
     self.short_starting_year = self.short_year[0]
     self.short_ending_year = self.short_year[-1]
     self.short_dowy = water_day(self.short_day_year, self.short_year)
@@ -43,16 +43,17 @@ class Delta():
 
     for k,v in json.load(open('cord/delta/Delta_properties.json')).items():
       setattr(self,k,v)
+    self.create_rule_tables()
     # Vectors for delta Inflows
     self.gains = np.zeros(self.T)
-    self.gains_sac = df.SAC_gains * cfs_tafd
-    self.gains_sj = df.SJ_gains * cfs_tafd
-    self.depletions = df.delta_depletions * cfs_tafd
+    self.gains_sac = df.SAC_gains.values * cfs_tafd
+    self.gains_sj = df.SJ_gains.values * cfs_tafd
+    self.depletions = df.delta_depletions.values * cfs_tafd
     self.vernalis_flow = np.zeros(self.T)
-    self.eastside_streams = df.EAST_gains * cfs_tafd
+    self.eastside_streams = df.EAST_gains.values * cfs_tafd
     self.inflow = np.zeros(self.T)
-    self.ccc = df.CCC_pump * cfs_tafd
-    self.barkerslough = df.BRK_pump *cfs_tafd
+    self.ccc = df.CCC_pump.values * cfs_tafd
+    self.barkerslough = df.BRK_pump.values *cfs_tafd
 
 
 
@@ -80,9 +81,9 @@ class Delta():
     self.sac_fnf = np.zeros(self.number_years)
 	##Old/Middle River Calculations
     if self.model_mode == 'validation':
-      self.hist_OMR = df.OMR * cfs_tafd
-      self.hist_TRP_pump = df.TRP_pump * cfs_tafd
-      self.hist_HRO_pump = df.HRO_pump * cfs_tafd
+      self.hist_OMR = df.OMR.values * cfs_tafd
+      self.hist_TRP_pump = df.TRP_pump.values * cfs_tafd
+      self.hist_HRO_pump = df.HRO_pump.values * cfs_tafd
       self.omr_record_start = 4440
       self.omr_rule_start = 4080
       self.vamp_rule_start = 2009
@@ -110,6 +111,36 @@ class Delta():
     self.final_allocation_cvp = 0.0
 
 
+  def create_rule_tables(self):
+  ##Evaluates the pumping & outflow rules from Delta_properties.json once, so the daily rule checks are array reads
+  ##pumping limits are interpolated for each day of the year (d), san joaquin i/e rules for each day of the water year (dowy),
+  ##and the D1641 on/off switch, monthly outflow requirements & export ratios for each timestep (t)
+  ##needs to be re-run whenever min_outflow or export_ratio are changed (i.e. regulation updates in the model class)
+    day_index = np.arange(367)
+    dowy_index = np.arange(366)
+    month_index = np.asarray(self.month) - 1
+    self.pump_max_daily = {}
+    for key in ['swp', 'cvp']:
+      self.pump_max_daily[key] = {}
+      self.pump_max_daily[key]['intake_limit'] = np.interp(day_index, self.pump_max[key]['d'], self.pump_max[key]['intake_limit']) * cfs_tafd
+      self.pump_max_daily[key]['vernalis_trigger'] = np.interp(day_index, self.pump_max[key]['d'], self.pump_max[key]['vernalis_trigger'])
+      self.pump_max_daily[key]['pmax'] = np.interp(day_index, self.pump_max[key]['d'], self.pump_max[key]['pmax']) * cfs_tafd
+    self.total_intake_daily = (np.interp(day_index, self.pump_max['swp']['d'], self.pump_max['swp']['intake_limit']) + np.interp(day_index, self.pump_max['cvp']['d'], self.pump_max['cvp']['intake_limit']))*cfs_tafd
+
+    self.san_joaquin_add_daily = np.interp(dowy_index, self.san_joaquin_add['d'], self.san_joaquin_add['mult'])
+    self.d_1641_export_daily = np.interp(dowy_index, self.d_1641_export['d'], self.d_1641_export['on_off'])
+    self.san_joaquin_export_ratio_daily = np.interp(dowy_index, self.san_joaquin_export_ratio['d'], self.san_joaquin_export_ratio['on_off'])
+    self.d_1641_on_off = np.interp(np.arange(self.T), self.d_1641_export['D1641_dates'], self.d_1641_export['D1641_on_off'])
+
+    self.min_outflow_daily = {}
+    self.export_ratio_daily = {}
+    self.tax_free_ratio_daily = {}
+    for wyt in self.min_outflow:
+      self.min_outflow_daily[wyt] = np.array(self.min_outflow[wyt], dtype = float)[month_index] * cfs_tafd
+    for wyt in self.export_ratio:
+      self.export_ratio_daily[wyt] = np.array(self.export_ratio[wyt], dtype = float)[month_index]
+      self.tax_free_ratio_daily[wyt] = (1/(1-self.export_ratio_daily[wyt])) - 1
+
   def calc_expected_delta_outflow(self,shastaD,orovilleD,yubaD,folsomD,shastaMIN,orovilleMIN,yubaMIN,folsomMIN, gains_sac_short, gains_sj_short, depletions_short, eastside_short):
   #this function calculates an expectation for the volume of environmental releases expected to be made from each reservoir,
   #given the water year type
@@ -329,7 +360,7 @@ class Delta():
 	#and splits them between CVP and SWP based on the 75/25 rule (given previous releases)
 	
     #delta outflow minimum either salinity rule or delta outflow volume
-    outflow_rule = self.min_outflow[wyt][m-1] * cfs_tafd
+    outflow_rule = self.min_outflow_daily[wyt][t]
 
     if dowy > 180 and dowy < self.x2_dict['date'][wyt]:
       self.x2constraint[wyt][dowy] = self.x2[t-1] + (77.0 - self.x2[t-1])*(dowy-180.0)/(self.x2_dict['date'][wyt] - 180.0)
@@ -485,7 +516,7 @@ class Delta():
         pumping_forgone = supply_max
       else:
         #if we don't, then the forgone pumping is what we'd release under the 'tax free rules' or the pumping constraint, whichever is smaller
-        free_pumping = ((1/(1-self.export_ratio[wyt][m-1])) - 1)*(self.min_outflow[wyt][m-1] * cfs_tafd - self.depletions[t])*fraction
+        free_pumping = self.tax_free_ratio_daily[wyt][t]*(self.min_outflow_daily[wyt][t] - self.depletions[t])*fraction
         pumping_forgone = min(capacity_max, free_pumping)
       new_constraint = 0.0
     else:
@@ -526,7 +557,7 @@ class Delta():
     wyt = self.forecastSCWYT
     dowy = self.dowy[t]
     year = self.year[t] - self.starting_year
-    outflow_rule = self.min_outflow[wyt][m-1] * cfs_tafd
+    outflow_rule = self.min_outflow_daily[wyt][t]
     cvp_frac = 0.55
     swp_frac = 0.45
 	##Same salinity rule as in calc_flow_bounds
@@ -543,8 +574,8 @@ class Delta():
     available_unstored = unstored_flows + self.depletions[t] - min_rule
 	
     #total volume that can be exported w/o additional inflows, based on delta required outflows & the E/I ratio (i.e., if enough inflow is coming into the delta to meet the minimum outflow requirements, how much (additional) inflows can we export before we hit the I/E ratio)
-    tax_free_exports = ((1/(1-self.export_ratio[wyt][m-1])) - 1)*(min_rule - self.depletions[t])
-    tax_free_exports = min(tax_free_exports, (np.interp(d, self.pump_max['swp']['d'], self.pump_max['swp']['intake_limit']) + np.interp(d, self.pump_max['cvp']['d'], self.pump_max['cvp']['intake_limit']))*cfs_tafd)
+    tax_free_exports = self.tax_free_ratio_daily[wyt][t]*(min_rule - self.depletions[t])
+    tax_free_exports = min(tax_free_exports, self.total_intake_daily[d])
 	
     #total expected remaining 'tax free' flows for the rest of the year, based on meeting min outflow requirements
     tax_free_available = self.max_tax_free[wyt]['cvp'][dowy] + self.max_tax_free[wyt]['swp'][dowy]#from this date until the end of the year
@@ -577,8 +608,8 @@ class Delta():
     cvp_tax_free_pumping, swp_tax_free_pumping = self.meet_OMR_requirement(cvp_tax_free_pumping, swp_tax_free_pumping, t)
 
 	##how many releases are needed for the 'untaxed exports' (i.e. water balance) - given delta gains
-    cvp_flood_constraint =  min(cvp_flood, max(cvp_max_alt - cvp_frac*available_unstored, cvp_max_alt/self.export_ratio[wyt][m-1] - cvp_frac*unstored_flows))
-    swp_flood_constraint = min(swp_flood, max(swp_max_alt - swp_frac*available_unstored, swp_max_alt/self.export_ratio[wyt][m-1] - swp_frac*unstored_flows))
+    cvp_flood_constraint =  min(cvp_flood, max(cvp_max_alt - cvp_frac*available_unstored, cvp_max_alt/self.export_ratio_daily[wyt][t] - cvp_frac*unstored_flows))
+    swp_flood_constraint = min(swp_flood, max(swp_max_alt - swp_frac*available_unstored, swp_max_alt/self.export_ratio_daily[wyt][t] - swp_frac*unstored_flows))
     cvp_releases = max(max(cvp_tax_free_pumping, cvp_max) - cvp_frac*available_unstored, cvp_flood_constraint)
     swp_releases = max(max(swp_tax_free_pumping, swp_max) - swp_frac*available_unstored, swp_flood_constraint)
    
@@ -593,8 +624,8 @@ class Delta():
 
 	##how much (if any) do we need to release to meet the I/E tax? (i.e. environmental requirements)
 	##unstored_flows is always positive, so we split them 55/45 to make the 'tax' on each project pumping
-    cvp_tax = max(cvp_tax_free_pumping, cvp_max)/self.export_ratio[wyt][m-1] - cvp_frac*unstored_flows
-    swp_tax = max(swp_tax_free_pumping, swp_max)/self.export_ratio[wyt][m-1] - swp_frac*unstored_flows
+    cvp_tax = max(cvp_tax_free_pumping, cvp_max)/self.export_ratio_daily[wyt][t] - cvp_frac*unstored_flows
+    swp_tax = max(swp_tax_free_pumping, swp_max)/self.export_ratio_daily[wyt][t] - swp_frac*unstored_flows
 
 
     ##unused flows from one project can be used to meet requirements for other project
@@ -613,29 +644,29 @@ class Delta():
   def find_max_pumping(self, d, dowy, t, wyt):
     ##Find max pumping uses the delta pumping rules (from delta_properties) to find the maximum the pumps can
 	##be run on a given day, from the D1641 and the BIOPS rules
-    swp_intake_max = np.interp(d, self.pump_max['swp']['d'], self.pump_max['swp']['intake_limit']) * cfs_tafd
-    swp_intake_max = max(swp_intake_max, np.interp(d, self.pump_max['swp']['d'], self.pump_max['swp']['vernalis_trigger'])*self.vernalis_gains/2.0, 0.0)
-    cvp_intake_max = np.interp(d, self.pump_max['cvp']['d'],self.pump_max['cvp']['intake_limit']) * cfs_tafd
-    cvp_intake_max = max(cvp_intake_max, np.interp(d, self.pump_max['cvp']['d'], self.pump_max['cvp']['vernalis_trigger'])*self.vernalis_gains/2.0, 0.0)
+    swp_intake_max = self.pump_max_daily['swp']['intake_limit'][d]
+    swp_intake_max = max(swp_intake_max, self.pump_max_daily['swp']['vernalis_trigger'][d]*self.vernalis_gains/2.0, 0.0)
+    cvp_intake_max = self.pump_max_daily['cvp']['intake_limit'][d]
+    cvp_intake_max = max(cvp_intake_max, self.pump_max_daily['cvp']['vernalis_trigger'][d]*self.vernalis_gains/2.0, 0.0)
 
-    san_joaquin_adj = np.interp(dowy, self.san_joaquin_add['d'], self.san_joaquin_add['mult']) * max(self.vernalis_gains, 0.0)
-    if np.interp(t,self.d_1641_export['D1641_dates'],self.d_1641_export['D1641_on_off']) == 1:
+    san_joaquin_adj = self.san_joaquin_add_daily[dowy] * max(self.vernalis_gains, 0.0)
+    if self.d_1641_on_off[t] == 1:
       san_joaquin_ie_amt = np.interp(self.vernalis_gains*tafd_cfs, self.d_1641_export['flow_target'],self.d_1641_export['export_limit']) * cfs_tafd
-      san_joaquin_ie_used = np.interp(dowy, self.d_1641_export['d'], self.d_1641_export['on_off'])
+      san_joaquin_ie_used = self.d_1641_export_daily[dowy]
     else:
       if self.vernalis_gains < 6000.0*cfs_tafd:
         san_joaquin_ie_amt = 1500.0*cfs_tafd
       else:
         san_joaquin_ie_amt = np.interp(self.vernalis_gains*tafd_cfs, self.san_joaquin_export_ratio['flow'], self.san_joaquin_export_ratio['ratio']) * self.vernalis_gains
-      san_joaquin_ie_used = np.interp(dowy, self.san_joaquin_export_ratio['d'], self.san_joaquin_export_ratio['on_off'])
+      san_joaquin_ie_used = self.san_joaquin_export_ratio_daily[dowy]
 	  
     san_joaquin_ie = san_joaquin_ie_amt * san_joaquin_ie_used
     if san_joaquin_ie_used > 0.0:
-      swp_max = min(san_joaquin_ie * 0.5, np.interp(d, self.pump_max['swp']['d'], self.pump_max['swp']['pmax']) * cfs_tafd)
-      cvp_max = min(san_joaquin_ie * 0.5, np.interp(d, self.pump_max['cvp']['d'], self.pump_max['cvp']['pmax']) * cfs_tafd)
+      swp_max = min(san_joaquin_ie * 0.5, self.pump_max_daily['swp']['pmax'][d])
+      cvp_max = min(san_joaquin_ie * 0.5, self.pump_max_daily['cvp']['pmax'][d])
     else:
-      swp_max = min(swp_intake_max + san_joaquin_adj, np.interp(d, self.pump_max['swp']['d'], self.pump_max['swp']['pmax']) * cfs_tafd)
-      cvp_max = min(cvp_intake_max, np.interp(d, self.pump_max['cvp']['d'], self.pump_max['cvp']['pmax']) * cfs_tafd)
+      swp_max = min(swp_intake_max + san_joaquin_adj, self.pump_max_daily['swp']['pmax'][d])
+      cvp_max = min(cvp_intake_max, self.pump_max_daily['cvp']['pmax'][d])
 	
     return cvp_max, swp_max
    	  
@@ -823,7 +854,7 @@ class Delta():
     swp_frac = 0.45
 
 	##Same outflow rule as in calc_flow_bounds
-    outflow_rule = self.min_outflow[wyt][m-1] * cfs_tafd
+    outflow_rule = self.min_outflow_daily[wyt][t]
 	##Same salinity rule as in calc_flow_bounds
     if self.x2[t] > self.x2constraint[wyt][dowy]:
       x2outflow = 10**((self.x2constraint[wyt][dowy] - 10.16 - 0.945*self.x2[t])/(-1.487))
@@ -836,12 +867,12 @@ class Delta():
     surplus = unstored_flows + self.depletions[t] - min_rule	
     self.surplus[t] = surplus
 	#Same export ratio as in calc_weekly_storage_release
-    export_ratio = self.export_ratio[wyt][m-1]
+    export_ratio = self.export_ratio_daily[wyt][t]
 	#Same max pumping rules as in calc_weekly_storage release
     cvp_max, swp_max = self.find_max_pumping(d, dowy, t, wyt)
       
-    tax_free_exports = ((1/(1-self.export_ratio[wyt][m-1])) - 1)*(min_rule - self.depletions[t])
-    tax_free_exports = min(tax_free_exports, (np.interp(d, self.pump_max['swp']['d'], self.pump_max['swp']['intake_limit']) + np.interp(d, self.pump_max['cvp']['d'], self.pump_max['cvp']['intake_limit']))*cfs_tafd)
+    tax_free_exports = self.tax_free_ratio_daily[wyt][t]*(min_rule - self.depletions[t])
+    tax_free_exports = min(tax_free_exports, self.total_intake_daily[d])
 
     cvp_surplus_inflow = cvp_flows + cvp_frac * surplus
     swp_surplus_inflow = swp_flows + swp_frac * surplus
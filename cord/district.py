@@ -6,11 +6,16 @@ import pandas as pd
 from .crop import Crop
 import json
 from .util import *
+from .results import RecordingSpec, recorded_series, is_recorded, series_summary_as_df
 
 
 class District():
+  #recording spec variable names of each participant's leiubank account - the output columns are key_name
+  #(daily and annual tables), and the annual series is recorded as 'annual_' + name
+  bank_name = '%s_leiu'
+  annual_bank_name = '%s_leiu'
 
-  def __init__(self, df, key):
+  def __init__(self, df, key, recording_spec = None):
     self.T = len(df)
     self.starting_year = df.index.year[0]
     self.number_years = df.index.year[-1]-df.index.year[0]
@@ -23,6 +28,9 @@ class District():
 
     for k,v in json.load(open('cord/districts/%s_properties.json' % key)).items():
         setattr(self,k,v)
+    #recording spec sets which output timeseries are stored (and at what resolution)
+    if recording_spec is None:
+      recording_spec = RecordingSpec()
 
     #intialize crop acreages and et demands for crops
     self.irrdemand = Crop(self.zone)
@@ -76,26 +84,22 @@ class District():
     self.daily_supplies = {}
     supply_list = ['paper', 'carryover', 'allocation', 'delivery', 'leiu_accepted', 'banked', 'pumping', 'leiu_delivered', 'recharge_delivery', 'recharge_uncontrolled']
     for x in supply_list:
-      self.daily_supplies[x] = np.zeros(self.T)
+      self.daily_supplies[x] = recording_spec.daily_series(self.key, x, self.T)
 
     #initialize dictionaries to 'store' annual change in state variables (for export to csv)
     self.annual_supplies = {}
     supply_list = ['delivery', 'leiu_accepted', 'leiu_delivered', 'banked_accepted']
     for x in supply_list:
-      self.annual_supplies[x] = np.zeros(self.number_years)
+      self.annual_supplies[x] = recording_spec.annual_series(self.key, 'annual_' + x, self.number_years)
 
     # hold all output
     self.daily_supplies_full = {}
     # delivery_list = ['tableA', 'cvpdelta', 'exchange', 'cvc', 'friant1', 'friant2','kaweah', 'tule', 'kern']
     for x in self.contract_list_all:
-      self.daily_supplies_full[x + '_delivery'] = np.zeros(self.T)
-      self.daily_supplies_full[x + '_flood'] = np.zeros(self.T)
-      self.daily_supplies_full[x + '_projected'] = np.zeros(self.T)
-      self.daily_supplies_full[x + '_paper'] = np.zeros(self.T)
-      self.daily_supplies_full[x + '_carryover'] = np.zeros(self.T)
-      self.daily_supplies_full[x + '_turnback'] = np.zeros(self.T)
+      for y in ['_delivery', '_flood', '_projected', '_paper', '_carryover', '_turnback']:
+        self.daily_supplies_full[x + y] = recording_spec.daily_series(self.key, x + y, self.T)
     for x in self.non_contract_delivery_list:
-      self.daily_supplies_full[x] = np.zeros(self.T)
+      self.daily_supplies_full[x] = recording_spec.daily_series(self.key, x, self.T)
 
     # ['recover_banked', 'inleiu', 'leiupumping', 'recharged', 'exchanged_GW', 'exchanged_SW', 'undelivered_trades']
     #Initialize demands
@@ -128,7 +132,7 @@ class District():
       self.direct_storage = {}
       self.bank_timeseries = {}
       self.annual_timeseries = {}
-      self.recharge_rate_series = np.zeros(self.T)
+      self.recharge_rate_series = recording_spec.daily_series(self.key, 'rate', self.T)
       self.use_recovery = 0.0
       self.leiu_trade_cap = 0.5
       for x in self.participant_list:
@@ -137,8 +141,8 @@ class District():
         self.leiu_additional_supplies[x] = 0.0
         self.bank_deliveries[x] = 0.0
         self.direct_storage[x] = 0.0
-        self.bank_timeseries[x] = np.zeros(self.T)
-        self.annual_timeseries[x] = np.zeros(self.T)
+        self.bank_timeseries[x] = recording_spec.daily_series(self.key, self.bank_name % x, self.T)
+        self.annual_timeseries[x] = recording_spec.annual_series(self.key, 'annual_' + self.annual_bank_name % x, self.T)
 
 
 #####################################################################################################################
@@ -884,41 +888,56 @@ class District():
         self.annual_timeseries[x][wateryear] = self.inleiubanked[x] - sum_total
 
 	  
-  def accounting_as_df(self, index):
-    #wirte district accounts and deliveries into a data fram
+  def accounting_as_df(self, index, resolution = 'daily'):
+    #wirte district accounts and deliveries into a data fram (only the series recorded at this resolution)
     df = pd.DataFrame()
-    for n in self.daily_supplies:    
-      df['%s_%s' % (self.key,n)] = pd.Series(self.daily_supplies[n], index = index)
+    for n, values, series_index in recorded_series(self.daily_supplies, index, resolution):
+      df['%s_%s' % (self.key,n)] = pd.Series(values, index = series_index)
     return df
 
-  def accounting_as_df_full(self, index):
+  def accounting_as_df_full(self, index, resolution = 'daily'):
     #wirte district accounts and deliveries into a data fram
     df = pd.DataFrame()
-    for n in self.daily_supplies_full:
-      df['%s_%s' % (self.key,n)] = pd.Series(self.daily_supplies_full[n], index = index)
+    for n, values, series_index in recorded_series(self.daily_supplies_full, index, resolution):
+      df['%s_%s' % (self.key,n)] = pd.Series(values, index = series_index)
     return df
 
   def annual_results_as_df(self):
     #wite annual district deliveries into a data frame
     df = pd.DataFrame()
     for n in self.annual_supplies:
-      df['%s_%s' % (self.key,n)] = pd.Series(self.annual_supplies[n])
+      if is_recorded(self.annual_supplies[n]):
+        df['%s_%s' % (self.key,n)] = pd.Series(self.annual_supplies[n])
     return df
 
-  def bank_as_df(self, index):
+  def bank_as_df(self, index, resolution = 'daily'):
     #write leiubanking accounts (plus bank recharge rates) into a dataframe
     df = pd.DataFrame()
-    for n in self.participant_list:
-      df['%s_%s_leiu' % (self.key,n)] = pd.Series(self.bank_timeseries[n], index = index)
-    df['%s_rate' % self.key] = pd.Series(self.recharge_rate_series, index = index)
+    for n, values, series_index in recorded_series(self.bank_timeseries, index, resolution):
+      df[self.key + '_' + self.bank_name % n] = pd.Series(values, index = series_index)
+    for n, values, series_index in recorded_series({'rate': self.recharge_rate_series}, index, resolution):
+      df['%s_rate' % self.key] = pd.Series(values, index = series_index)
     return df
 	
   def annual_bank_as_df(self):
     #write anmual banking changes into a data frame
     df = pd.DataFrame()
     for n in self.participant_list:
-      df['%s_%s_leiu' % (self.key,n)] = pd.Series(self.annual_timeseries[n])
+      if is_recorded(self.annual_timeseries[n]):
+        df[self.key + '_' + self.annual_bank_name % n] = pd.Series(self.annual_timeseries[n])
     return df
+
+  def summary_as_df(self, recording_spec, resolution):
+    #monthly or water-year sum/min/max/end-of-period of district accounts and deliveries (all-zero 'full' series are left out)
+    df = series_summary_as_df(self.key + '_%s', self.daily_supplies, recording_spec, resolution)
+    df2 = series_summary_as_df(self.key + '_%s', self.daily_supplies_full, recording_spec, resolution, skip_zero = True)
+    return pd.concat([df, df2], axis = 1)
+
+  def bank_summary_as_df(self, recording_spec, resolution):
+    #monthly or water-year sum/min/max/end-of-period of leiubanking accounts
+    df = series_summary_as_df(self.key + '_' + self.bank_name, self.bank_timeseries, recording_spec, resolution)
+    df2 = series_summary_as_df(self.key + '_%s', {'rate': self.recharge_rate_series}, recording_spec, resolution)
+    return pd.concat([df, df2], axis = 1)
 	
   def get_iterable(self, x):
     if isinstance(x, cl.Iterable):
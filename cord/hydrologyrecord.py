@@ -0,0 +1,61 @@
+from __future__ import division
+import numpy as np
+from .util import *
+
+
+class HydrologyRecord():
+
+  #flow-only record of a reservoir's historical inputs (full-natural flow, inflow, gains, evap, precip, fci & snowpack), for Inputter
+  #columns are views of the input dataframe (no Reservoir parameters or state arrays) - unit conversions are made when they are used
+  def __init__(self, df, key, dowy):
+    self.T = len(df)
+    self.key = key
+    self.dowy = dowy
+    self.fnf_raw = df['%s_fnf' % key].values
+    self.Q_raw = df['%s_inf' % key].values
+    self.downstream_raw = df['%s_gains' % key].values
+    self.E_raw = df['%s_evap' % key].values
+    self.precip_raw = df['%s_precip' % key].values
+    self.fci_raw = df['%s_fci' % key].values
+    self.SNPK = df['%s_snow' % key].values
+    self.shasta_fci = None
+
+  ##same units as Reservoir (tafd, fnf in maf)
+  @property
+  def fnf(self):
+    return self.fnf_raw / 1000000.0
+
+  @property
+  def Q(self):
+    return self.Q_raw * cfs_tafd
+
+  @property
+  def downstream(self):
+    return self.downstream_raw * cfs_tafd
+
+  @property
+  def E(self):
+    return self.E_raw * cfs_tafd
+
+  @property
+  def precip(self):
+    return self.precip_raw * cfs_tafd
+
+  @property
+  def fci(self):
+    ####Shasta fci is recalculated from inflow (input file values are in AF, not CFS), as in Reservoir
+    if self.key == "SHA":
+      if self.shasta_fci is None:
+        Q = self.Q
+        self.shasta_fci = np.zeros(self.T)
+        self.shasta_fci[0] = 100000
+        for x in range(1, self.T):
+          dowy = self.dowy[x]
+          if dowy > 260:
+            self.shasta_fci[x] = 0
+          elif dowy == 0:
+            self.shasta_fci[x] = 100000
+          else:
+            self.shasta_fci[x] = self.shasta_fci[x-1]*0.95 + Q[x]*tafd_cfs
+      return self.shasta_fci
+    return self.fci_raw
@@ -1,10 +1,12 @@
+import os
+import hashlib
 import numpy as np
 import pandas as pd
 import collections as cl
 import toyplot as tp
 import calendar
 import scipy.stats as stats
-from .reservoir import Reservoir
+from .hydrologyrecord import HydrologyRecord
 import math
 import datetime
 import matplotlib.pyplot as plt
@@ -14,11 +16,16 @@ from matplotlib.lines import Line2D
 from .util import *
 import seaborn as sns
 
+# version of the fitted state saved by Inputter.save_fitted_state - increase it when the fitted arrays (or how they
+# are fit) change, so fit files cached by an older version are made again instead of being loaded
+fit_format_version = 1
+
 class Inputter():
 
     def __init__(self, input_data_file, expected_release_datafile, model_mode):
+        self.input_data_file = input_data_file
         self.df = pd.read_csv(input_data_file, index_col=0, parse_dates=True)
-        self.df_short = pd.read_csv(expected_release_datafile, index_col=0, parse_dates=True)
+        # expected_release_datafile is not needed to fit/generate flows (kept so Inputter & Model take the same inputs)
         self.T = len(self.df)
         self.index = self.df.index
         self.day_year = self.index.dayofyear
@@ -38,27 +45,27 @@ class Inputter():
         self.non_leap_year = first_non_leap_year(self.dowy_eom)
         self.leap_year = first_leap_year(self.dowy_eom)
 
-        self.shasta = Reservoir(self.df, self.df_short, 'SHA', model_mode)
-        self.folsom = Reservoir(self.df, self.df_short, 'FOL', model_mode)
-        self.oroville = Reservoir(self.df, self.df_short, 'ORO', model_mode)
-        self.yuba = Reservoir(self.df, self.df_short, 'YRS', model_mode)
+        self.shasta = HydrologyRecord(self.df, 'SHA', self.dowy)
+        self.folsom = HydrologyRecord(self.df, 'FOL', self.dowy)
+        self.oroville = HydrologyRecord(self.df, 'ORO', self.dowy)
+        self.yuba = HydrologyRecord(self.df, 'YRS', self.dowy)
 
-        self.newhogan = Reservoir(self.df, self.df_short, 'NHG', model_mode)
-        self.pardee = Reservoir(self.df, self.df_short, 'PAR', model_mode)
-        self.consumnes = Reservoir(self.df, self.df_short, 'MHB', model_mode)
+        self.newhogan = HydrologyRecord(self.df, 'NHG', self.dowy)
+        self.pardee = HydrologyRecord(self.df, 'PAR', self.dowy)
+        self.consumnes = HydrologyRecord(self.df, 'MHB', self.dowy)
 
         # 3 San Joaquin River Reservoirs (to meet Vernalis flow targets)
-        self.newmelones = Reservoir(self.df, self.df_short, 'NML', model_mode)
-        self.donpedro = Reservoir(self.df, self.df_short, 'DNP', model_mode)
-        self.exchequer = Reservoir(self.df, self.df_short, 'EXC', model_mode)
+        self.newmelones = HydrologyRecord(self.df, 'NML', self.dowy)
+        self.donpedro = HydrologyRecord(self.df, 'DNP', self.dowy)
+        self.exchequer = HydrologyRecord(self.df, 'EXC', self.dowy)
 
         # Millerton Reservoir (flows used to calculate San Joaquin River index, not in northern simulation)
-        self.millerton = Reservoir(self.df, self.df_short, 'MIL', model_mode)
+        self.millerton = HydrologyRecord(self.df, 'MIL', self.dowy)
 
-        self.pineflat = Reservoir(self.df, self.df_short, 'PFT', model_mode)
-        self.kaweah = Reservoir(self.df, self.df_short, 'KWH', model_mode)
-        self.success = Reservoir(self.df, self.df_short, 'SUC', model_mode)
-        self.isabella = Reservoir(self.df, self.df_short, 'ISB', model_mode)
+        self.pineflat = HydrologyRecord(self.df, 'PFT', self.dowy)
+        self.kaweah = HydrologyRecord(self.df, 'KWH', self.dowy)
+        self.success = HydrologyRecord(self.df, 'SUC', self.dowy)
+        self.isabella = HydrologyRecord(self.df, 'ISB', self.dowy)
 
         self.reservoir_list = [self.shasta, self.oroville, self.folsom, self.yuba, self.newmelones, self.donpedro,
                                self.exchequer, self.millerton, self.pineflat, self.kaweah, self.success, self.isabella,
@@ -67,13 +74,17 @@ class Inputter():
         self.monthlist = ["Jan", "Feb", "Mar", "Apr", "May", "June", "July", "Aug", "Sept", "Oct", "Nov", "Dec"]
 
         self.delta_list = ['SAC', 'SJ', 'EAST', 'depletions', 'CCC', 'BRK']
+        # number of stochastic realizations in the monthly_new & daily output arrays (None - a single realization, w/o a realization axis)
+        self.number_realizations = None
 
         sns.set()
 
     def run_routine(self, file_folder, file_name, timestep_length, start_month, number_years, first_leap,
-                    start_timestep, end_timestep, start_year):
+                    start_timestep, end_timestep, start_year, write_csv=True, fnf_df=None):
+        # returns the daily input table, which can be passed straight to Model (write_csv also saves it as cord-data-*.csv)
+        # fnf_df is the projection file already read into a dataframe (if None, file_name is read here)
         print('Load New Full-Natural Flows from ' + file_name)
-        self.read_new_fnf_data(file_folder + file_name, timestep_length, start_month, first_leap, number_years)
+        self.read_new_fnf_data(file_folder + file_name, timestep_length, start_month, first_leap, number_years, fnf_df)
         self.whiten_by_historical_moments(number_years, 'XXX')
         self.whiten_by_historical_moments_delta(number_years, 'XXX')
         self.make_fnf_prediction(number_years, 'XXX')
@@ -83,7 +94,53 @@ class Inputter():
         self.add_error(number_years, 'XXX')
         self.add_error_delta(number_years, 'XXX')
         print('Print ORCA Inputs: ' + file_name)
-        self.make_daily_timeseries(number_years, '1/1/1950', '12/31/2099', 1950, first_leap, 'XXX', file_folder, file_name)
+        return self.make_daily_timeseries(number_years, '1/1/1950', '12/31/2099', 1950, first_leap, 'XXX', file_folder,
+                                          file_name, write_csv)
+
+    def run_realizations(self, file_folder, file_name, timestep_length, start_month, number_years, first_leap,
+                         start_timestep, end_timestep, start_year, number_realizations, seed, batch_size=4):
+        # same as run_routine, but makes number_realizations stochastic realizations of the projection in file_name
+        # each realization draws its residuals from its own np.random.Generator (spawned from seed), so results don't depend on batch_size
+        # all realizations are written to one file (cord-data-*.h5, one chunk per realization) - see read_realization
+        print('Load New Full-Natural Flows from ' + file_name)
+        self.read_new_fnf_data(file_folder + file_name, timestep_length, start_month, first_leap, number_years)
+        random_streams = [np.random.default_rng(x) for x in np.random.SeedSequence(seed).spawn(number_realizations)]
+        output_file = file_folder + 'cord-data-' + file_name.replace('.csv', '') + '.h5'
+        with pd.HDFStore(output_file, mode='w', complevel=9, complib='blosc:zstd') as realization_store:
+            for batch_start in range(0, number_realizations, batch_size):
+                batch_streams = random_streams[batch_start:(batch_start + batch_size)]
+                self.number_realizations = len(batch_streams)
+                # each batch starts from the whitened projection, w/o error
+                self.reset_whitened_projection(number_years)
+                self.whiten_by_historical_moments(number_years, 'XXX')
+                self.whiten_by_historical_moments_delta(number_years, 'XXX')
+                self.make_fnf_prediction(number_years, 'XXX')
+                self.make_fnf_prediction_delta(number_years, 'XXX')
+                self.find_residuals(start_month, number_years, 'XXX', batch_streams)
+                self.find_residuals_delta(start_month, number_years, 'XXX', batch_streams)
+                self.add_error(number_years, 'XXX')
+                self.add_error_delta(number_years, 'XXX')
+                print('Print ORCA Inputs: ' + file_name + ', realizations ' + str(batch_start) + ' - ' + str(
+                    batch_start + len(batch_streams) - 1))
+                dates_for_df, output_days = self.find_daily_output(number_years, '1/1/1950', '12/31/2099', 1950,
+                                                                   first_leap)
+                for realization in range(0, len(batch_streams)):
+                    df_for_output = self.make_output_df(dates_for_df, output_days, realization)
+                    df_for_output.index.name = 'datetime'
+                    df_for_output['realization'] = batch_start + realization
+                    realization_store.append('inputs', df_for_output, data_columns=['realization'], index=False)
+            realization_store.create_table_index('inputs', columns=['realization'])
+        self.number_realizations = None
+        return output_file
+
+    def reset_whitened_projection(self, numYears):
+        # add_error replaces the whitened projections w/ (realizations x 12 x years) arrays, these start over from zeros
+        for reservoir in self.reservoir_list:
+            for data_type in self.data_type_list:
+                reservoir.monthly_new[data_type]['whitened'] = np.zeros((12, numYears))
+        for deltaname in self.delta_list:
+            self.monthly_new[deltaname]['whitened_fnf'] = np.zeros((12, numYears))
+            self.monthly_new[deltaname]['whitened'] = np.zeros((12, numYears))
 
     def initialize_reservoirs(self):
         for x in self.reservoir_list:
@@ -149,286 +206,142 @@ class Inputter():
                     (self.number_years, self.days_in_month[self.non_leap_year][monthcounter]))
                 monthcounter += 1
 
-    def generate_relationships(self, plot_key):
-        for t in range(0, self.T):
-            m = self.month[t]
-            da = self.day_month[t]
-            wateryear = self.water_year[t]
-            year = self.year[t] - self.starting_year
+    def fit_stochastic_model(self, fit_folder=None, plot_key='XXX'):
+        # fits the monthly relationships, AR residuals & snowpack shapes to the historical record
+        # if fit_folder is given, the fitted state is saved there (keyed on the fit format version & a hash of the
+        # historical input file), and loaded instead of re-fitting when the same historical record is used again
+        if fit_folder is not None:
+            fit_file = os.path.join(fit_folder, 'inputter-fit-%s.npz' % self.find_fit_hash()[0:16])
+            if os.path.isfile(fit_file):
+                self.load_fitted_state(fit_file)
+                return
+        self.initialize_reservoirs()
+        self.generate_relationships(plot_key)
+        self.autocorrelate_residuals(plot_key)
+        self.fill_snowpack(plot_key)
+        self.generate_relationships_delta(plot_key)
+        self.autocorrelate_residuals_delta(plot_key)
+        if fit_folder is not None:
+            if not os.path.isdir(fit_folder):
+                os.makedirs(fit_folder)
+            self.save_fitted_state(fit_file)
+
+    def find_input_hash(self):
+        with open(self.input_data_file, 'rb') as input_file:
+            return hashlib.sha1(input_file.read()).hexdigest()
+
+    def find_fit_hash(self):
+        # identifies a fitted state - the historical record it was fit to, & the format it was saved in
+        return hashlib.sha1(('%d/%s' % (fit_format_version, self.find_input_hash())).encode()).hexdigest()
+
+    def save_fitted_state(self, file_name):
+        # monthly moments, regression & AR coefficients, sorted analog years and snowpack shapes, for each reservoir & the delta
+        # nested dictionaries are stored as flat arrays, named by their keys (e.g., SHA/monthly/fnf/AR_coef)
+        fitted_state = {'input_hash': np.array(self.find_input_hash()), 'fit_format_version': np.array(fit_format_version)}
+        for reservoir in self.reservoir_list:
+            flatten_state(fitted_state, reservoir.key + '/monthly', reservoir.monthly)
+            flatten_state(fitted_state, reservoir.key + '/snowpack', reservoir.snowpack)
+        flatten_state(fitted_state, 'delta/monthly', self.monthly)
+        np.savez_compressed(file_name, **fitted_state)
+
+    def load_fitted_state(self, file_name):
+        with np.load(file_name) as fitted_state:
+            if 'fit_format_version' not in fitted_state.files or int(fitted_state['fit_format_version']) != fit_format_version:
+                raise ValueError('%s was saved by a different version of the stochastic model fit' % file_name)
+            if str(fitted_state['input_hash']) != self.find_input_hash():
+                raise ValueError('%s was fitted to a different historical record than %s' % (file_name, self.input_data_file))
+            state = unflatten_state(fitted_state)
+        for reservoir in self.reservoir_list:
+            reservoir.monthly = state[reservoir.key]['monthly']
+            reservoir.snowpack = state[reservoir.key]['snowpack']
+        self.monthly = state['delta']['monthly']
 
-            if da == 29 and m == 2:
-                da = 28
-            for x in self.reservoir_list:
-                x.monthly['fnf']['flows'][m - 1][wateryear] += x.fnf[t] * 1000.0
-                x.monthly['inf']['flows'][m - 1][wateryear] += x.Q[t]
-                x.monthly['gains']['flows'][m - 1][wateryear] += x.downstream[t]
-                x.monthly['evap']['flows'][m - 1][wateryear] += x.E[t]
-                x.monthly['precip']['flows'][m - 1][wateryear] += x.precip[t]
-                x.monthly['fci']['flows'][m - 1][wateryear] += x.fci[t] / self.days_in_month[year][m - 1]
-                x.monthly['otf']['flows'][m - 1][wateryear] += self.df['%s_otf' % x.key].iloc[t] * cfs_tafd
-
-                x.monthly['fnf']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += x.fnf[t] * 1000.0
-                x.monthly['inf']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += x.Q[t]
-                x.monthly['gains']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += x.downstream[t]
-                x.monthly['evap']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += x.E[t]
-                x.monthly['precip']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += x.precip[t]
-                x.monthly['fci']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += x.fci[t]
-                x.monthly['otf']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += self.df['%s_otf' % x.key].iloc[
-                                                                                           t] * cfs_tafd
+    def generate_relationships(self, plot_key):
+        # monthly totals & daily values of each data type, grouped by (water year, month, day) over the whole record
+        year = np.asarray(self.year) - self.starting_year
+        month_index = np.asarray(self.month) - 1
+        for x in self.reservoir_list:
+            daily_values = {}
+            daily_values['fnf'] = x.fnf[0:self.T] * 1000.0
+            daily_values['inf'] = x.Q[0:self.T]
+            daily_values['gains'] = x.downstream[0:self.T]
+            daily_values['evap'] = x.E[0:self.T]
+            daily_values['precip'] = x.precip[0:self.T]
+            daily_values['fci'] = x.fci[0:self.T]
+            daily_values['otf'] = self.df['%s_otf' % x.key].values * cfs_tafd
+            for data_type in self.data_type_list:
+                if data_type == 'fci':
+                    # monthly fci is the average daily value
+                    monthly_values = daily_values[data_type] / self.days_in_month[year, month_index]
+                else:
+                    monthly_values = daily_values[data_type]
+                self.add_to_monthly(x.monthly[data_type]['flows'], x.monthly[data_type]['daily'],
+                                    daily_values[data_type], monthly_values)
 
         for x in self.reservoir_list:
             for data_type in self.data_type_list:
-                x.monthly[data_type]['sorted'] = np.zeros((12, self.number_years))
+                self.normalize_daily(x.monthly[data_type]['flows'], x.monthly[data_type]['daily'],
+                                     x.monthly[data_type]['baseline_value'])
+                x.monthly[data_type]['sorted'] = np.sort(x.monthly[data_type]['flows'], axis=1)
                 x.monthly[data_type]['sort_index'] = np.zeros((12, self.number_years))
-                monthcounter = 0
-                for monthname in self.monthlist:
-                    for wateryearnum in range(0, self.number_years):
-                        if any(positive_nums > 0.0 for positive_nums in
-                               x.monthly[data_type]['daily'][monthname][wateryearnum]) and any(
-                                negative_nums < 0.0 for negative_nums in
-                                x.monthly[data_type]['daily'][monthname][wateryearnum]):
-                            if x.monthly[data_type]['flows'][monthcounter][wateryearnum] > 0.0:
-                                x.monthly[data_type]['baseline_value'][monthcounter][wateryearnum] = np.min(
-                                    x.monthly[data_type]['daily'][monthname][wateryearnum])
-                            else:
-                                x.monthly[data_type]['baseline_value'][monthcounter][wateryearnum] = np.max(
-                                    x.monthly[data_type]['daily'][monthname][wateryearnum])
-                        else:
-                            x.monthly[data_type]['baseline_value'][monthcounter][wateryearnum] = 0.0
-                        for daynum in range(0, len(x.monthly[data_type]['daily'][monthname][wateryearnum])):
-                            if np.power(x.monthly[data_type]['flows'][monthcounter][wateryearnum], 2) > 0.0:
-                                x.monthly[data_type]['daily'][monthname][wateryearnum][daynum] = (x.monthly[data_type][
-                                                                                                 'daily'][monthname][
-                                                                                                 wateryearnum][daynum] -
-                                                                                             x.monthly[data_type][
-                                                                                                 'baseline_value'][
-                                                                                                 monthcounter][
-                                                                                                 wateryearnum]) / (x.monthly[
-                                                                                                                  data_type][
-                                                                                                                  'flows'][
-                                                                                                                  monthcounter][
-                                                                                                                  wateryearnum] -
-                                                                                                              x.monthly[
-                                                                                                                  data_type][
-                                                                                                                  'baseline_value'][
-                                                                                                                  monthcounter][
-                                                                                                                  wateryearnum] *
-                                                                                                              self.days_in_month[wateryearnum+1][
-                                                                                                                  monthcounter])
-                    monthcounter += 1
-                for monthcounter in range(0, 12):
-                    x.monthly[data_type]['sorted'][monthcounter] = np.sort(x.monthly[data_type]['flows'][monthcounter])
-                    x.monthly[data_type]['sort_index'][monthcounter] = np.argsort(
-                        x.monthly[data_type]['flows'][monthcounter])
-            snowmelt_fnf = np.zeros(self.number_years)
-            for yearcounter in range(0, self.number_years):
-                snowmelt_fnf[yearcounter] = x.monthly['fnf']['flows'][3][yearcounter] + x.monthly['fnf']['flows'][4][
-                    yearcounter] + x.monthly['fnf']['flows'][5][yearcounter] + x.monthly['fnf']['flows'][6][yearcounter]
+                x.monthly[data_type]['sort_index'][:] = np.argsort(x.monthly[data_type]['flows'], axis=1)
+            snowmelt_fnf = x.monthly['fnf']['flows'][3] + x.monthly['fnf']['flows'][4] + x.monthly['fnf']['flows'][5] + \
+                           x.monthly['fnf']['flows'][6]
 
             x.monthly['snowmelt_sorted'] = np.sort(snowmelt_fnf)
             x.monthly['snowmelt_sort_index'] = np.argsort(snowmelt_fnf)
 
         for x in self.reservoir_list:
-            for monthcounter in range(0, 12):
-                # PLOTTING
-                if plot_key == x.key:
-                    fig = plt.figure()
-                    type_counter = 1
-                ##########
-                for data_type in self.data_type_list:
-                    # PLOTTING
-                    if plot_key == x.key:
-                        ax1 = fig.add_subplot(3, 2, type_counter)
-                    ############
-                    if data_type == 'fnf':
-                        log_data = np.zeros(self.number_years)
-                        for y in range(0, self.number_years):
-                            if x.monthly[data_type]['flows'][monthcounter][y] > 0.0:
-                                log_data[y] = np.log(x.monthly[data_type]['flows'][monthcounter][y])
-                            else:
-                                log_data[y] = 0.0
-                        x.monthly[data_type]['use_log'][monthcounter] = 'yes'
-                        x.monthly[data_type]['whitened'][monthcounter], x.monthly[data_type]['white_mean'][
-                            monthcounter], x.monthly[data_type]['white_std'][monthcounter] = self.whiten_data(log_data)
-
-                        # PLOTTING
-                        if plot_key == x.key:
-                            ax1.plot(x.monthly[data_type]['flows'][monthcounter])
-                            ax1.set_xlabel("Year")
-                            ax1.set_ylabel("Monthly FNF (tAF)")
-                        ############
-
-                    elif data_type == 'gains' or data_type == 'inf' or data_type == 'otf':
-                        negative_counter = 0
-                        for yy in range(0, len(x.monthly[data_type]['flows'][monthcounter])):
-                            if x.monthly[data_type]['flows'][monthcounter][yy] <= 0.0:
-                                negative_counter = 1
-                        if negative_counter == 1:
-                            x.monthly[data_type]['whitened'][monthcounter], x.monthly[data_type]['white_mean'][
-                                monthcounter], x.monthly[data_type]['white_std'][monthcounter] = self.whiten_data(
-                                x.monthly[data_type]['flows'][monthcounter])
-                        else:
-                            log_gains = np.zeros(len(x.monthly[data_type]['flows'][monthcounter]))
-                            x.monthly[data_type]['use_log'][monthcounter] = 'yes'
-                            for y in range(0, len(log_gains)):
-                                log_gains[y] = np.log(x.monthly[data_type]['flows'][monthcounter][y])
-                                x.monthly[data_type]['whitened'][monthcounter], x.monthly[data_type]['white_mean'][
-                                    monthcounter], x.monthly[data_type]['white_std'][monthcounter] = self.whiten_data(
-                                    log_gains)
-                        x.monthly[data_type]['coefficients'][monthcounter], x.monthly[data_type]['residuals'][
-                            monthcounter] = self.make_regression(x.monthly['fnf']['whitened'][monthcounter],
-                                                                 x.monthly[data_type]['whitened'][monthcounter], 'yes')
-
-                        # PLOTTING
-                        if plot_key == x.key:
-                            ax1.scatter(x.monthly['fnf']['whitened'][monthcounter],
-                                        x.monthly[data_type]['whitened'][monthcounter], s=50, c='red', edgecolor='none',
-                                        alpha=0.7)
-                            ax1.plot([np.min(x.monthly['fnf']['whitened'][monthcounter]),
-                                      np.max(x.monthly['fnf']['whitened'][monthcounter])], [
-                                         x.monthly[data_type]['coefficients'][monthcounter][1] + np.min(
-                                             x.monthly['fnf']['whitened'][monthcounter]) *
-                                         x.monthly[data_type]['coefficients'][monthcounter][0],
-                                         x.monthly[data_type]['coefficients'][monthcounter][1] + np.max(
-                                             x.monthly['fnf']['whitened'][monthcounter]) *
-                                         x.monthly[data_type]['coefficients'][monthcounter][0]])
-                            ax1.set_xlabel("FNF SDs from Mean")
-                            ax1.set_ylabel(data_type + " SDs from Mean")
-                        ####################################
-
-                    else:
-                        x.monthly[data_type]['whitened'][monthcounter], x.monthly[data_type]['white_mean'][
-                            monthcounter], x.monthly[data_type]['white_std'][monthcounter] = self.whiten_data(
-                            x.monthly[data_type]['flows'][monthcounter])
-                        x.monthly[data_type]['coefficients'][monthcounter], x.monthly[data_type]['residuals'][
-                            monthcounter] = self.make_regression(x.monthly['fnf']['whitened'][monthcounter],
-                                                                 x.monthly[data_type]['whitened'][monthcounter], 'yes')
-
-                        # PLOTTING
-                        if plot_key == x.key:
-                            ax1.scatter(x.monthly['fnf']['whitened'][monthcounter],
-                                        x.monthly[data_type]['whitened'][monthcounter], s=50, c='red', edgecolor='none',
-                                        alpha=0.7)
-                            ax1.plot([np.min(x.monthly['fnf']['whitened'][monthcounter]),
-                                      np.max(x.monthly['fnf']['whitened'][monthcounter])], [
-                                         x.monthly[data_type]['coefficients'][monthcounter][1] + np.min(
-                                             x.monthly['fnf']['whitened'][monthcounter]) *
-                                         x.monthly[data_type]['coefficients'][monthcounter][0],
-                                         x.monthly[data_type]['coefficients'][monthcounter][1] + np.max(
-                                             x.monthly['fnf']['whitened'][monthcounter]) *
-                                         x.monthly[data_type]['coefficients'][monthcounter][0]])
-                            ax1.set_xlabel("FNF SDs from Mean")
-                            ax1.set_ylabel(data_type + " SDs from Mean")
-                        ###################
-
-                    x.monthly[data_type]['hist_max'][monthcounter] = np.max(
-                        x.monthly[data_type]['whitened'][monthcounter])
-                    x.monthly[data_type]['hist_min'][monthcounter] = np.min(
-                        x.monthly[data_type]['whitened'][monthcounter])
-
-                    x.monthly[data_type]['whitened_residuals'][monthcounter], x.monthly[data_type]['res_mean'][
-                        monthcounter], x.monthly[data_type]['res_std'][monthcounter] = self.whiten_data(
-                        x.monthly[data_type]['residuals'][monthcounter])
-                    # PLOTTING
-                    if plot_key == x.key:
-                        type_counter += 1
-                    ########
-                # PLOTTING
-                if plot_key == x.key:
-                    fig.suptitle(x.key + ' ' + self.monthlist[monthcounter])
-                    plt.show()
-                    plt.close()
-                ############
+            for data_type in self.data_type_list:
+                if data_type == 'fnf':
+                    # log of fnf (0 in months w/o flow), no regression
+                    x.monthly[data_type]['use_log'] = ['yes' for i in range(0, 12)]
+                    whiten_values = self.find_log_flows(x.monthly[data_type]['flows'])
+                elif data_type == 'gains' or data_type == 'inf' or data_type == 'otf':
+                    # log-transformed in months w/o any zero or negative flows
+                    whiten_values, x.monthly[data_type]['use_log'] = self.find_positive_log_flows(
+                        x.monthly[data_type]['flows'])
+                else:
+                    whiten_values = x.monthly[data_type]['flows']
+                x.monthly[data_type]['whitened'], x.monthly[data_type]['white_mean'], x.monthly[data_type][
+                    'white_std'] = self.whiten_data(whiten_values)
+                if data_type != 'fnf':
+                    x.monthly[data_type]['coefficients'], x.monthly[data_type]['residuals'] = self.make_regression(
+                        x.monthly['fnf']['whitened'], x.monthly[data_type]['whitened'], 'yes')
+
+                x.monthly[data_type]['hist_max'] = np.max(x.monthly[data_type]['whitened'], axis=1)
+                x.monthly[data_type]['hist_min'] = np.min(x.monthly[data_type]['whitened'], axis=1)
+                x.monthly[data_type]['whitened_residuals'], x.monthly[data_type]['res_mean'], x.monthly[data_type][
+                    'res_std'] = self.whiten_data(x.monthly[data_type]['residuals'])
+            # PLOTTING
+            if plot_key == x.key:
+                self.plot_relationships(x)
 
     def generate_relationships_delta(self, plot_key):
-        for t in range(0, self.T):
-            m = self.month[t]
-            da = self.day_month[t]
-            wateryear = self.water_year[t]
-            if da == 29 and m == 2:
-                da = 28
-
-            self.monthly['SAC']['gains'][m - 1][wateryear] += self.df.SAC_gains[t] * cfs_tafd
-            self.monthly['SJ']['gains'][m - 1][wateryear] += self.df.SJ_gains[t] * cfs_tafd
-            self.monthly['EAST']['gains'][m - 1][wateryear] += self.df.EAST_gains[t] * cfs_tafd
-            self.monthly['depletions']['gains'][m - 1][wateryear] += self.df.delta_depletions[t] * cfs_tafd
-            self.monthly['CCC']['gains'][m - 1][wateryear] += self.df.CCC_pump[t] * cfs_tafd
-            self.monthly['BRK']['gains'][m - 1][wateryear] += self.df.BRK_pump[t] * cfs_tafd
-
-            self.monthly['SAC']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += self.df.SAC_gains[t] * cfs_tafd
-            self.monthly['SJ']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += self.df.SJ_gains[t] * cfs_tafd
-            self.monthly['EAST']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += self.df.EAST_gains[t] * cfs_tafd
-            self.monthly['depletions']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += self.df.delta_depletions[
-                                                                                                 t] * cfs_tafd
-            self.monthly['CCC']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += self.df.CCC_pump[t] * cfs_tafd
-            self.monthly['BRK']['daily'][self.monthlist[m - 1]][wateryear][da - 1] += self.df.BRK_pump[t] * cfs_tafd
+        delta_columns = {'SAC': 'SAC_gains', 'SJ': 'SJ_gains', 'EAST': 'EAST_gains', 'depletions': 'delta_depletions',
+                         'CCC': 'CCC_pump', 'BRK': 'BRK_pump'}
+        for deltaname in self.delta_list:
+            daily_values = self.df[delta_columns[deltaname]].values * cfs_tafd
+            self.add_to_monthly(self.monthly[deltaname]['gains'], self.monthly[deltaname]['daily'], daily_values,
+                                daily_values)
 
         for deltaname in self.delta_list:
-            monthcounter = 0
-            self.monthly[deltaname]['sorted'] = np.zeros((12, self.number_years))
+            self.normalize_daily(self.monthly[deltaname]['gains'], self.monthly[deltaname]['daily'],
+                                 self.monthly[deltaname]['baseline_value'])
+            self.monthly[deltaname]['sorted'] = np.sort(self.monthly[deltaname]['gains'], axis=1)
             self.monthly[deltaname]['sort_index'] = np.zeros((12, self.number_years))
-            for monthname in self.monthlist:
-                for wateryearnum in range(0, self.number_years):
-                    if any(positive_nums > 0.0 for positive_nums in
-                           self.monthly[deltaname]['daily'][monthname][wateryearnum]) and any(
-                            negative_nums < 0.0 for negative_nums in
-                            self.monthly[deltaname]['daily'][monthname][wateryearnum]):
-                        if self.monthly[deltaname]['gains'][monthcounter][wateryearnum] > 0.0:
-                            self.monthly[deltaname]['baseline_value'][monthcounter][wateryearnum] = np.min(
-                                self.monthly[deltaname]['daily'][monthname][wateryearnum])
-                        else:
-                            self.monthly[deltaname]['baseline_value'][monthcounter][wateryearnum] = np.max(
-                                self.monthly[deltaname]['daily'][monthname][wateryearnum])
-                    else:
-                        self.monthly[deltaname]['baseline_value'][monthcounter][wateryearnum] = 0.0
-                    for daynum in range(0, len(self.monthly[deltaname]['daily'][monthname][wateryearnum])):
-                        if np.power(self.monthly[deltaname]['gains'][monthcounter][wateryearnum], 2) > 0.0:
-                            self.monthly[deltaname]['daily'][monthname][wateryearnum][daynum] = (self.monthly[deltaname][
-                                                                                                'daily'][monthname][
-                                                                                                wateryearnum][daynum] -
-                                                                                            self.monthly[deltaname][
-                                                                                                'baseline_value'][
-                                                                                                monthcounter][
-                                                                                                wateryearnum]) / (
-                                                                                                       self.monthly[
-                                                                                                           deltaname][
-                                                                                                           'gains'][
-                                                                                                           monthcounter][
-                                                                                                           wateryearnum] -
-                                                                                                       self.monthly[
-                                                                                                           deltaname][
-                                                                                                           'baseline_value'][
-                                                                                                           monthcounter][
-                                                                                                           wateryearnum] *
-                                                                                                       self.days_in_month[wateryearnum+1][
-                                                                                                           monthcounter])
-                monthcounter += 1
-            for monthcounter in range(0, 12):
-                self.monthly[deltaname]['sorted'][monthcounter] = np.sort(
-                    self.monthly[deltaname]['gains'][monthcounter])
-                self.monthly[deltaname]['sort_index'][monthcounter] = np.argsort(
-                    self.monthly[deltaname]['gains'][monthcounter])
-
-        for monthcounter in range(0, 12):
-            for yearcounter in range(0, self.number_years):
-                for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom]:
-                    self.monthly['SAC']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly['fnf']['flows'][monthcounter][yearcounter]
-                    self.monthly['CCC']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly['fnf']['flows'][monthcounter][yearcounter]
-                    self.monthly['BRK']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly['fnf']['flows'][monthcounter][yearcounter]
-
-                for reservoir in [self.newmelones, self.donpedro, self.exchequer, self.millerton]:
-                    self.monthly['SJ']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly['fnf']['flows'][monthcounter][yearcounter]
-
-                for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom, self.newmelones, self.donpedro,
-                                  self.exchequer, self.millerton]:
-                    self.monthly['EAST']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly['fnf']['flows'][monthcounter][yearcounter]
-                    self.monthly['depletions']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly['fnf']['flows'][monthcounter][yearcounter]
+            self.monthly[deltaname]['sort_index'][:] = np.argsort(self.monthly[deltaname]['gains'], axis=1)
+
+        for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom]:
+            self.monthly['SAC']['fnf'] += reservoir.monthly['fnf']['flows']
+            self.monthly['CCC']['fnf'] += reservoir.monthly['fnf']['flows']
+            self.monthly['BRK']['fnf'] += reservoir.monthly['fnf']['flows']
+        for reservoir in [self.newmelones, self.donpedro, self.exchequer, self.millerton]:
+            self.monthly['SJ']['fnf'] += reservoir.monthly['fnf']['flows']
+        for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom, self.newmelones, self.donpedro,
+                          self.exchequer, self.millerton]:
+            self.monthly['EAST']['fnf'] += reservoir.monthly['fnf']['flows']
+            self.monthly['depletions']['fnf'] += reservoir.monthly['fnf']['flows']
 
         # for deltaname in self.delta_list:
         # self.monthly[deltaname]['sorted'] = np.zeros((12, self.number_years))
@@ -437,228 +350,40 @@ class Inputter():
         # self.monthly[deltaname]['sorted'][monthcounter] = np.sort(self.monthly[deltaname]['fnf'][monthcounter])
         # self.monthly[deltaname]['sorted_index'][monthcounter] = np.argsort(self.monthly[deltaname]['fnf'][monthcounter])
 
-        # PLOTTING
         for deltaname in self.delta_list:
+            whiten_values, self.monthly[deltaname]['use_log'] = self.find_positive_log_flows(
+                self.monthly[deltaname]['gains'])
+            self.monthly[deltaname]['whitened'], self.monthly[deltaname]['white_mean'], self.monthly[deltaname][
+                'white_std'] = self.whiten_data(whiten_values)
+            self.monthly[deltaname]['whitened_fnf'], self.monthly[deltaname]['white_fnf_mean'], self.monthly[deltaname][
+                'white_fnf_std'] = self.whiten_data(self.find_log_flows(self.monthly[deltaname]['fnf']))
+            self.monthly[deltaname]['coef'], self.monthly[deltaname]['residuals'] = self.make_regression(
+                self.monthly[deltaname]['whitened_fnf'], self.monthly[deltaname]['whitened'], 'yes')
+
+            self.monthly[deltaname]['hist_max'] = np.max(self.monthly[deltaname]['whitened'], axis=1)
+            self.monthly[deltaname]['hist_min'] = np.min(self.monthly[deltaname]['whitened'], axis=1)
+            self.monthly[deltaname]['whitened_residuals'], self.monthly[deltaname]['res_mean'], self.monthly[deltaname][
+                'res_std'] = self.whiten_data(self.monthly[deltaname]['residuals'])
+            # PLOTTING
             if plot_key == deltaname:
-                fig = plt.figure()
-                gs = gridspec.GridSpec(5, 3)
-            ##########
-            for monthcounter in range(0, 12):
-
-                negative_counter = 0
-                for yy in range(0, len(self.monthly[deltaname]['gains'][monthcounter])):
-                    if self.monthly[deltaname]['gains'][monthcounter][yy] <= 0.0:
-                        negative_counter = 1
-                if negative_counter == 1:
-                    self.monthly[deltaname]['use_log'][monthcounter] = 'no'
-                    self.monthly[deltaname]['whitened'][monthcounter], self.monthly[deltaname]['white_mean'][
-                        monthcounter], self.monthly[deltaname]['white_std'][monthcounter] = self.whiten_data(
-                        self.monthly[deltaname]['gains'][monthcounter])
-                else:
-                    self.monthly[deltaname]['use_log'][monthcounter] = 'yes'
-                    log_gains = np.zeros(len(self.monthly[deltaname]['gains'][monthcounter]))
-                    for y in range(0, len(log_gains)):
-                        log_gains[y] = np.log(self.monthly[deltaname]['gains'][monthcounter][y])
-                    self.monthly[deltaname]['whitened'][monthcounter], self.monthly[deltaname]['white_mean'][
-                        monthcounter], self.monthly[deltaname]['white_std'][monthcounter] = self.whiten_data(log_gains)
-                log_fnf = np.zeros(len(self.monthly[deltaname]['fnf'][monthcounter]))
-                for yy in range(0, len(self.monthly[deltaname]['fnf'][monthcounter])):
-                    if self.monthly[deltaname]['fnf'][monthcounter][yy] > 0.0:
-                        log_fnf[yy] = np.log(self.monthly[deltaname]['fnf'][monthcounter][yy])
-                    else:
-                        log_fnf[yy] = 0.0
-                self.monthly[deltaname]['whitened_fnf'][monthcounter], self.monthly[deltaname]['white_fnf_mean'][
-                    monthcounter], self.monthly[deltaname]['white_fnf_std'][monthcounter] = self.whiten_data(log_fnf)
-                self.monthly[deltaname]['coef'][monthcounter], self.monthly[deltaname]['residuals'][
-                    monthcounter] = self.make_regression(self.monthly[deltaname]['whitened_fnf'][monthcounter],
-                                                         self.monthly[deltaname]['whitened'][monthcounter], 'yes')
-
-                self.monthly[deltaname]['hist_max'][monthcounter] = np.max(
-                    self.monthly[deltaname]['whitened'][monthcounter])
-                self.monthly[deltaname]['hist_min'][monthcounter] = np.min(
-                    self.monthly[deltaname]['whitened'][monthcounter])
-
-                # PLOTTING
-                if plot_key == deltaname:
-                    if monthcounter < 4:
-                        ax1 = plt.subplot(gs[monthcounter + 1, 0])
-                    elif monthcounter < 8:
-                        ax1 = plt.subplot(gs[monthcounter - 3, 1])
-                    else:
-                        ax1 = plt.subplot(gs[monthcounter - 7, 2])
-
-                    ax1.scatter(whitened_fnf, self.monthly[deltaname]['whitened'][monthcounter], s=50, c='red',
-                                edgecolor='none', alpha=0.7)
-                    ax1.plot([np.min(whitened_fnf), np.max(whitened_fnf)], [
-                        self.monthly[deltaname]['coef'][monthcounter][1] + np.min(whitened_fnf) *
-                        self.monthly[deltaname]['coef'][monthcounter][0],
-                        self.monthly[deltaname]['coef'][monthcounter][1] + np.max(whitened_fnf) *
-                        self.monthly[deltaname]['coef'][monthcounter][0]])
-                    ax1.set_xlabel(self.monthlist[monthcounter] + " FNF")
-                    ax1.set_ylabel(self.monthlist[monthcounter] + deltaname)
-                ####################################
-
-                self.monthly[deltaname]['whitened_residuals'][monthcounter], self.monthly[deltaname]['res_mean'][
-                    monthcounter], self.monthly[deltaname]['res_std'][monthcounter] = self.whiten_data(
-                    self.monthly[deltaname]['residuals'][monthcounter])
-            if plot_key == deltaname:
-                single_timeseries = self.unfold_series(self.monthly[deltaname]['gains'], 10)
-                ax1 = plt.subplot(gs[0, :])
-                ax1.plot(single_timeseries, color='black', linewidth=2)
-                ax1.set_ylabel(deltaname + ' flow')
-                ax1.set_xlabel('Timeseries')
-                fig.suptitle(deltaname)
-                plt.show()
-                plt.close()
-
-            ############
+                self.plot_relationships_delta(deltaname)
 
     def autocorrelate_residuals(self, plot_key):
         for x in self.reservoir_list:
             for data_type in self.data_type_list:
+                x.monthly[data_type]['AR_coef'], x.monthly[data_type]['AR_residuals'] = self.find_ar_coefficients(
+                    x.monthly[data_type]['whitened_residuals'])
                 # PLOTTING
                 if plot_key == x.key:
-                    fig = plt.figure()
-                    gs = gridspec.GridSpec(5, 3)
-                #########
-                for monthcounter in range(0, 12):
-                    # PLOTTING
-                    if plot_key == x.key:
-                        if monthcounter < 4:
-                            ax1 = plt.subplot(gs[monthcounter + 1, 0])
-                        elif monthcounter < 8:
-                            ax1 = plt.subplot(gs[monthcounter - 3, 1])
-                        else:
-                            ax1 = plt.subplot(gs[monthcounter - 7, 2])
-                    ############
-                    if monthcounter == 0:
-                        prevmonthcounter = 11
-                        this_month_res = x.monthly[data_type]['whitened_residuals'][monthcounter]
-                        prev_month_res = x.monthly[data_type]['whitened_residuals'][prevmonthcounter]
-                    elif monthcounter == 10:
-                        prevmonthcounter = monthcounter - 1
-                        this_month_res = np.zeros(len(x.monthly[data_type]['whitened_residuals'][monthcounter]) - 1)
-                        prev_month_res = np.zeros(len(x.monthly[data_type]['whitened_residuals'][monthcounter]) - 1)
-                        for yy in range(0, len(this_month_res)):
-                            this_month_res[yy] = x.monthly[data_type]['whitened_residuals'][monthcounter][yy + 1]
-                            prev_month_res[yy] = x.monthly[data_type]['whitened_residuals'][prevmonthcounter][yy]
-                    else:
-                        prevmonthcounter = monthcounter - 1
-                        this_month_res = x.monthly[data_type]['whitened_residuals'][monthcounter]
-                        prev_month_res = x.monthly[data_type]['whitened_residuals'][prevmonthcounter]
-                    x.monthly[data_type]['AR_coef'][monthcounter], x.monthly[data_type]['AR_residuals'][monthcounter][
-                                                                   0:len(this_month_res)] = self.make_regression(
-                        prev_month_res, this_month_res, 'yes')
-
-                    # PLOTTING
-                    if plot_key == x.key:
-                        ax1.scatter(prev_month_res, this_month_res, s=50, c='red', edgecolor='none', alpha=0.7)
-                        ax1.plot([np.min(prev_month_res), np.max(prev_month_res)], [
-                            x.monthly[data_type]['AR_coef'][monthcounter][1] + np.min(prev_month_res) *
-                            x.monthly[data_type]['AR_coef'][monthcounter][0],
-                            x.monthly[data_type]['AR_coef'][monthcounter][1] + np.max(prev_month_res) *
-                            x.monthly[data_type]['AR_coef'][monthcounter][0]])
-                        ax1.set_xlabel(self.monthlist[prevmonthcounter])
-                        ax1.set_ylabel(self.monthlist[monthcounter])
-                    ##############
-                # PLOTTING
-                if plot_key == x.key:
-                    single_timeseries = self.unfold_series(x.monthly[data_type]['whitened_residuals'], 10)
-                    autoregressive_timeseries = np.zeros(len(single_timeseries))
-                    autoregressive_timeseries[0] = single_timeseries[0]
-                    month_index = 10
-                    year_index = 0
-                    for regression_steps in range(1, len(single_timeseries)):
-                        autoregressive_timeseries[regression_steps] = \
-                        x.monthly[data_type]['whitened_residuals'][month_index][year_index] * \
-                        x.monthly[data_type]['AR_coef'][month_index][0] + x.monthly[data_type]['AR_coef'][month_index][
-                            1]
-                        month_index += 1
-                        if month_index == 12:
-                            month_index = 0
-                        if month_index == 10:
-                            year_index += 1
-                    ax1 = plt.subplot(gs[0, :])
-                    ax1.plot(single_timeseries, color='black', linewidth=2)
-                    ax1.plot(autoregressive_timeseries, color='red', linewidth=2)
-                    ax1.set_ylabel('FNF Regression Residuals')
-                    ax1.set_xlabel('Timeseries')
-                    fig.suptitle(x.key + ' ' + data_type)
-                    plt.show()
-                    plt.close()
+                    self.plot_autocorrelation(x.monthly[data_type], x.key + ' ' + data_type)
 
     def autocorrelate_residuals_delta(self, plot_key):
         for deltaname in self.delta_list:
+            self.monthly[deltaname]['AR_coef'], self.monthly[deltaname]['AR_residuals'] = self.find_ar_coefficients(
+                self.monthly[deltaname]['whitened_residuals'])
             # PLOTTING
             if plot_key == deltaname:
-                fig = plt.figure()
-                gs = gridspec.GridSpec(5, 3)
-            #########
-            for monthcounter in range(0, 12):
-                # PLOTTING
-                if plot_key == deltaname:
-                    if monthcounter < 4:
-                        ax1 = plt.subplot(gs[monthcounter + 1, 0])
-                    elif monthcounter < 8:
-                        ax1 = plt.subplot(gs[monthcounter - 3, 1])
-                    else:
-                        ax1 = plt.subplot(gs[monthcounter - 7, 2])
-                ############
-                if monthcounter == 0:
-                    prevmonthcounter = 11
-                    this_month_res = self.monthly[deltaname]['whitened_residuals'][monthcounter]
-                    prev_month_res = self.monthly[deltaname]['whitened_residuals'][prevmonthcounter]
-                elif monthcounter == 10:
-                    prevmonthcounter = monthcounter - 1
-                    this_month_res = np.zeros(len(self.monthly[deltaname]['whitened_residuals'][monthcounter]) - 1)
-                    prev_month_res = np.zeros(len(self.monthly[deltaname]['whitened_residuals'][monthcounter]) - 1)
-                    for yy in range(0, len(this_month_res)):
-                        this_month_res[yy] = self.monthly[deltaname]['whitened_residuals'][monthcounter][yy + 1]
-                        prev_month_res[yy] = self.monthly[deltaname]['whitened_residuals'][prevmonthcounter][yy]
-                else:
-                    prevmonthcounter = monthcounter - 1
-                    this_month_res = self.monthly[deltaname]['whitened_residuals'][monthcounter]
-                    prev_month_res = self.monthly[deltaname]['whitened_residuals'][prevmonthcounter]
-                self.monthly[deltaname]['AR_coef'][monthcounter], self.monthly[deltaname]['AR_residuals'][monthcounter][
-                                                                  0:len(this_month_res)] = self.make_regression(
-                    prev_month_res, this_month_res, 'yes')
-
-                # PLOTTING
-                if plot_key == deltaname:
-                    ax1.scatter(prev_month_res, this_month_res, s=50, c='red', edgecolor='none', alpha=0.7)
-                    ax1.plot([np.min(prev_month_res), np.max(prev_month_res)], [
-                        self.monthly[deltaname]['AR_coef'][monthcounter][1] + np.min(prev_month_res) *
-                        self.monthly[deltaname]['AR_coef'][monthcounter][0],
-                        self.monthly[deltaname]['AR_coef'][monthcounter][1] + np.max(prev_month_res) *
-                        self.monthly[deltaname]['AR_coef'][monthcounter][0]])
-                    ax1.set_xlabel(self.monthlist[prevmonthcounter])
-                    ax1.set_ylabel(self.monthlist[monthcounter])
-                    ##############
-            # PLOTTING
-            if plot_key == deltaname:
-                single_timeseries = self.unfold_series(self.monthly[deltaname]['whitened_residuals'], 10)
-                autoregressive_timeseries = np.zeros(len(single_timeseries))
-                autoregressive_timeseries[0] = single_timeseries[0]
-                month_index = 10
-                year_index = 0
-                for regression_steps in range(1, len(single_timeseries)):
-                    autoregressive_timeseries[regression_steps] = \
-                    self.monthly[deltaname]['whitened_residuals'][month_index][year_index] * \
-                    self.monthly[deltaname]['AR_coef'][month_index][0] + \
-                    self.monthly[deltaname]['AR_coef'][month_index][1]
-                    month_index += 1
-                    if month_index == 12:
-                        month_index = 0
-                    if month_index == 10:
-                        year_index += 1
-                ax1 = plt.subplot(gs[0, :])
-                ax1.plot(single_timeseries, color='black', linewidth=2)
-                ax1.plot(autoregressive_timeseries, color='red', linewidth=2)
-                ax1.set_ylabel('FNF Regression Residuals')
-                ax1.set_xlabel('Timeseries')
-                fig.suptitle(deltaname)
-                plt.show()
-                plt.close()
+                self.plot_autocorrelation(self.monthly[deltaname], deltaname)
 
     def fill_snowpack(self, plot_key):
         for t in range(0, self.T):
@@ -709,14 +434,13 @@ class Inputter():
                 plt.show()
                 plt.close()
 
-    def read_new_fnf_data(self, filename, timestep_length, start_month, first_leap_year, numYears):
-        monthcount = start_month - 1
-        daycount = 0
-        yearcount = 0
-        thismonthday = np.where(first_leap_year == 0, self.days_in_month[self.leap_year][monthcount],
-                                self.days_in_month[self.non_leap_year][monthcount])
-        leapcount = 0
-        self.fnf_df = pd.read_csv(filename)
+    def read_new_fnf_data(self, filename, timestep_length, start_month, first_leap_year, numYears, fnf_df=None):
+        if fnf_df is None:
+            fnf_df = pd.read_csv(filename)
+        self.fnf_df = fnf_df
+        month_index, year_index = self.find_new_monthly_slots(len(self.fnf_df), start_month, first_leap_year, numYears)
+        # spring (Apr - July) snowmelt days
+        melt_days = (month_index > 2) & (month_index < 7)
         for reservoir in self.reservoir_list:
             reservoir.fnf_new = self.fnf_df['%s_fnf' % reservoir.key].values * cfs_tafd
             reservoir.monthly_new = {}
@@ -725,26 +449,13 @@ class Inputter():
                 reservoir.monthly_new[data_type] = {}
                 reservoir.monthly_new[data_type]['flows'] = np.zeros((12, numYears))
                 reservoir.monthly_new[data_type]['whitened'] = np.zeros((12, numYears))
-        for t in range(0, len(reservoir.fnf_new)):
-            for reservoir in self.reservoir_list:
-                if not np.isnan(reservoir.fnf_new[t]):
-                    reservoir.monthly_new['fnf']['flows'][monthcount][yearcount] += reservoir.fnf_new[t]
-                    if monthcount > 2 and monthcount < 7:
-                        reservoir.snowpack['new_melt_fnf'][yearcount] += reservoir.fnf_new[t]
-            daycount += 1
-            if daycount == thismonthday:
-                daycount = 0
-                monthcount += 1
-                if monthcount == 12:
-                    monthcount = 0
-                    yearcount += 1
-                    leapcount += 1
-                    if leapcount == 4:
-                        leapcount = 0
-                if leapcount == first_leap_year:
-                    thismonthday = self.days_in_month[self.leap_year][monthcount]
-                else:
-                    thismonthday = self.days_in_month[self.non_leap_year][monthcount]
+            # missing days are skipped
+            fnf_days = ~np.isnan(reservoir.fnf_new[0:len(month_index)])
+            np.add.at(reservoir.monthly_new['fnf']['flows'], (month_index[fnf_days], year_index[fnf_days]),
+                      reservoir.fnf_new[0:len(month_index)][fnf_days])
+            melt_fnf_days = fnf_days & melt_days
+            np.add.at(reservoir.snowpack['new_melt_fnf'], year_index[melt_fnf_days],
+                      reservoir.fnf_new[0:len(month_index)][melt_fnf_days])
 
         self.monthly_new = {}
         for deltaname in self.delta_list:
@@ -754,475 +465,254 @@ class Inputter():
             self.monthly_new[deltaname]['whitened'] = np.zeros((12, numYears))
             self.monthly_new[deltaname]['gains'] = np.zeros((12, numYears))
 
-        for monthcounter in range(0, 12):
-            for yearcounter in range(0, numYears):
-                for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom]:
-                    self.monthly_new['SAC']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter]
-                    self.monthly_new['CCC']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter]
-                    self.monthly_new['BRK']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter]
-
-                for reservoir in [self.newmelones, self.donpedro, self.exchequer, self.millerton]:
-                    self.monthly_new['SJ']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter]
-
-                for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom, self.newmelones, self.donpedro,
-                                  self.exchequer, self.millerton]:
-                    self.monthly_new['EAST']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter]
-                    self.monthly_new['depletions']['fnf'][monthcounter][yearcounter] += \
-                    reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter]
+        for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom]:
+            self.monthly_new['SAC']['fnf'] += reservoir.monthly_new['fnf']['flows']
+            self.monthly_new['CCC']['fnf'] += reservoir.monthly_new['fnf']['flows']
+            self.monthly_new['BRK']['fnf'] += reservoir.monthly_new['fnf']['flows']
+        for reservoir in [self.newmelones, self.donpedro, self.exchequer, self.millerton]:
+            self.monthly_new['SJ']['fnf'] += reservoir.monthly_new['fnf']['flows']
+        for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom, self.newmelones, self.donpedro,
+                          self.exchequer, self.millerton]:
+            self.monthly_new['EAST']['fnf'] += reservoir.monthly_new['fnf']['flows']
+            self.monthly_new['depletions']['fnf'] += reservoir.monthly_new['fnf']['flows']
+
+    def find_new_monthly_slots(self, numdays, start_month, first_leap_year, numYears):
+        # (month, year) of each day in a new flow record that starts on the first day of start_month, w/ leap years
+        # every fourth year after first_leap_year (days past the end of numYears are not used)
+        year_leap_non_leap = np.where(np.arange(numYears) % 4 == first_leap_year, self.leap_year, self.non_leap_year)
+        month_lengths = self.days_in_month[year_leap_non_leap].ravel()[(start_month - 1):]
+        month_slot = np.repeat(np.arange(start_month - 1, 12 * numYears), month_lengths)[0:numdays]
+        return month_slot % 12, month_slot // 12
 
     def whiten_by_historical_moments(self, numYears, plot_key):
         for reservoir in self.reservoir_list:
+            reservoir.monthly_new['fnf']['whitened'] = self.whiten_by_moments(
+                reservoir.monthly_new['fnf']['flows'], reservoir.monthly['fnf']['white_mean'],
+                reservoir.monthly['fnf']['white_std'], np.asarray(reservoir.monthly['fnf']['use_log']) == 'yes')
+            # PLOTTING
             if plot_key == reservoir.key:
-                fig = plt.figure()
-                gs = gridspec.GridSpec(12, 2)
-            for monthcounter in range(0, 12):
-                for yearcounter in range(0, numYears):
-                    if reservoir.monthly['fnf']['use_log'][monthcounter] == 'yes':
-                        if reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter] > 0.0:
-                            log_data = np.log(reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter])
-                        else:
-                            log_data = 0.0
-                        reservoir.monthly_new['fnf']['whitened'][monthcounter][yearcounter] = (log_data -
-                                                                                               reservoir.monthly['fnf'][
-                                                                                                   'white_mean'][
-                                                                                                   monthcounter]) / \
-                                                                                              reservoir.monthly['fnf'][
-                                                                                                  'white_std'][
-                                                                                                  monthcounter]
-                    else:
-                        non_log_data = reservoir.monthly_new['fnf']['flows'][monthcounter][yearcounter]
-                        reservoir.monthly_new['fnf']['whitened'][monthcounter][yearcounter] = (non_log_data -
-                                                                                               reservoir.monthly['fnf'][
-                                                                                                   'white_mean'][
-                                                                                                   monthcounter]) / \
-                                                                                              reservoir.monthly['fnf'][
-                                                                                                  'white_std'][
-                                                                                                  monthcounter]
-                if plot_key == reservoir.key:
-                    ax1 = plt.subplot(gs[monthcounter, 0])
-                    ax1.plot(reservoir.monthly_new['fnf']['flows'][monthcounter])
-                    ax1.set_ylabel(self.monthlist[monthcounter])
-                    if monthcounter == 0:
-                        ax1.set_title('FNF')
-                    ax1 = plt.subplot(gs[monthcounter, 1])
-                    ax1.plot(reservoir.monthly_new['fnf']['whitened'][monthcounter])
-                    if monthcounter == 0:
-                        ax1.set_title('SDs from hist mean')
-            if plot_key == reservoir.key:
-                fig.suptitle(reservoir.key)
-                plt.show()
-                plt.close()
+                self.plot_monthly_pair(reservoir.monthly_new['fnf']['flows'], reservoir.monthly_new['fnf']['whitened'],
+                                       reservoir.key, 'FNF', 'SDs from hist mean')
 
     def whiten_by_historical_moments_delta(self, numYears, plot_key):
         for deltaname in self.delta_list:
+            self.monthly_new[deltaname]['whitened_fnf'] = self.whiten_by_moments(
+                self.monthly_new[deltaname]['fnf'], self.monthly[deltaname]['white_fnf_mean'],
+                self.monthly[deltaname]['white_fnf_std'], np.ones(12, dtype=bool))
             # PLOTTING
-            if deltaname == plot_key:
-                fig = plt.figure()
-                gs = gridspec.GridSpec(12, 2)
-            ###########
-            for monthcounter in range(0, 12):
-                for yearcounter in range(0, numYears):
-                    if self.monthly_new[deltaname]['fnf'][monthcounter][yearcounter] > 0.0:
-                        log_data = np.log(self.monthly_new[deltaname]['fnf'][monthcounter][yearcounter])
-                    else:
-                        log_data = 0.0
-                    self.monthly_new[deltaname]['whitened_fnf'][monthcounter][yearcounter] = (log_data -
-                                                                                              self.monthly[deltaname][
-                                                                                                  'white_fnf_mean'][
-                                                                                                  monthcounter]) / \
-                                                                                             self.monthly[deltaname][
-                                                                                                 'white_fnf_std'][
-                                                                                                 monthcounter]
-                # PLOTTING
-                if plot_key == deltaname:
-                    ax1 = plt.subplot(gs[monthcounter, 0])
-                    ax1.plot(self.monthly_new[deltaname]['fnf'][monthcounter])
-                    ax1.set_ylabel(self.monthlist[monthcounter])
-                    if monthcounter == 0:
-                        ax1.set_title('FNF')
-                    ax1 = plt.subplot(gs[monthcounter, 1])
-                    ax1.plot(self.monthly_new[deltaname]['whitened_fnf'][monthcounter])
-                    if monthcounter == 0:
-                        ax1.set_title('SDs from hist mean')
-            ##PLOTTING
             if plot_key == deltaname:
-                fig.suptitle(deltaname)
-                plt.show()
-                plt.close()
+                self.plot_monthly_pair(self.monthly_new[deltaname]['fnf'], self.monthly_new[deltaname]['whitened_fnf'],
+                                       deltaname, 'FNF', 'SDs from hist mean')
 
     def make_fnf_prediction(self, numYears, plot_key):
         for reservoir in self.reservoir_list:
-            reservoir.snowpack['pred_max'] = np.zeros(numYears)
-            for wateryearnum in range(0, numYears):
-                reservoir.snowpack['pred_max'][wateryearnum] = reservoir.snowpack['coef'][1] + reservoir.snowpack['coef'][
-                    0] * reservoir.snowpack['new_melt_fnf'][wateryearnum]
-            if plot_key == reservoir.key:
-                fig = plt.figure()
-                gs = gridspec.GridSpec(2, 1)
-                ax1 = plt.subplot(gs[0, 0])
-                ax1.plot(reservoir.snowpack['pred_max'])
-                ax2 = plt.subplot(gs[1, 0])
-                ax2.plot(reservoir.snowpack['new_melt_fnf'])
-                fig.suptitle(reservoir.key)
-                plt.show()
-                plt.close()
+            reservoir.snowpack['pred_max'] = reservoir.snowpack['coef'][1] + reservoir.snowpack['coef'][0] * \
+                                             reservoir.snowpack['new_melt_fnf']
             for data_type in self.data_type_list:
-                if plot_key == reservoir.key:
-                    fig = plt.figure()
-                    gs = gridspec.GridSpec(12, 2)
-                if data_type == 'fnf':
-                    a = 1
-                else:
-                    for monthcounter in range(0, 12):
-                        for yearcounter in range(0, numYears):
-                            predictor = reservoir.monthly_new['fnf']['whitened'][monthcounter][yearcounter]
-                            reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] = \
-                            reservoir.monthly[data_type]['coefficients'][monthcounter][1] + \
-                            reservoir.monthly[data_type]['coefficients'][monthcounter][0] * predictor
-
-                if plot_key == reservoir.key:
-                    for monthcounter in range(0, 12):
-                        ax1 = plt.subplot(gs[monthcounter, 0])
-                        ax1.plot(reservoir.monthly_new[data_type]['whitened'][monthcounter])
-                        ax1.set_ylabel(self.monthlist[monthcounter])
-                        if monthcounter == 0:
-                            ax1.set_title(data_type)
-                        ax1 = plt.subplot(gs[monthcounter, 1])
-                        ax1.plot(reservoir.monthly_new['fnf']['whitened'][monthcounter])
-                        if monthcounter == 0:
-                            ax1.set_title('FNF')
-                if plot_key == reservoir.key:
-                    fig.suptitle(reservoir.key)
-                    plt.show()
-                    plt.close()
+                if data_type != 'fnf':
+                    reservoir.monthly_new[data_type]['whitened'] = self.predict_whitened(
+                        reservoir.monthly[data_type]['coefficients'], reservoir.monthly_new['fnf']['whitened'])
+            # PLOTTING
+            if plot_key == reservoir.key:
+                self.plot_snowpack_prediction(reservoir)
+                for data_type in self.data_type_list:
+                    self.plot_monthly_pair(reservoir.monthly_new[data_type]['whitened'],
+                                           reservoir.monthly_new['fnf']['whitened'], reservoir.key, data_type, 'FNF')
 
     def make_fnf_prediction_delta(self, numYears, plot_key):
         for deltaname in self.delta_list:
+            self.monthly_new[deltaname]['whitened'] = self.predict_whitened(self.monthly[deltaname]['coef'],
+                                                                            self.monthly_new[deltaname]['whitened_fnf'])
             # PLOTTING
             if plot_key == deltaname:
-                fig = plt.figure()
-                gs = gridspec.GridSpec(12, 2)
-            #########
-            for monthcounter in range(0, 12):
-                for yearcounter in range(0, numYears):
-                    predictor = self.monthly_new[deltaname]['whitened_fnf'][monthcounter][yearcounter]
-                    self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] = \
-                    self.monthly[deltaname]['coef'][monthcounter][1] + self.monthly[deltaname]['coef'][monthcounter][
-                        0] * predictor
-
-            # PLOTTING
-            if plot_key == deltaname:
-                for monthcounter in range(0, 12):
-                    ax1 = plt.subplot(gs[monthcounter, 0])
-                    ax1.plot(self.monthly_new[deltaname]['whitened'][monthcounter])
-                    ax1.set_ylabel(self.monthlist[monthcounter])
-                    if monthcounter == 0:
-                        ax1.set_title(deltaname)
-                    ax1 = plt.subplot(gs[monthcounter, 1])
-                    ax1.plot(self.monthly_new[deltaname]['whitened_fnf'][monthcounter])
-                    if monthcounter == 0:
-                        ax1.set_title('FNF')
-                fig.suptitle(deltaname)
-                plt.show()
-                plt.close()
-
-    def find_residuals(self, start_month, numYears, plot_key):
+                self.plot_monthly_pair(self.monthly_new[deltaname]['whitened'],
+                                       self.monthly_new[deltaname]['whitened_fnf'], deltaname, deltaname, 'FNF')
+
+    def find_residuals(self, start_month, numYears, plot_key, random_streams=None):
+        # random_streams - list of np.random.Generator, one for each realization (if None, one realization from the np.random state)
+        # the AR series of all reservoirs & data types are simulated together
+        series_monthly = [reservoir.monthly[data_type] for reservoir in self.reservoir_list
+                          for data_type in self.data_type_list]
+        whitened_residuals = self.simulate_residuals(series_monthly, start_month, numYears, random_streams)
+        series_counter = 0
         for reservoir in self.reservoir_list:
             for data_type in self.data_type_list:
+                reservoir.monthly_new[data_type]['whitened_residuals'] = whitened_residuals[series_counter]
+                series_counter += 1
+                # PLOTTING (first realization)
                 if plot_key == reservoir.key:
-                    fig = plt.figure()
-                reservoir.monthly_new[data_type]['whitened_residuals'] = np.zeros((12, numYears))
-                random_start_integer = np.random.randint(
-                    len(reservoir.monthly[data_type]['whitened_residuals'][start_month - 1]))
-                prev_residual = reservoir.monthly[data_type]['whitened_residuals'][start_month - 1][
-                    random_start_integer]
-                for yearcount in range(0, numYears):
-                    for monthcount in range(0, 12):
-                        current_month = monthcount + start_month - 1
-                        if current_month >= 12:
-                            current_month -= 12
-                        new_residual = reservoir.monthly[data_type]['AR_coef'][current_month][0] * prev_residual + \
-                                       reservoir.monthly[data_type]['AR_coef'][current_month][1]
-                        random_int = np.random.randint(len(reservoir.monthly[data_type]['AR_residuals'][current_month]))
-                        ar_residual = reservoir.monthly[data_type]['AR_residuals'][current_month][random_int]
-                        reservoir.monthly_new[data_type]['whitened_residuals'][current_month][
-                            yearcount] = new_residual + ar_residual
-                        prev_residual = new_residual + ar_residual
-                if plot_key == reservoir.key:
-                    for monthcounter in range(0, 12):
-                        ax1 = fig.add_subplot(6, 2, monthcounter + 1)
-                        ax1.plot(reservoir.monthly_new[data_type]['whitened_residuals'][monthcounter])
-                        ax1.set_ylabel(self.monthlist[monthcounter])
-                    fig.suptitle(reservoir.key + " " + data_type)
-                    plt.show()
-                    plt.close()
-
-    def find_residuals_delta(self, start_month, numYears, plot_key):
-        for deltaname in self.delta_list:
-            ##PLOTTING
-            if plot_key == deltaname:
-                fig = plt.figure()
-            ##########
-            self.monthly_new[deltaname]['whitened_residuals'] = np.zeros((12, numYears))
-            random_start_integer = np.random.randint(
-                len(self.monthly[deltaname]['whitened_residuals'][start_month - 1]))
-            prev_residual = self.monthly[deltaname]['whitened_residuals'][start_month - 1][random_start_integer]
-            for yearcount in range(0, numYears):
-                for monthcount in range(0, 12):
-                    current_month = monthcount + start_month - 1
-                    if current_month >= 12:
-                        current_month -= 12
-                    new_residual = self.monthly[deltaname]['AR_coef'][current_month][0] * prev_residual + \
-                                   self.monthly[deltaname]['AR_coef'][current_month][1]
-                    random_int = np.random.randint(len(self.monthly[deltaname]['AR_residuals'][current_month]))
-                    ar_residual = self.monthly[deltaname]['AR_residuals'][current_month][random_int]
-                    self.monthly_new[deltaname]['whitened_residuals'][current_month][
-                        yearcount] = new_residual + ar_residual
-                    prev_residual = new_residual + ar_residual
-            # PLOTTING
+                    self.plot_monthly_series(
+                        reservoir.monthly_new[data_type]['whitened_residuals'].reshape(-1, 12, numYears)[0],
+                        reservoir.key + ' ' + data_type)
+
+    def find_residuals_delta(self, start_month, numYears, plot_key, random_streams=None):
+        series_monthly = [self.monthly[deltaname] for deltaname in self.delta_list]
+        whitened_residuals = self.simulate_residuals(series_monthly, start_month, numYears, random_streams)
+        for series_counter, deltaname in enumerate(self.delta_list):
+            self.monthly_new[deltaname]['whitened_residuals'] = whitened_residuals[series_counter]
+            # PLOTTING (first realization)
             if plot_key == deltaname:
-                for monthcounter in range(0, 12):
-                    ax1 = fig.add_subplot(6, 2, monthcounter + 1)
-                    ax1.plot(self.monthly_new[deltaname]['whitened_residuals'][monthcounter])
-                    ax1.set_ylabel(self.monthlist[monthcounter])
-                fig.suptitle(deltaname)
-                plt.show()
-                plt.close()
+                self.plot_monthly_series(
+                    self.monthly_new[deltaname]['whitened_residuals'].reshape(-1, 12, numYears)[0], deltaname)
 
     def add_error(self, numYears, plot_key):
         for reservoir in self.reservoir_list:
             for data_type in self.data_type_list:
-                for monthcounter in range(0, 12):
-                    for yearcounter in range(0, numYears):
-                        reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] += \
-                        reservoir.monthly_new[data_type]['whitened_residuals'][monthcounter][yearcounter] * \
-                        reservoir.monthly[data_type]['res_std'][monthcounter] + \
-                        reservoir.monthly[data_type]['res_mean'][monthcounter]
-
-                        if reservoir.monthly[data_type]['use_log'][monthcounter] == 'no':
-                            if reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] > \
-                                    reservoir.monthly[data_type]['hist_max'][monthcounter]:
-                                reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] = \
-                                reservoir.monthly[data_type]['hist_max'][monthcounter]
-                            elif reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] < \
-                                    reservoir.monthly[data_type]['hist_min'][monthcounter]:
-                                reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] = \
-                                reservoir.monthly[data_type]['hist_min'][monthcounter]
-
-                        if data_type == 'fnf':
-                            reservoir.monthly_new[data_type]['flows'][monthcounter][yearcounter] = \
-                            reservoir.monthly_new[data_type]['flows'][monthcounter][yearcounter]
-                        elif reservoir.monthly[data_type]['use_log'][monthcounter] == 'yes':
-                            reservoir.monthly_new[data_type]['flows'][monthcounter][yearcounter] = np.exp(
-                                reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] *
-                                reservoir.monthly[data_type]['white_std'][monthcounter] +
-                                reservoir.monthly[data_type]['white_mean'][monthcounter])
-                        else:
-                            reservoir.monthly_new[data_type]['flows'][monthcounter][yearcounter] = \
-                            reservoir.monthly_new[data_type]['whitened'][monthcounter][yearcounter] * \
-                            reservoir.monthly[data_type]['white_std'][monthcounter] + \
-                            reservoir.monthly[data_type]['white_mean'][monthcounter]
-
+                reservoir.monthly_new[data_type]['whitened'] = self.add_whitened_error(
+                    reservoir.monthly[data_type], reservoir.monthly_new[data_type]['whitened'],
+                    reservoir.monthly_new[data_type]['whitened_residuals'])
+                if data_type != 'fnf':
+                    reservoir.monthly_new[data_type]['flows'] = self.unwhiten_data(
+                        reservoir.monthly[data_type], reservoir.monthly_new[data_type]['whitened'])
+                # PLOTTING (first realization)
                 if plot_key == reservoir.key:
-                    fig = plt.figure()
-                    gs = gridspec.GridSpec(12, 2)
-                    for monthcounter in range(0, 12):
-                        ax1 = plt.subplot(gs[monthcounter, 0])
-                        ax1.plot(reservoir.monthly_new[data_type]['flows'][monthcounter])
-                        ax1.set_ylabel(self.monthlist[monthcounter])
-                        ax1 = plt.subplot(gs[monthcounter, 1])
-                        ax1.plot(reservoir.monthly_new[data_type]['whitened'][monthcounter])
-                        ax1.set_ylabel(self.monthlist[monthcounter])
-                    fig.suptitle(reservoir.key + " " + data_type)
-                    plt.show()
-                    plt.close()
+                    self.plot_monthly_pair(reservoir.monthly_new[data_type]['flows'].reshape(-1, 12, numYears)[0],
+                                           reservoir.monthly_new[data_type]['whitened'].reshape(-1, 12, numYears)[0],
+                                           reservoir.key + " " + data_type)
 
     def add_error_delta(self, numYears, plot_key):
         for deltaname in self.delta_list:
-            for monthcounter in range(0, 12):
-                for yearcounter in range(0, numYears):
-                    self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] += \
-                    self.monthly_new[deltaname]['whitened_residuals'][monthcounter][yearcounter] * \
-                    self.monthly[deltaname]['res_std'][monthcounter] + self.monthly[deltaname]['res_mean'][monthcounter]
-
-                    if self.monthly[deltaname]['use_log'][monthcounter] == 'no':
-                        if self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] > \
-                                self.monthly[deltaname]['hist_max'][monthcounter]:
-                            self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] = \
-                            self.monthly[deltaname]['hist_max'][monthcounter]
-                        elif self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] < \
-                                self.monthly[deltaname]['hist_min'][monthcounter]:
-                            self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] = \
-                            self.monthly[deltaname]['hist_min'][monthcounter]
-
-                    if self.monthly[deltaname]['use_log'][monthcounter] == 'yes':
-                        self.monthly_new[deltaname]['gains'][monthcounter][yearcounter] = np.exp(
-                            self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] *
-                            self.monthly[deltaname]['white_std'][monthcounter] + self.monthly[deltaname]['white_mean'][
-                                monthcounter])
-                    else:
-                        self.monthly_new[deltaname]['gains'][monthcounter][yearcounter] = \
-                        self.monthly_new[deltaname]['whitened'][monthcounter][yearcounter] * \
-                        self.monthly[deltaname]['white_std'][monthcounter] + self.monthly[deltaname]['white_mean'][
-                            monthcounter]
+            self.monthly_new[deltaname]['whitened'] = self.add_whitened_error(
+                self.monthly[deltaname], self.monthly_new[deltaname]['whitened'],
+                self.monthly_new[deltaname]['whitened_residuals'])
+            self.monthly_new[deltaname]['gains'] = self.unwhiten_data(self.monthly[deltaname],
+                                                                      self.monthly_new[deltaname]['whitened'])
+            # PLOTTING (first realization)
             if plot_key == deltaname:
-                fig = plt.figure()
-                gs = gridspec.GridSpec(12, 2)
-                for monthcounter in range(0, 12):
-                    ax1 = plt.subplot(gs[monthcounter, 0])
-                    ax1.plot(self.monthly_new[deltaname]['gains'][monthcounter])
-                    ax1.set_ylabel(self.monthlist[monthcounter])
-                    ax1 = plt.subplot(gs[monthcounter, 1])
-                    ax1.plot(self.monthly_new[deltaname]['whitened'][monthcounter])
-                    ax1.set_ylabel(self.monthlist[monthcounter])
-                fig.suptitle(deltaname)
-                plt.show()
-                plt.close()
-
-    def make_daily_timeseries(self, numYears, start_date, end_date, start_year, first_leap, plot_key, file_folder, file_name):
-        dates_for_output = pd.date_range(start=start_date, end=end_date, freq='D')
-        output_day_year = dates_for_output.dayofyear
-        output_year = dates_for_output.year
-        output_month = dates_for_output.month
-        output_day_month = dates_for_output.day
-        output_dowy = water_day(output_day_year, output_year)
-
-        numdays_output = len(dates_for_output)
-        last_step_month = output_month[0] - 2
-        for reservoir in self.reservoir_list:
-            reservoir.daily_output_data = {}
-            reservoir.k_close_wateryear = {}
-            for data_type in self.data_type_list:
-                reservoir.daily_output_data[data_type] = np.zeros(numdays_output)
-            reservoir.daily_output_data['snow'] = np.zeros(numdays_output)
-        self.k_close_wateryear = {}
-        self.daily_output_data = {}
-        for deltaname in self.delta_list:
-            self.daily_output_data[deltaname] = np.zeros(numdays_output)
-
-        for t in range(0, numdays_output):
-            monthcounter = output_month[t] - 1
-            yearcounter = output_year[t] - start_year
-            daycounter = output_day_month[t] - 1
-            dowy = output_dowy[t]
-            is_leap = (yearcounter % 4 == first_leap)
-            year_leap_non_leap = np.where(is_leap, self.leap_year, self.non_leap_year)
-
-            if monthcounter == 1 and daycounter == 28:
-                daycounter = 27
-            for reservoir in self.reservoir_list:
-                for data_type in self.data_type_list:
-                    if last_step_month != monthcounter:
-                        for sorted_search in range(0, len(reservoir.monthly[data_type]['sorted'][monthcounter])):
-                            if reservoir.monthly_new[data_type]['flows'][monthcounter][yearcounter] < \
-                                    reservoir.monthly[data_type]['sorted'][monthcounter][sorted_search]:
-                                break
-                        reservoir.k_close_wateryear[data_type] = int(
-                            reservoir.monthly[data_type]['sort_index'][monthcounter][sorted_search])
-
-                    reservoir.daily_output_data[data_type][t] = (reservoir.monthly_new[data_type]['flows'][
-                                                                     monthcounter][yearcounter] -
-                                                                 reservoir.monthly[data_type]['baseline_value'][
-                                                                     monthcounter][
-                                                                     reservoir.k_close_wateryear[data_type]] *
-                                                                 self.days_in_month[year_leap_non_leap][monthcounter]) * \
-                                                                reservoir.monthly[data_type]['daily'][
-                                                                    self.monthlist[monthcounter]][
-                                                                    reservoir.k_close_wateryear[data_type]][
-                                                                    daycounter] + \
-                                                                reservoir.monthly[data_type]['baseline_value'][
-                                                                    monthcounter][
-                                                                    reservoir.k_close_wateryear[data_type]]
-                if last_step_month != monthcounter:
-                    this_year_fnf_melt = 0.0
-                    for melt_month in range(3, 7):
-                        if monthcounter < 9:
-                            this_year_fnf_melt += reservoir.monthly_new['fnf']['flows'][melt_month][yearcounter]
-                        else:
-                            if yearcounter < (numYears - 1):
-                                this_year_fnf_melt += reservoir.monthly_new['fnf']['flows'][melt_month][yearcounter + 1]
-                    for sorted_search in range(0, len(reservoir.monthly['snowmelt_sorted'])):
-                        if this_year_fnf_melt < reservoir.monthly['snowmelt_sorted'][sorted_search]:
-                            break
-                    reservoir.k_close_wateryear['snow'] = int(reservoir.monthly['snowmelt_sort_index'][sorted_search])
-
-                reservoir.daily_output_data['snow'][t] = reservoir.snowpack['pred_max'][yearcounter] * \
-                                                         reservoir.snowpack['daily'][
-                                                             reservoir.k_close_wateryear['snow']][dowy]
-
-            for deltaname in self.delta_list:
-                if last_step_month != monthcounter:
-                    for sorted_search in range(0, len(self.monthly[deltaname]['sorted'][monthcounter])):
-                        if self.monthly_new[deltaname]['gains'][monthcounter][yearcounter] < \
-                                self.monthly[deltaname]['sorted'][monthcounter][sorted_search]:
-                            break
-                    self.k_close_wateryear[deltaname] = int(
-                        self.monthly[deltaname]['sort_index'][monthcounter][sorted_search])
-
-                self.daily_output_data[deltaname][t] = (self.monthly_new[deltaname]['gains'][monthcounter][
-                                                            yearcounter] -
-                                                        self.monthly[deltaname]['baseline_value'][monthcounter][
-                                                            self.k_close_wateryear[deltaname]] * self.days_in_month[year_leap_non_leap][
-                                                            monthcounter]) * \
-                                                       self.monthly[deltaname]['daily'][self.monthlist[monthcounter]][
-                                                           self.k_close_wateryear[deltaname]][daycounter] + \
-                                                       self.monthly[deltaname]['baseline_value'][monthcounter][
-                                                           self.k_close_wateryear[deltaname]]
-
-            last_step_month = monthcounter
+                self.plot_monthly_pair(self.monthly_new[deltaname]['gains'].reshape(-1, 12, numYears)[0],
+                                       self.monthly_new[deltaname]['whitened'].reshape(-1, 12, numYears)[0], deltaname)
 
-        for start_counter in range(0, numdays_output):
-            monthcounter = output_month[start_counter]
-            daycounter = output_day_month[start_counter]
-            if monthcounter == 10 and daycounter == 1:
-                break
-        for end_counter in range(numdays_output - 1, 0, -1):
-            monthcounter = output_month[end_counter]
-            daycounter = output_day_month[end_counter]
-            if monthcounter == 9 and daycounter == 30:
-                break
-            # print(end_counter, end=" ")
-            # print(monthcounter, end=" ")
-            # print(daycounter)
-
-        dates_for_df = dates_for_output[start_counter:(end_counter + 1)]
-        df_for_output = pd.DataFrame(index=dates_for_df)
-        for reservoir in self.reservoir_list:
-            reservoir.daily_df_data = {}
-            reservoir.daily_df_data['snow'] = reservoir.daily_output_data['snow'][start_counter:(end_counter + 1)]
-            for data_type in self.data_type_list:
-                reservoir.daily_df_data[data_type] = reservoir.daily_output_data[data_type][
-                                                     start_counter:(end_counter + 1)]
+    def plot_relationships(self, x):
+        # monthly flows (fnf) & whitened regressions on fnf (other data types), one figure for each month
+        for monthcounter in range(0, 12):
+            fig = plt.figure()
+            for type_counter, data_type in enumerate(self.data_type_list):
+                ax1 = fig.add_subplot(4, 2, type_counter + 1)
                 if data_type == 'fnf':
-                    multiplier = 1000.0
-                elif data_type == 'fci':
-                    multiplier = 1.0
+                    ax1.plot(x.monthly[data_type]['flows'][monthcounter])
+                    ax1.set_xlabel("Year")
+                    ax1.set_ylabel("Monthly FNF (tAF)")
                 else:
-                    multiplier = 1.0 / cfs_tafd
-                key_name = reservoir.key + "_" + data_type
-                df_for_output['%s_%s' % (reservoir.key, data_type)] = pd.Series(
-                    reservoir.daily_df_data[data_type] * multiplier, index=df_for_output.index)
-            df_for_output['%s_snow' % (reservoir.key)] = pd.Series(reservoir.daily_df_data['snow'],
-                                                                   index=df_for_output.index)
-        self.daily_df_data = {}
-        for deltaname in self.delta_list:
-            self.daily_df_data[deltaname] = self.daily_output_data[deltaname][start_counter:(end_counter + 1)]
-            multiplier = 1.0 / cfs_tafd
-            if deltaname == 'SAC' or deltaname == 'SJ' or deltaname == 'EAST':
-                df_for_output['%s_gains' % deltaname] = pd.Series(self.daily_df_data[deltaname] * multiplier,
-                                                                  index=df_for_output.index)
-            elif deltaname == 'depletions':
-                df_for_output['delta_depletions'] = pd.Series(self.daily_df_data[deltaname] * multiplier,
-                                                              index=df_for_output.index)
-            else:
-                df_for_output['%s_pump' % deltaname] = pd.Series(self.daily_df_data[deltaname] * multiplier,
-                                                                 index=df_for_output.index)
-        df_for_output.to_csv(file_folder + 'cord-data-' + file_name, index=True, index_label='datetime')
+                    self.plot_regression(ax1, x.monthly['fnf']['whitened'][monthcounter],
+                                         x.monthly[data_type]['whitened'][monthcounter],
+                                         x.monthly[data_type]['coefficients'][monthcounter])
+                    ax1.set_xlabel("FNF SDs from Mean")
+                    ax1.set_ylabel(data_type + " SDs from Mean")
+            fig.suptitle(x.key + ' ' + self.monthlist[monthcounter])
+            plt.show()
+            plt.close()
+
+    def plot_relationships_delta(self, deltaname):
+        fig = plt.figure()
+        gs = gridspec.GridSpec(5, 3)
+        for monthcounter in range(0, 12):
+            ax1 = self.find_month_subplot(gs, monthcounter)
+            self.plot_regression(ax1, self.monthly[deltaname]['whitened_fnf'][monthcounter],
+                                 self.monthly[deltaname]['whitened'][monthcounter],
+                                 self.monthly[deltaname]['coef'][monthcounter])
+            ax1.set_xlabel(self.monthlist[monthcounter] + " FNF")
+            ax1.set_ylabel(self.monthlist[monthcounter] + deltaname)
+        single_timeseries = self.unfold_series(self.monthly[deltaname]['gains'], 10)
+        ax1 = plt.subplot(gs[0, :])
+        ax1.plot(single_timeseries, color='black', linewidth=2)
+        ax1.set_ylabel(deltaname + ' flow')
+        ax1.set_xlabel('Timeseries')
+        fig.suptitle(deltaname)
+        plt.show()
+        plt.close()
+
+    def plot_autocorrelation(self, monthly, title):
+        # AR regressions for each month, and the whitened residual series w/ its one-step AR prediction
+        fig = plt.figure()
+        gs = gridspec.GridSpec(5, 3)
+        prev_month_res, this_month_res, valid_res = self.find_lagged_residuals(monthly['whitened_residuals'])
+        for monthcounter in range(0, 12):
+            ax1 = self.find_month_subplot(gs, monthcounter)
+            self.plot_regression(ax1, prev_month_res[monthcounter][valid_res[monthcounter]],
+                                 this_month_res[monthcounter][valid_res[monthcounter]], monthly['AR_coef'][monthcounter])
+            ax1.set_xlabel(self.monthlist[monthcounter - 1])
+            ax1.set_ylabel(self.monthlist[monthcounter])
+        single_timeseries = self.unfold_series(monthly['whitened_residuals'], 10)
+        autoregressive_timeseries = np.zeros(len(single_timeseries))
+        autoregressive_timeseries[0] = single_timeseries[0]
+        month_index = 10
+        year_index = 0
+        for regression_steps in range(1, len(single_timeseries)):
+            autoregressive_timeseries[regression_steps] = monthly['whitened_residuals'][month_index][year_index] * \
+                                                          monthly['AR_coef'][month_index][0] + \
+                                                          monthly['AR_coef'][month_index][1]
+            month_index += 1
+            if month_index == 12:
+                month_index = 0
+            if month_index == 10:
+                year_index += 1
+        ax1 = plt.subplot(gs[0, :])
+        ax1.plot(single_timeseries, color='black', linewidth=2)
+        ax1.plot(autoregressive_timeseries, color='red', linewidth=2)
+        ax1.set_ylabel('FNF Regression Residuals')
+        ax1.set_xlabel('Timeseries')
+        fig.suptitle(title)
+        plt.show()
+        plt.close()
+
+    def plot_snowpack_prediction(self, reservoir):
+        fig = plt.figure()
+        gs = gridspec.GridSpec(2, 1)
+        ax1 = plt.subplot(gs[0, 0])
+        ax1.plot(reservoir.snowpack['pred_max'])
+        ax2 = plt.subplot(gs[1, 0])
+        ax2.plot(reservoir.snowpack['new_melt_fnf'])
+        fig.suptitle(reservoir.key)
+        plt.show()
+        plt.close()
+
+    def plot_monthly_pair(self, left_values, right_values, title, left_title=None, right_title=None):
+        # two (12 x years) tables side by side, one row for each month
+        fig = plt.figure()
+        gs = gridspec.GridSpec(12, 2)
+        for monthcounter in range(0, 12):
+            ax1 = plt.subplot(gs[monthcounter, 0])
+            ax1.plot(left_values[monthcounter])
+            ax1.set_ylabel(self.monthlist[monthcounter])
+            if monthcounter == 0 and left_title is not None:
+                ax1.set_title(left_title)
+            ax1 = plt.subplot(gs[monthcounter, 1])
+            ax1.plot(right_values[monthcounter])
+            if monthcounter == 0 and right_title is not None:
+                ax1.set_title(right_title)
+        fig.suptitle(title)
+        plt.show()
+        plt.close()
+
+    def plot_monthly_series(self, monthly_values, title):
+        fig = plt.figure()
+        for monthcounter in range(0, 12):
+            ax1 = fig.add_subplot(6, 2, monthcounter + 1)
+            ax1.plot(monthly_values[monthcounter])
+            ax1.set_ylabel(self.monthlist[monthcounter])
+        fig.suptitle(title)
+        plt.show()
+        plt.close()
+
+    def plot_regression(self, ax1, independent, dependent, coef):
+        ax1.scatter(independent, dependent, s=50, c='red', edgecolor='none', alpha=0.7)
+        ax1.plot([np.min(independent), np.max(independent)],
+                 [coef[1] + np.min(independent) * coef[0], coef[1] + np.max(independent) * coef[0]])
+
+    def find_month_subplot(self, gs, monthcounter):
+        # months in 3 columns below a full-width timeseries plot
+        if monthcounter < 4:
+            return plt.subplot(gs[monthcounter + 1, 0])
+        elif monthcounter < 8:
+            return plt.subplot(gs[monthcounter - 3, 1])
+        return plt.subplot(gs[monthcounter - 7, 2])
+
+    def make_daily_timeseries(self, numYears, start_date, end_date, start_year, first_leap, plot_key, file_folder, file_name,
+                              write_csv=True):
+        dates_for_df, output_days = self.find_daily_output(numYears, start_date, end_date, start_year, first_leap)
+        df_for_output = self.make_output_df(dates_for_df, output_days)
+        if write_csv:
+            df_for_output.to_csv(file_folder + 'cord-data-' + file_name, index=True, index_label='datetime')
 
         for reservoir in self.reservoir_list:
             if plot_key == reservoir.key:
@@ -1305,6 +795,187 @@ class Inputter():
                 plt.show()
                 plt.close()
 
+        return df_for_output
+
+    def find_daily_output(self, numYears, start_date, end_date, start_year, first_leap):
+        # daily values of each reservoir data type, snowpack & delta series from the new monthly flows
+        # (w/ a realization axis in front if self.number_realizations is set)
+        # returns the dates of the complete water years in the output, and their position in the daily arrays
+        dates_for_output = pd.date_range(start=start_date, end=end_date, freq='D')
+        output_day_year = dates_for_output.dayofyear
+        output_year = dates_for_output.year
+        output_month = dates_for_output.month
+        output_day_month = dates_for_output.day
+        output_dowy = water_day(output_day_year, output_year)
+
+        numdays_output = len(dates_for_output)
+        for reservoir in self.reservoir_list:
+            reservoir.daily_output_data = {}
+            reservoir.k_close_wateryear = {}
+        self.k_close_wateryear = {}
+        self.daily_output_data = {}
+
+        # output days are split into month blocks - the analog (closest historical) year is picked once for each block
+        # and the daily values are the analog year's daily pattern scaled to the new monthly total
+        output_monthcounter = np.asarray(output_month) - 1
+        output_yearcounter = np.asarray(output_year) - start_year
+        output_daycounter = np.asarray(output_day_month) - 1
+        output_daycounter[(output_monthcounter == 1) & (output_daycounter == 28)] = 27
+        output_dowy = np.asarray(output_dowy)
+        block_start = np.ones(numdays_output, dtype=bool)
+        block_start[1:] = output_monthcounter[1:] != output_monthcounter[:-1]
+        block_id = np.cumsum(block_start) - 1
+        block_month = output_monthcounter[block_start]
+        block_year = output_yearcounter[block_start]
+        block_leap_non_leap = np.where(block_year % 4 == first_leap, self.leap_year, self.non_leap_year)
+        block_days_in_month = self.days_in_month[block_leap_non_leap, block_month]
+        day_slots = (output_monthcounter, output_daycounter, block_id)
+        if self.number_realizations is None:
+            output_shape = (numdays_output,)
+        else:
+            output_shape = (self.number_realizations, numdays_output)
+
+        for reservoir in self.reservoir_list:
+            for data_type in self.data_type_list:
+                block_flows = reservoir.monthly_new[data_type]['flows'][..., block_month, block_year]
+                analog_year = self.find_analog_years(reservoir.monthly[data_type]['sorted'],
+                                                     reservoir.monthly[data_type]['sort_index'], block_month, block_flows)
+                reservoir.k_close_wateryear[data_type] = analog_year[..., -1]
+                # (new fnf is the same in each realization)
+                reservoir.daily_output_data[data_type] = np.broadcast_to(
+                    self.disaggregate_monthly(reservoir.monthly[data_type], block_flows, analog_year, block_month,
+                                              block_days_in_month, day_slots), output_shape)
+
+            # snowpack follows the analog year of the apr-jul fnf (in oct-dec, the fnf of the following year)
+            this_year_fnf_melt = np.zeros(len(block_month))
+            melt_year = np.where(block_month < 9, block_year, block_year + 1)
+            has_melt_year = (block_month < 9) | (block_year < (numYears - 1))
+            for melt_month in range(3, 7):
+                this_year_fnf_melt[has_melt_year] += reservoir.monthly_new['fnf']['flows'][melt_month][
+                    melt_year[has_melt_year]]
+            snow_analog = np.minimum(np.searchsorted(reservoir.monthly['snowmelt_sorted'], this_year_fnf_melt,
+                                                     side='right'), len(reservoir.monthly['snowmelt_sorted']) - 1)
+            snow_analog = reservoir.monthly['snowmelt_sort_index'][snow_analog].astype(int)
+            reservoir.k_close_wateryear['snow'] = snow_analog[-1]
+            reservoir.daily_output_data['snow'] = np.broadcast_to(
+                reservoir.snowpack['pred_max'][output_yearcounter] * reservoir.snowpack['daily'][
+                    snow_analog[block_id], output_dowy], output_shape)
+
+        for deltaname in self.delta_list:
+            block_flows = self.monthly_new[deltaname]['gains'][..., block_month, block_year]
+            analog_year = self.find_analog_years(self.monthly[deltaname]['sorted'], self.monthly[deltaname]['sort_index'],
+                                                 block_month, block_flows)
+            self.k_close_wateryear[deltaname] = analog_year[..., -1]
+            self.daily_output_data[deltaname] = self.disaggregate_monthly(self.monthly[deltaname], block_flows,
+                                                                          analog_year, block_month,
+                                                                          block_days_in_month, day_slots)
+
+        for start_counter in range(0, numdays_output):
+            monthcounter = output_month[start_counter]
+            daycounter = output_day_month[start_counter]
+            if monthcounter == 10 and daycounter == 1:
+                break
+        for end_counter in range(numdays_output - 1, 0, -1):
+            monthcounter = output_month[end_counter]
+            daycounter = output_day_month[end_counter]
+            if monthcounter == 9 and daycounter == 30:
+                break
+            # print(end_counter, end=" ")
+            # print(monthcounter, end=" ")
+            # print(daycounter)
+
+        dates_for_df = dates_for_output[start_counter:(end_counter + 1)]
+        return dates_for_df, slice(start_counter, end_counter + 1)
+
+    def make_output_df(self, dates_for_df, output_days, realization=None):
+        # input table (in the format read by Model) for one realization of the daily output
+        if realization is None:
+            output_slice = output_days
+        else:
+            output_slice = (realization, output_days)
+        df_for_output = pd.DataFrame(index=dates_for_df)
+        for reservoir in self.reservoir_list:
+            reservoir.daily_df_data = {}
+            reservoir.daily_df_data['snow'] = reservoir.daily_output_data['snow'][output_slice]
+            for data_type in self.data_type_list:
+                reservoir.daily_df_data[data_type] = reservoir.daily_output_data[data_type][output_slice]
+                if data_type == 'fnf':
+                    multiplier = 1000.0
+                elif data_type == 'fci':
+                    multiplier = 1.0
+                else:
+                    multiplier = 1.0 / cfs_tafd
+                df_for_output['%s_%s' % (reservoir.key, data_type)] = pd.Series(
+                    reservoir.daily_df_data[data_type] * multiplier, index=df_for_output.index)
+            df_for_output['%s_snow' % (reservoir.key)] = pd.Series(reservoir.daily_df_data['snow'],
+                                                                   index=df_for_output.index)
+        self.daily_df_data = {}
+        for deltaname in self.delta_list:
+            self.daily_df_data[deltaname] = self.daily_output_data[deltaname][output_slice]
+            multiplier = 1.0 / cfs_tafd
+            if deltaname == 'SAC' or deltaname == 'SJ' or deltaname == 'EAST':
+                df_for_output['%s_gains' % deltaname] = pd.Series(self.daily_df_data[deltaname] * multiplier,
+                                                                  index=df_for_output.index)
+            elif deltaname == 'depletions':
+                df_for_output['delta_depletions'] = pd.Series(self.daily_df_data[deltaname] * multiplier,
+                                                              index=df_for_output.index)
+            else:
+                df_for_output['%s_pump' % deltaname] = pd.Series(self.daily_df_data[deltaname] * multiplier,
+                                                                 index=df_for_output.index)
+        return df_for_output
+
+    def find_analog_years(self, sorted_flows, sort_index, block_month, block_flows):
+        # closest historical year to each monthly flow - the first year (in sorted order) with a larger flow in that month,
+        # or the year with the largest flow if there isn't one (block_flows can have a realization axis in front)
+        analog_year = np.zeros(np.shape(block_flows), dtype=int)
+        for monthcounter in range(0, 12):
+            this_month = block_month == monthcounter
+            sorted_search = np.minimum(np.searchsorted(sorted_flows[monthcounter], block_flows[..., this_month],
+                                                       side='right'), len(sorted_flows[monthcounter]) - 1)
+            analog_year[..., this_month] = sort_index[monthcounter][sorted_search]
+        return analog_year
+
+    def disaggregate_monthly(self, monthly, block_flows, analog_year, block_month, block_days_in_month, day_slots):
+        # daily values from the monthly total of each month block, using the (normalized) daily values & baseline of its analog year
+        output_monthcounter, output_daycounter, block_id = day_slots
+        daily_pattern = np.zeros((12, monthly['baseline_value'].shape[1], 31))
+        for monthcounter, monthname in enumerate(self.monthlist):
+            daily_pattern[monthcounter, :, 0:monthly['daily'][monthname].shape[1]] = monthly['daily'][monthname]
+        block_baseline = monthly['baseline_value'][block_month, analog_year]
+        block_total = block_flows - block_baseline * block_days_in_month
+        return block_total[..., block_id] * daily_pattern[output_monthcounter, analog_year[..., block_id],
+                                                          output_daycounter] + block_baseline[..., block_id]
+
+    def find_monthly_slots(self):
+        # (month, water year, day) of each timestep in the monthly/daily tables - feb. 29th is counted as feb. 28th
+        month_index = np.asarray(self.month) - 1
+        day_index = np.asarray(self.day_month) - 1
+        day_index[(month_index == 1) & (day_index == 28)] = 27
+        return month_index, np.asarray(self.water_year), day_index
+
+    def add_to_monthly(self, flows, daily, daily_values, monthly_values):
+        # adds a daily record into monthly totals (12 x years) and the daily tables of each month (years x days in month)
+        # np.add.at adds the values in timestep order, the same way as a daily loop
+        month_index, wateryear, day_index = self.find_monthly_slots()
+        np.add.at(flows, (month_index, wateryear), monthly_values)
+        for monthcounter, monthname in enumerate(self.monthlist):
+            this_month = month_index == monthcounter
+            np.add.at(daily[monthname], (wateryear[this_month], day_index[this_month]), daily_values[this_month])
+
+    def normalize_daily(self, flows, daily, baseline_value):
+        # baseline of each month is the min daily value (max if the monthly total is negative) when the month has both
+        # positive and negative daily values, otherwise zero - daily values are then scaled to the monthly total above the baseline
+        for monthcounter, monthname in enumerate(self.monthlist):
+            month_daily = daily[monthname]
+            month_flows = flows[monthcounter]
+            mixed_signs = np.any(month_daily > 0.0, axis=1) & np.any(month_daily < 0.0, axis=1)
+            baseline_value[monthcounter] = np.where(mixed_signs, np.where(month_flows > 0.0, np.min(month_daily, axis=1),
+                                                                          np.max(month_daily, axis=1)), 0.0)
+            month_baseline = baseline_value[monthcounter]
+            month_total = month_flows - month_baseline * self.days_in_month[1:(self.number_years + 1), monthcounter]
+            has_flow = np.power(month_flows, 2) > 0.0
+            month_daily[has_flow] = (month_daily[has_flow] - month_baseline[has_flow, None]) / month_total[has_flow, None]
+
     def get_flow_ratios(self, inf, fnf):
         ratios = np.zeros(self.number_years)
         for year_counter in range(0, self.number_years):
@@ -1315,57 +986,149 @@ class Inputter():
 
         return ratios
 
-    def make_regression(self, independent, dependent, use_zeros):
-
-        if sum(independent) == 0.0:
-            coef = np.zeros(2)
-            coef[0] = 0.0
-            coef[1] = np.mean(dependent)
-        else:
-            if use_zeros == 'no':
-                coef = np.polyfit(independent[(independent > 0) & (dependent > 0)],
-                                  dependent[(independent > 0) & (dependent > 0)], 1)
-            else:
-                coef = np.polyfit(independent, dependent, 1)
-
-        predicted_deviation = np.zeros(len(independent))
-        for y in range(0, len(independent)):
-            predicted_deviation[y] = dependent[y] - coef[0] * independent[y] - coef[1]
+    def make_regression(self, independent, dependent, use_zeros, valid=None):
+        # least-squares line (coef = [slope, intercept]) through each row of independent/dependent, along the last axis
+        # (e.g., one regression for each month of a 12 x years table), returns coef & the deviations from the line
+        # valid - values used in each regression (all of them by default), deviations of the others are 0
+        # use_zeros = 'no' fits only the values where both series are positive
+        independent = np.asarray(independent, dtype=float)
+        dependent = np.asarray(dependent, dtype=float)
+        if valid is None:
+            valid = np.ones(independent.shape, dtype=bool)
+        fit_values = valid
+        if use_zeros == 'no':
+            fit_values = valid & (independent > 0) & (dependent > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            num_fit = np.sum(fit_values, axis=-1)
+            independent_mean = np.sum(np.where(fit_values, independent, 0.0), axis=-1) / num_fit
+            dependent_mean = np.sum(np.where(fit_values, dependent, 0.0), axis=-1) / num_fit
+            independent_dev = np.where(fit_values, independent - independent_mean[..., None], 0.0)
+            dependent_dev = np.where(fit_values, dependent - dependent_mean[..., None], 0.0)
+            slope = np.sum(independent_dev * dependent_dev, axis=-1) / np.sum(independent_dev * independent_dev,
+                                                                              axis=-1)
+            intercept = dependent_mean - slope * independent_mean
+            # w/o a predictor (all zeros), the regression is the mean value
+            no_predictor = np.all(np.where(valid, independent, 0.0) == 0.0, axis=-1)
+            valid_mean = np.sum(np.where(valid, dependent, 0.0), axis=-1) / np.sum(valid, axis=-1)
+        coef = np.stack([np.where(no_predictor, 0.0, slope), np.where(no_predictor, valid_mean, intercept)], axis=-1)
+        predicted_deviation = np.where(valid, dependent - coef[..., 0:1] * independent - coef[..., 1:2], 0.0)
 
         return coef, predicted_deviation
 
     def whiten_data(self, data):
-        residuals = np.zeros(len(data))
-        ssq = 0.0
-        for x in range(0, len(data)):
-            ssq += np.power(data[x], 2)
-        if ssq > 0.0:
-            data_mean = np.mean(data)
-            data_std = np.std(data)
-        else:
-            data_mean = 0.0
-            data_std = 1.0
-        if data_std > 0.0:
-            for x in range(0, len(data)):
-                residuals[x] = (data[x] - data_mean) / data_std
-        else:
-            for x in range(0, len(data)):
-                residuals[x] = (data[x] - data_mean)
+        # standardized values, mean & std along the last axis (e.g., each month of a 12 x years table)
+        # all-zero rows keep mean 0 & std 1, constant rows are only shifted by their mean
+        data = np.asarray(data, dtype=float)
+        has_data = np.sum(np.power(data, 2), axis=-1) > 0.0
+        data_mean = np.where(has_data, np.mean(data, axis=-1), 0.0)
+        data_std = np.where(has_data, np.std(data, axis=-1), 1.0)
+        residuals = (data - data_mean[..., None]) / np.where(data_std > 0.0, data_std, 1.0)[..., None]
 
         return residuals, data_mean, data_std
 
+    def find_log_flows(self, flows):
+        # log of monthly flows, 0 where there is no flow
+        return np.log(np.where(flows > 0.0, flows, 1.0))
+
+    def find_positive_log_flows(self, flows):
+        # log of the months (rows) w/o any zero or negative flows, the other months are unchanged
+        # returns the values & use_log for each month
+        use_log = ~np.any(flows <= 0.0, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(use_log[:, None], np.log(flows), flows)
+        return values, ['yes' if x else 'no' for x in use_log]
+
+    def whiten_by_moments(self, flows, white_mean, white_std, use_log):
+        # new monthly flows (12 x years) whitened w/ the historical moments of each month (of the log of flows where use_log)
+        values = np.where(use_log[:, None], self.find_log_flows(flows), flows)
+        return (values - white_mean[:, None]) / white_std[:, None]
+
+    def predict_whitened(self, coef, predictor):
+        # whitened values from the monthly regressions (coef, 12 x 2) on whitened predictors (12 x years)
+        return coef[:, 1][:, None] + coef[:, 0][:, None] * predictor
+
+    def find_lagged_residuals(self, whitened_residuals):
+        # each month's residuals (12 x years) w/ the previous month's (Jan w/ Dec of the same year)
+        # Nov is paired w/ the previous year's Oct, so the last year of Nov is not used
+        prev_month_res = np.roll(whitened_residuals, 1, axis=0)
+        this_month_res = np.array(whitened_residuals, dtype=float)
+        this_month_res[10, :-1] = whitened_residuals[10, 1:]
+        valid_res = np.ones(np.shape(whitened_residuals), dtype=bool)
+        valid_res[10, -1] = False
+
+        return prev_month_res, this_month_res, valid_res
+
+    def find_ar_coefficients(self, whitened_residuals):
+        # AR(1) coefficients & AR residuals for each month
+        prev_month_res, this_month_res, valid_res = self.find_lagged_residuals(whitened_residuals)
+        return self.make_regression(prev_month_res, this_month_res, 'yes', valid_res)
+
+    def draw_residual_indices(self, series_monthly, start_month, numYears, random_streams):
+        # random historical residual to start each AR series from & the AR residuals drawn for each month (series x realizations)
+        # series draw from each random stream in turn, the same order as simulating them one at a time
+        random_start_integer = []
+        random_int = []
+        for monthly in series_monthly:
+            num_start = len(monthly['whitened_residuals'][start_month - 1])
+            num_ar = len(monthly['AR_residuals'][0])
+            if random_streams is None:
+                random_start_integer.append([np.random.randint(num_start)])
+                random_int.append([[np.random.randint(num_ar) for x in range(0, numYears * 12)]])
+            else:
+                random_start_integer.append([x.integers(num_start) for x in random_streams])
+                random_int.append([x.integers(num_ar, size=numYears * 12) for x in random_streams])
+
+        return np.array(random_start_integer), np.array(random_int)
+
+    def simulate_residuals(self, series_monthly, start_month, numYears, random_streams):
+        # AR(1) whitened residuals for each series in series_monthly (series x realizations x 12 x years, w/o the realization axis
+        # if random_streams is None), starting from a random historical residual in start_month
+        # the AR residual added in each month is drawn from the historical AR residuals
+        random_start_integer, random_int = self.draw_residual_indices(series_monthly, start_month, numYears,
+                                                                      random_streams)
+        series_index = np.arange(len(series_monthly))[:, None]
+        ar_coef = np.array([x['AR_coef'] for x in series_monthly])
+        ar_residuals = np.array([x['AR_residuals'] for x in series_monthly])
+        start_residuals = np.array([x['whitened_residuals'][start_month - 1] for x in series_monthly])
+        whitened_residuals = np.zeros(random_start_integer.shape + (12, numYears))
+        prev_residual = start_residuals[series_index, random_start_integer]
+        for yearcount in range(0, numYears):
+            for monthcount in range(0, 12):
+                current_month = monthcount + start_month - 1
+                if current_month >= 12:
+                    current_month -= 12
+                new_residual = ar_coef[:, current_month, 0][:, None] * prev_residual + ar_coef[:, current_month, 1][:, None]
+                ar_residual = ar_residuals[series_index, current_month, random_int[:, :, monthcount + yearcount * 12]]
+                whitened_residuals[:, :, current_month, yearcount] = new_residual + ar_residual
+                prev_residual = new_residual + ar_residual
+
+        if random_streams is None:
+            return whitened_residuals[:, 0]
+        return whitened_residuals
+
+    def add_whitened_error(self, monthly, whitened, whitened_residuals):
+        # adds the (scaled) residuals to whitened predictions - months are the 2nd to last axis, w/ an optional realization axis in front
+        # months that are not log-transformed are limited to the historical range
+        whitened = whitened + (whitened_residuals * monthly['res_std'][:, None] + monthly['res_mean'][:, None])
+        use_limits = (np.asarray(monthly['use_log']) == 'no')[:, None]
+        whitened = np.where(use_limits & (whitened > monthly['hist_max'][:, None]), monthly['hist_max'][:, None], whitened)
+        whitened = np.where(use_limits & (whitened < monthly['hist_min'][:, None]), monthly['hist_min'][:, None], whitened)
+
+        return whitened
+
+    def unwhiten_data(self, monthly, whitened):
+        # monthly flows from whitened values, using the historical moments (and log transform) of each month
+        flows = whitened * monthly['white_std'][:, None] + monthly['white_mean'][:, None]
+        use_log = np.asarray(monthly['use_log']) == 'yes'
+        flows[..., use_log, :] = np.exp(flows[..., use_log, :])
+
+        return flows
+
     def unfold_series(self, annual_cycle, start_cycle):
+        # (cycle x year) table as a single (n x 1) series, starting each year from start_cycle (1-indexed)
         array_shape = np.shape(annual_cycle)
-        series_length = array_shape[0] * array_shape[1]
-        new_series = np.zeros((series_length, 1))
-        for y in range(0, array_shape[1]):
-            for x in range(0, array_shape[0]):
-                cycle_value = x + start_cycle - 1
-                if cycle_value >= array_shape[0]:
-                    cycle_value -= array_shape[0]
-                new_series[x + y * array_shape[0]] = annual_cycle[cycle_value][y]
-
-        return new_series
+        cycle_value = (np.arange(array_shape[0]) + start_cycle - 1) % array_shape[0]
+        return np.asarray(annual_cycle)[cycle_value].T.reshape(-1, 1)
 
     def backcast_ar(self, residuals, lagged_residuals):
         timestep = len(residuals)
@@ -1381,3 +1144,34 @@ class Inputter():
 
         return values
 
+
+def read_realization(file_name, realization):
+    # one realization from a file written by Inputter.run_realizations, in the same format as the cord-data-*.csv inputs
+    df = pd.read_hdf(file_name, 'inputs', where='realization == %d' % realization)
+    return df.drop(columns=['realization'])
+
+
+def flatten_state(flat_state, prefix, state):
+    # adds the arrays in a nested dictionary to flat_state, w/ keys joined by '/'
+    for key in state:
+        if isinstance(state[key], dict):
+            flatten_state(flat_state, prefix + '/' + key, state[key])
+        else:
+            flat_state[prefix + '/' + key] = np.asarray(state[key])
+
+
+def unflatten_state(flat_state):
+    # nested dictionaries from flatten_state (lists of strings, e.g. use_log, go back to lists)
+    state = {}
+    for flat_key in flat_state.files:
+        if flat_key in ['input_hash', 'fit_format_version']:
+            continue
+        key_list = flat_key.split('/')
+        nested_state = state
+        for key in key_list[:-1]:
+            nested_state = nested_state.setdefault(key, {})
+        value = flat_state[flat_key]
+        if value.dtype.kind == 'U':
+            value = [str(x) for x in value]
+        nested_state[key_list[-1]] = value
+    return state
@@ -6,37 +6,58 @@ import calendar
 import matplotlib.pyplot as plt
 from datetime import datetime
 from .reservoir import Reservoir
+from .reservoirbank import ReservoirBank
 from .delta import Delta
 from .district import District
 from .contract import Contract
 from .canal import Canal
 from .waterbank import Waterbank
 from .util import *
+from .results import RecordingSpec
+from .regulations import load_regulation_schedule
+
+
+##read model inputs from a csv file, or use inputs that are already in memory
+def load_input_data(input_data, input_index = None):
+  if isinstance(input_data, pd.DataFrame):
+    return input_data
+  elif isinstance(input_data, dict):
+    if input_index is None:
+      raise ValueError('input data from a dict of arrays needs a date index')
+    return pd.DataFrame(input_data, index = pd.DatetimeIndex(input_index))
+  return pd.read_csv(input_data, index_col=0, parse_dates=True)
 
 
 class Model():
+  #canal flows used in the projection release tables (pipeline.find_release_results) - always recorded daily, whatever the recording spec
+  release_canal_flows = {'FKC': ['OFK'], 'MDC': ['MAD'], 'KNR': ['CWY'], 'KWR': ['OKW'], 'TLR': ['OTL'], 'CAA': ['OSW', 'WRM', 'SOC']}
 
-  def __init__(self, input_data_file, expected_release_datafile, sd, model_mode):
+  def __init__(self, input_data, expected_release_datafile, sd, model_mode, recording_spec = None, input_index = None):
     ##Set model dataset & index length
-    self.df = pd.read_csv(input_data_file, index_col=0, parse_dates=True)
+    ##input_data can be a csv file, a DataFrame (e.g., from Inputter.run_routine), or a dict of arrays w/ a date index (input_index)
+    self.df = load_input_data(input_data, input_index)
     self.model_mode = model_mode
     self.index = self.df.index
     self.T = len(self.df)
-    self.day_year = self.index.dayofyear
-    self.day_month = self.index.day
-    self.month = self.index.month
-    self.year = self.index.year
+    ##output timeseries recorded by districts, contracts, canals & waterbanks (default is everything, daily)
+    if recording_spec is None:
+      recording_spec = RecordingSpec()
+    self.recording_spec = recording_spec.set_index(self.index)
+    self.day_year = np.asarray(self.index.dayofyear)
+    self.day_month = np.asarray(self.index.day)
+    self.month = np.asarray(self.index.month)
+    self.year = np.asarray(self.index.year)
     self.starting_year = self.index.year[0]
     self.ending_year = self.index.year[-1]
     self.number_years = self.ending_year - self.starting_year
     self.dowy = water_day(self.day_year, self.year)
     self.water_year = water_year(self.month, self.year, self.starting_year)
-    self.df_short = pd.read_csv(expected_release_datafile, index_col=0, parse_dates=True)
+    self.df_short = load_input_data(expected_release_datafile)
     self.T_short = len(self.df_short)
-    self.short_day_year = self.df_short.index.dayofyear
-    self.short_day_month = self.df_short.index.day
-    self.short_month = self.df_short.index.month
-    self.short_year = self.df_short.index.year
+    self.short_day_year = np.asarray(self.df_short.index.dayofyear)
+    self.short_day_month = np.asarray(self.df_short.index.day)
+    self.short_month = np.asarray(self.df_short.index.month)
+    self.short_year = np.asarray(self.df_short.index.year)
     self.short_starting_year = self.short_year[0]
     self.short_ending_year = self.index.year[-1]
     self.short_number_years = self.short_ending_year - self.short_starting_year
@@ -48,6 +69,28 @@ class Model():
     self.days_in_month = days_in_month(year_list, self.leap)
     self.dowy_eom = dowy_eom(year_list, self.leap)
     self.non_leap_year = first_non_leap_year(self.dowy_eom)
+    self.san_luis_schedule_key = None
+    ##dated regulation & infrastructure changes over the historical period (only used in validation mode)
+    ##scenarios can add events w/ self.regulation_schedule.add_events (see cord/regulations.py)
+    self.regulation_schedule = load_regulation_schedule('cord/regulations/historical_events.json')
+    self.regulation_schedule.set_calendar(self.index, self.year, self.dowy)
+
+  def check_daily_inputs(self):
+    ##debug check, run after the initialization routines - inputs read in the daily loop should all be numpy arrays,
+	##pandas objects are very slow to index one timestep at a time.  only the date index & input dataframes (used for setup/output) are skipped
+    pandas_inputs = []
+    object_list = [('model', self)]
+    for k, v in vars(self).items():
+      if isinstance(v, (Reservoir, Delta, District, Contract, Canal, Waterbank)):
+        object_list.append((k, v))
+    for object_name, x in object_list:
+      for k, v in vars(x).items():
+        if k in ['index', 'df', 'df_short']:
+          continue
+        if isinstance(v, (pd.Series, pd.DataFrame, pd.Index)):
+          pandas_inputs.append('%s.%s' % (object_name, k))
+    if len(pandas_inputs) > 0:
+      raise TypeError('pandas objects used as daily inputs: %s' % ', '.join(pandas_inputs))
 
 
 
@@ -84,6 +127,12 @@ class Model():
     # self.delta.forecastSRI (self.T x 1) - forecasts for sacramento river index
     self.find_running_WYI()
     print('Find Water Year Indicies, time ', datetime.now() - startTime)
+    # classify water year types from the forecast indicies (the parts that don't depend on reservoir storage)
+    # generates:
+    # self.delta.forecastSCWYT_daily, self.delta.forecastSJWYT_daily (self.T x 1) - sacramento & san joaquin water year types
+    # x.forecastWYT_daily (self.T x 1) - reservoir water year types (shasta, oroville, folsom (after day 150), donpedro, exchequer)
+    # x.fnf_index (self.T x 1) - flow components of the yuba & new melones indicies (storage is added in calc_wytypes)
+    self.find_wyt_series()
 
     ######
     # calculate expected 'unstored' pumping at the delta (for predictions into San Luis)
@@ -95,6 +144,11 @@ class Model():
     print('Find Delta Gains, time ', datetime.now() - startTime)
     if self.model_mode != 'validation':
       self.set_regulations_current_north()
+    ######
+    # group the northern reservoirs into banks that are operated together in simulate_north
+    # (reservoir objects are views of the bank arrays)
+    self.sacramento_bank = ReservoirBank([self.shasta, self.oroville, self.yuba, self.folsom])
+    self.san_joaquin_bank = ReservoirBank([self.newmelones, self.donpedro, self.exchequer])
     return self.delta.omr_rule_start, self.delta.max_tax_free
     ######################################################################################
 
@@ -226,16 +280,16 @@ class Model():
       flow_estimates = pd.read_csv('cord/data/input/no_res_preprocess_daily.csv', index_col=0, parse_dates=True)
       std_estimates = pd.read_csv('cord/data/input/no_res_preprocess_annual.csv')
       for x in reservoir_list:
-        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key]##FNF, OCT-MAR, LINEAR COEF
-        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key]##FNF, APR-JUL, LINEAR COEF
-        x.rainflood_inf = flow_estimates['%s_raininf' % x.key]##INF, OCT-MAR, LINEAR COEF
-        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key]##INF, APR-JUL, LINEAR COEF
-        x.baseline_inf = flow_estimates['%s_baseinf' % x.key]##INF, AUG-SEPT, LINEAR COEF
-        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key]##FNF, OCT-MAR, STD
-        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key]##FNF, APR-JUL, STD
-        x.raininf_stds = std_estimates['%s_raininfstd' % x.key]##INF, OCT-MAR, STD
-        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key]##INF, APR-JUL, STD
-        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key]##INF, AUG-SEPT, STD
+        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key].values##FNF, OCT-MAR, LINEAR COEF
+        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key].values##FNF, APR-JUL, LINEAR COEF
+        x.rainflood_inf = flow_estimates['%s_raininf' % x.key].values##INF, OCT-MAR, LINEAR COEF
+        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key].values##INF, APR-JUL, LINEAR COEF
+        x.baseline_inf = flow_estimates['%s_baseinf' % x.key].values##INF, AUG-SEPT, LINEAR COEF
+        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key].values##FNF, OCT-MAR, STD
+        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key].values##FNF, APR-JUL, STD
+        x.raininf_stds = std_estimates['%s_raininfstd' % x.key].values##INF, OCT-MAR, STD
+        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key].values##INF, APR-JUL, STD
+        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key].values##INF, AUG-SEPT, STD
       ###Flow shapes are regressions that determine % of remaining flow in a period (Oct-Mar; Apr-Jul; Aug-Sept)
 	  ###that is expected to come, regressed against the total flow already observed in that period
 	  ###regressions are done for each reservoir, and values are calculated for each month (i.e., 33% of remaining Apr-Jul flow comes in May)
@@ -264,16 +318,16 @@ class Model():
       flow_estimates = pd.read_csv('cord/data/input/no_res_preprocess_simulation_daily.csv')
       std_estimates = pd.read_csv('cord/data/input/no_res_preprocess_simulation_annual.csv')
       for x in reservoir_list:
-        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key]##FNF, OCT-MAR, LINEAR COEF
-        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key]##FNF, APR-JUL, LINEAR COEF
-        x.rainflood_inf = flow_estimates['%s_raininf' % x.key]##INF, OCT-MAR, LINEAR COEF
-        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key]##INF, APR-JUL, LINEAR COEF
-        x.baseline_inf = flow_estimates['%s_baseinf' % x.key]##INF, AUG-SEPT, LINEAR COEF
-        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key]##FNF, OCT-MAR, STD
-        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key]##FNF, APR-JUL, STD
-        x.raininf_stds = std_estimates['%s_raininfstd' % x.key]##INF, OCT-MAR, STD
-        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key]##INF, APR-JUL, STD
-        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key]##INF, AUG-SEPT, STD
+        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key].values##FNF, OCT-MAR, LINEAR COEF
+        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key].values##FNF, APR-JUL, LINEAR COEF
+        x.rainflood_inf = flow_estimates['%s_raininf' % x.key].values##INF, OCT-MAR, LINEAR COEF
+        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key].values##INF, APR-JUL, LINEAR COEF
+        x.baseline_inf = flow_estimates['%s_baseinf' % x.key].values##INF, AUG-SEPT, LINEAR COEF
+        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key].values##FNF, OCT-MAR, STD
+        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key].values##FNF, APR-JUL, STD
+        x.raininf_stds = std_estimates['%s_raininfstd' % x.key].values##INF, OCT-MAR, STD
+        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key].values##INF, APR-JUL, STD
+        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key].values##INF, AUG-SEPT, STD
 	  
 	  ###Flow shapes are regressions that determine % of remaining flow in a period (Oct-Mar; Apr-Jul; Aug-Sept)
 	  ###that is expected to come, regressed against the total flow already observed in that period
@@ -281,6 +335,13 @@ class Model():
       #df_flow_shape_no = pd.DataFrame()
       for x in reservoir_list:
         x.create_flow_shapes(self.df_short)
+    #30-day trailing fnf totals in the Sacramento & San Joaquin basins (used to project delta gains)
+    self.sac_running_fnf = 0.0
+    for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom]:
+      self.sac_running_fnf = self.sac_running_fnf + trailing_window_sum(reservoir.fnf, 30, 0)
+    self.sj_running_fnf = 0.0
+    for reservoir in [self.newmelones, self.donpedro, self.exchequer, self.millerton]:
+      self.sj_running_fnf = self.sj_running_fnf + trailing_window_sum(reservoir.fnf, 30, 0)
     #########################################################################################
 
   def initialize_delta_ops(self):
@@ -363,16 +424,16 @@ class Model():
 	  #### Find regression information for all 8 reservoirs 
 	  ### 5 sets of daily linear coefficients & standard devations at each reservoir - (2x2) FNF/INFLOWS x OCT-MAR/APR-JUL + (1) INFLOWS AUG-SEPT
       for x in [self.pineflat, self.kaweah, self.success, self.isabella, self.millerton]:
-        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key]#FNF, Oct-Mar, Linear coefficients
-        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key]#FNF, Apr-Jul, Linear coefficients
-        x.rainflood_inf = flow_estimates['%s_raininf' % x.key]#INF, Oct-Mar, Linear coefficients
-        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key]#INF, Apr-Jul, Linear coefficients
-        x.baseline_inf = flow_estimates['%s_baseinf' % x.key]#INF, Aug-Sept, Linear coefficients
-        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key]#FNF, Oct-Mar, STD
-        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key]#FNF, Apr-Jul, STD
-        x.raininf_stds = std_estimates['%s_raininfstd' % x.key]#INF, Oct-Mar, STD
-        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key]#INF, Apr-Jul, STD
-        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key]#INF, Aug-Sept, STD
+        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key].values#FNF, Oct-Mar, Linear coefficients
+        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key].values#FNF, Apr-Jul, Linear coefficients
+        x.rainflood_inf = flow_estimates['%s_raininf' % x.key].values#INF, Oct-Mar, Linear coefficients
+        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key].values#INF, Apr-Jul, Linear coefficients
+        x.baseline_inf = flow_estimates['%s_baseinf' % x.key].values#INF, Aug-Sept, Linear coefficients
+        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key].values#FNF, Oct-Mar, STD
+        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key].values#FNF, Apr-Jul, STD
+        x.raininf_stds = std_estimates['%s_raininfstd' % x.key].values#INF, Oct-Mar, STD
+        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key].values#INF, Apr-Jul, STD
+        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key].values#INF, Aug-Sept, STD
 		
       ###Flow shapes are regressions that determine % of remaining flow in a period (Oct-Mar; Apr-Jul; Aug-Sept)
 	  ###that is expected to come, regressed against the total flow already observed in that period
@@ -402,16 +463,16 @@ class Model():
       flow_estimates = pd.read_csv('cord/data/input/so_res_preprocess_simulation_daily.csv')
       std_estimates = pd.read_csv('cord/data/input/so_res_preprocess_simulation_annual.csv')
       for x in reservoir_list:
-        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key]##FNF, OCT-MAR, LINEAR COEF
-        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key]##FNF, APR-JUL, LINEAR COEF
-        x.rainflood_inf = flow_estimates['%s_raininf' % x.key]##INF, OCT-MAR, LINEAR COEF
-        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key]##INF, APR-JUL, LINEAR COEF
-        x.baseline_inf = flow_estimates['%s_baseinf' % x.key]##INF, AUG-SEPT, LINEAR COEF
-        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key]##FNF, OCT-MAR, STD
-        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key]##FNF, APR-JUL, STD
-        x.raininf_stds = std_estimates['%s_raininfstd' % x.key]##INF, OCT-MAR, STD
-        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key]##INF, APR-JUL, STD
-        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key]##INF, AUG-SEPT, STD
+        x.rainflood_fnf = flow_estimates['%s_rainfnf' % x.key].values##FNF, OCT-MAR, LINEAR COEF
+        x.snowflood_fnf = flow_estimates['%s_snowfnf' % x.key].values##FNF, APR-JUL, LINEAR COEF
+        x.rainflood_inf = flow_estimates['%s_raininf' % x.key].values##INF, OCT-MAR, LINEAR COEF
+        x.snowflood_inf = flow_estimates['%s_snowinf' % x.key].values##INF, APR-JUL, LINEAR COEF
+        x.baseline_inf = flow_estimates['%s_baseinf' % x.key].values##INF, AUG-SEPT, LINEAR COEF
+        x.rainfnf_stds = std_estimates['%s_rainfnfstd' % x.key].values##FNF, OCT-MAR, STD
+        x.snowfnf_stds = std_estimates['%s_snowfnfstd' % x.key].values##FNF, APR-JUL, STD
+        x.raininf_stds = std_estimates['%s_raininfstd' % x.key].values##INF, OCT-MAR, STD
+        x.snowinf_stds = std_estimates['%s_snowinfstd' % x.key].values##INF, APR-JUL, STD
+        x.baseinf_stds = std_estimates['%s_baseinfstd' % x.key].values##INF, AUG-SEPT, STD
 	  
 	  ###Flow shapes are regressions that determine % of remaining flow in a period (Oct-Mar; Apr-Jul; Aug-Sept)
 	  ###that is expected to come, regressed against the total flow already observed in that period
@@ -469,60 +530,60 @@ class Model():
     ###District Initialization
 	############################################################################
 	##Kern County Water Agency Member Units
-    self.berrenda = District(self.df, 'BDM')
-    self.belridge = District(self.df, 'BLR')
-    self.buenavista = District(self.df, 'BVA')
-    self.cawelo = District(self.df, 'CWO')
-    self.henrymiller = District(self.df, 'HML')
-    self.ID4 = District(self.df, 'ID4')
-    self.kerndelta = District(self.df, 'KND')
-    self.losthills = District(self.df, 'LHL')
-    self.rosedale = District(self.df, 'RRB')
-    self.semitropic = District(self.df, 'SMI')
-    self.tehachapi = District(self.df, 'THC')
-    self.tejon = District(self.df, 'TJC')
-    self.westkern = District(self.df, 'WKN')
-    self.wheeler = District(self.df, 'WRM')
-    self.kcwa = District(self.df, 'KCWA')
+    self.berrenda = District(self.df, 'BDM', self.recording_spec)
+    self.belridge = District(self.df, 'BLR', self.recording_spec)
+    self.buenavista = District(self.df, 'BVA', self.recording_spec)
+    self.cawelo = District(self.df, 'CWO', self.recording_spec)
+    self.henrymiller = District(self.df, 'HML', self.recording_spec)
+    self.ID4 = District(self.df, 'ID4', self.recording_spec)
+    self.kerndelta = District(self.df, 'KND', self.recording_spec)
+    self.losthills = District(self.df, 'LHL', self.recording_spec)
+    self.rosedale = District(self.df, 'RRB', self.recording_spec)
+    self.semitropic = District(self.df, 'SMI', self.recording_spec)
+    self.tehachapi = District(self.df, 'THC', self.recording_spec)
+    self.tejon = District(self.df, 'TJC', self.recording_spec)
+    self.westkern = District(self.df, 'WKN', self.recording_spec)
+    self.wheeler = District(self.df, 'WRM', self.recording_spec)
+    self.kcwa = District(self.df, 'KCWA', self.recording_spec)
 	##Other Kern County
-    self.bakersfield = District(self.df, 'COB')
-    self.northkern = District(self.df, 'NKN')
+    self.bakersfield = District(self.df, 'COB', self.recording_spec)
+    self.northkern = District(self.df, 'NKN', self.recording_spec)
     ##Friant Kern Contractors
-    self.arvin = District(self.df, 'ARV')
-    self.delano = District(self.df, 'DLE')
-    self.exeter = District(self.df, 'EXE')
-    self.kerntulare = District(self.df, 'KRT')
-    self.lindmore = District(self.df, 'LND')
-    self.lindsay = District(self.df, 'LDS')
-    self.lowertule = District(self.df, 'LWT')
-    self.porterville = District(self.df, 'PRT')
-    self.saucelito = District(self.df, 'SAU')
-    self.shaffer = District(self.df, 'SFW')
-    self.sosanjoaquin = District(self.df, 'SSJ')
-    self.teapot = District(self.df, 'TPD')
-    self.terra = District(self.df, 'TBA')
-    self.tulare = District(self.df, 'TUL')
-    self.fresno = District(self.df, 'COF')
-    self.fresnoid = District(self.df, 'FRS')
+    self.arvin = District(self.df, 'ARV', self.recording_spec)
+    self.delano = District(self.df, 'DLE', self.recording_spec)
+    self.exeter = District(self.df, 'EXE', self.recording_spec)
+    self.kerntulare = District(self.df, 'KRT', self.recording_spec)
+    self.lindmore = District(self.df, 'LND', self.recording_spec)
+    self.lindsay = District(self.df, 'LDS', self.recording_spec)
+    self.lowertule = District(self.df, 'LWT', self.recording_spec)
+    self.porterville = District(self.df, 'PRT', self.recording_spec)
+    self.saucelito = District(self.df, 'SAU', self.recording_spec)
+    self.shaffer = District(self.df, 'SFW', self.recording_spec)
+    self.sosanjoaquin = District(self.df, 'SSJ', self.recording_spec)
+    self.teapot = District(self.df, 'TPD', self.recording_spec)
+    self.terra = District(self.df, 'TBA', self.recording_spec)
+    self.tulare = District(self.df, 'TUL', self.recording_spec)
+    self.fresno = District(self.df, 'COF', self.recording_spec)
+    self.fresnoid = District(self.df, 'FRS', self.recording_spec)
     ##Canal Boundaries
-    self.socal = District(self.df, 'SOC')
-    self.southbay = District(self.df, 'SOB')
-    self.centralcoast = District(self.df, 'CCA')
+    self.socal = District(self.df, 'SOC', self.recording_spec)
+    self.southbay = District(self.df, 'SOB', self.recording_spec)
+    self.centralcoast = District(self.df, 'CCA', self.recording_spec)
     ##demands at canal boundaries are taken from observed pumping into canal brannch
 
     ##Other Agencies
-    self.dudleyridge = District(self.df, 'DLR')
-    self.tularelake = District(self.df, 'TLB')
-    self.westlands = District(self.df, 'WSL')
-    self.chowchilla = District(self.df, 'CWC')
-    self.maderairr = District(self.df, 'MAD')
-    self.othertule = District(self.df, 'OTL')
-    self.otherkaweah = District(self.df, 'OKW')
-    self.otherfriant = District(self.df, 'OFK')
-    self.othercvp = District(self.df, 'OCD')
-    self.otherexchange = District(self.df, 'OEX')
-    self.othercrossvalley = District(self.df, 'OXV')
-    self.otherswp = District(self.df, 'OSW')
+    self.dudleyridge = District(self.df, 'DLR', self.recording_spec)
+    self.tularelake = District(self.df, 'TLB', self.recording_spec)
+    self.westlands = District(self.df, 'WSL', self.recording_spec)
+    self.chowchilla = District(self.df, 'CWC', self.recording_spec)
+    self.maderairr = District(self.df, 'MAD', self.recording_spec)
+    self.othertule = District(self.df, 'OTL', self.recording_spec)
+    self.otherkaweah = District(self.df, 'OKW', self.recording_spec)
+    self.otherfriant = District(self.df, 'OFK', self.recording_spec)
+    self.othercvp = District(self.df, 'OCD', self.recording_spec)
+    self.otherexchange = District(self.df, 'OEX', self.recording_spec)
+    self.othercrossvalley = District(self.df, 'OXV', self.recording_spec)
+    self.otherswp = District(self.df, 'OSW', self.recording_spec)
 	
 	##List of all intialized districts for looping
     self.district_list = [self.berrenda, self.belridge, self.buenavista, self.cawelo, self.henrymiller, self.ID4, self.kerndelta, self.losthills, self.rosedale, self.semitropic, self.tehachapi, self.tejon, self.westkern, self.wheeler, self.kcwa, self.bakersfield, self.northkern, self.arvin, self.delano, self.exeter, self.kerntulare, self.lindmore, self.lindsay, self.lowertule, self.porterville, self.saucelito, self.shaffer, self.sosanjoaquin, self.teapot, self.terra, self.tulare, self.fresno, self.fresnoid, self.socal, self.southbay, self.centralcoast, self.dudleyridge, self.tularelake, self.westlands, self.chowchilla, self.maderairr, self.othertule, self.otherkaweah, self.otherfriant, self.othercvp, self.otherexchange, self.othercrossvalley, self.otherswp]
@@ -540,15 +601,15 @@ class Model():
     ###Contract Initialization
 	############################################################################
    	#Project Contracts/Water Rights
-    self.friant1 = Contract(self.df, 'FR1')
-    self.friant2 = Contract(self.df, 'FR2')
-    self.swpdelta = Contract(self.df, 'SLS')
-    self.cvpdelta = Contract(self.df, 'SLF')
-    self.cvpexchange = Contract(self.df, 'ECH')
-    self.crossvalley = Contract(self.df, 'CVC')
-    self.kernriver = Contract(self.df, 'KRR')
-    self.tuleriver = Contract(self.df, 'TRR')
-    self.kaweahriver = Contract(self.df, 'WRR')
+    self.friant1 = Contract(self.df, 'FR1', self.recording_spec)
+    self.friant2 = Contract(self.df, 'FR2', self.recording_spec)
+    self.swpdelta = Contract(self.df, 'SLS', self.recording_spec)
+    self.cvpdelta = Contract(self.df, 'SLF', self.recording_spec)
+    self.cvpexchange = Contract(self.df, 'ECH', self.recording_spec)
+    self.crossvalley = Contract(self.df, 'CVC', self.recording_spec)
+    self.kernriver = Contract(self.df, 'KRR', self.recording_spec)
+    self.tuleriver = Contract(self.df, 'TRR', self.recording_spec)
+    self.kaweahriver = Contract(self.df, 'WRR', self.recording_spec)
 	
 	##List of all intialized contracts for looping
     self.contract_list = [self.friant1, self.friant2, self.swpdelta, self.cvpdelta, self.cvpexchange, self.crossvalley, self.kernriver, self.tuleriver, self.kaweahriver]
@@ -577,18 +638,18 @@ class Model():
 	############################################################################
 		  
 	##Water Banks
-    self.stockdale = Waterbank(self.df, 'STOCK')
-    self.kernriverbed = Waterbank(self.df, 'KRC')
-    self.poso = Waterbank(self.df, 'POSO')
-    self.rosedale21 = Waterbank(self.df, 'R21')
-    self.pioneer = Waterbank(self.df, 'PIO')
-    self.kwb = Waterbank(self.df, 'KWB')
-    self.berrendawb = Waterbank(self.df, 'BRM')
-    self.b2800 = Waterbank(self.df, 'B2800')
-    self.aewb = Waterbank(self.df, 'AEMWD')
-    self.wkwb = Waterbank(self.df, 'WKB')
-    self.irvineranch = Waterbank(self.df, 'IVR')
-    self.northkernwb = Waterbank(self.df, 'NKB')
+    self.stockdale = Waterbank(self.df, 'STOCK', self.recording_spec)
+    self.kernriverbed = Waterbank(self.df, 'KRC', self.recording_spec)
+    self.poso = Waterbank(self.df, 'POSO', self.recording_spec)
+    self.rosedale21 = Waterbank(self.df, 'R21', self.recording_spec)
+    self.pioneer = Waterbank(self.df, 'PIO', self.recording_spec)
+    self.kwb = Waterbank(self.df, 'KWB', self.recording_spec)
+    self.berrendawb = Waterbank(self.df, 'BRM', self.recording_spec)
+    self.b2800 = Waterbank(self.df, 'B2800', self.recording_spec)
+    self.aewb = Waterbank(self.df, 'AEMWD', self.recording_spec)
+    self.wkwb = Waterbank(self.df, 'WKB', self.recording_spec)
+    self.irvineranch = Waterbank(self.df, 'IVR', self.recording_spec)
+    self.northkernwb = Waterbank(self.df, 'NKB', self.recording_spec)
 	
     self.waterbank_list = [self.stockdale, self.kernriverbed, self.poso, self.rosedale21, self.pioneer, self.kwb, self.berrendawb, self.b2800, self.wkwb, self.irvineranch, self.northkernwb]
     self.leiu_list = [self.semitropic, self.arvin]##these are districts that operate water banks (some mix of in-leiu deliveries and direct recharge)
@@ -660,8 +721,11 @@ class Model():
       y.daily_flow = {}
       y.daily_turnout = {}
       for canal_member in self.canal_district[y.name]:
-        y.daily_flow[canal_member.key] = np.zeros(self.T)
-        y.daily_turnout[canal_member.key] = np.zeros(self.T)
+        if canal_member.key in self.release_canal_flows.get(y.key, []):
+          y.daily_flow[canal_member.key] = np.zeros(self.T)
+        else:
+          y.daily_flow[canal_member.key] = self.recording_spec.daily_series(y.key, canal_member.key, self.T)
+        y.daily_turnout[canal_member.key] = self.recording_spec.daily_series(y.key, canal_member.key + '_turnout', self.T)
 
       for z in ['contractor', 'turnout', 'excess', 'priority', 'secondary']:
         y.demand[z] = np.zeros(y.num_sites)
@@ -1094,6 +1158,37 @@ class Model():
     return tot_contractor_demand
 	
 	
+  def find_reservoir_contract_totals(self, wateryear, wyt):
+    #for each reservoir, find the total deliveries already made from all contracts stored in the reservoir,
+	#the total carryover storage & new allocations, and the total priority/secondary contract allocations
+    res_contract_totals = {}
+    for res_key in self.reservoir_contract:
+      res_totals = {'deliveries': 0.0, 'carryover': 0.0, 'extra_allocation': 0.0, 'priority_contract': 0.0, 'secondary_contract': 0.0}
+      for yy in self.reservoir_contract[res_key]:
+        res_totals['deliveries'] += yy.annual_deliveries[wateryear]
+        res_totals['carryover'] += yy.tot_carryover
+        res_totals['extra_allocation'] += yy.tot_new_alloc
+        if yy.allocation_priority == 1:
+          res_totals['priority_contract'] += yy.total*yy.reduction[wyt]
+        else:
+          res_totals['secondary_contract'] += yy.total*yy.reduction[wyt]
+      res_contract_totals[res_key] = res_totals
+    return res_contract_totals
+
+  def find_reservoir_priority_storage(self, t):
+    #if some contracts at a reservoir have 'priority' over storage space
+	#(i.e., cvpdelta and exchange contracts have priority over the federal
+	#san luis storage), calculate the total allocation volume that has priority
+	#in a reservoir
+    res_priority_storage = {}
+    for res_key in self.reservoir_contract:
+      priority_storage = 0.0
+      for yy in self.reservoir_contract[res_key]:
+        if yy.storage_priority == 1:
+          priority_storage += yy.allocation[t]
+      res_priority_storage[res_key] = priority_storage
+    return res_priority_storage
+
   def find_initial_carryover(self):
     #########################################################################################
 	#takes the storage that exists at the start of the simulation and applies it either to 
@@ -1309,25 +1404,23 @@ class Model():
 	##REAL-WORLD RULE ADJUSTMENTS
 	##Updates to reflect SJRR & Yuba Accords occuring during historical time period (1996-2016)
     if self.model_mode == 'validation':
-      self.update_regulations_north(t,dowy, year + self.starting_year)
+      self.update_regulations_north(t)
 	  
 	####NON-PROJECT USES
     ##Find out if reservoir releases need to be made for in-stream uses
     self.reservoir_list = [self.shasta, self.oroville, self.yuba, self.folsom, self.newmelones, self.donpedro, self.exchequer]
-    for x in self.reservoir_list:	
-      x.rights_call(x.downstream[t])
+    for x in [self.sacramento_bank, self.san_joaquin_bank]:
+      x.rights_call(x.downstream[:, t])
     ##any additional losses before the delta inflow (.downstream member only accounts to downstream trib gauge)
 	##must be made up by releases from Shasta and New Melones, respectively
     #self.newmelones.rights_call(self.delta.gains_sj[t-1],1)
 
     ##FIND MINIMUM ENVIRONMENTAL RELEASES
     #San Joaquin Tributaries
-    for x in [self.newmelones, self.donpedro, self.exchequer]:
-      x.release_environmental(t,self.delta.forecastSJWYT)
+    self.san_joaquin_bank.release_environmental(t,self.delta.forecastSJWYT)
 	#Sacramento Tributaries
     self.oroville.set_oct_nov_rule(t, m)
-    for x in [self.shasta, self.oroville, self.yuba, self.folsom]:
-      x.release_environmental(t,self.delta.forecastSCWYT)
+    self.sacramento_bank.release_environmental(t,self.delta.forecastSCWYT)
     ##MINIMUM FLOW AT VERNALIS GAUGE(SAN JOAQUIN DELTA INFLOW)
     #from self.reservoir.release_environmental() function:
 	#self.reservoir.gains_to_delta
@@ -1339,8 +1432,7 @@ class Model():
     self.delta.vernalis_gains += self.exchequer.din + self.donpedro.din + self.newmelones.din
 	
 	##MINIMUM FLOW AT RIO VIST GAUGE (SACRAMENTO DELTA INFLOW)
-    for x in [self.shasta, self.oroville, self.yuba, self.folsom]:
-      x.find_available_storage(t)  
+    self.sacramento_bank.find_available_storage(t)
     #additional releases to meet rio vista minimums shared by Sacramento Reservoirs
     cvp_stored_release = self.shasta.envmin + self.folsom.envmin
     swp_stored_release = self.oroville.envmin + self.yuba.envmin
@@ -1369,8 +1461,7 @@ class Model():
     swp_extra = self.oroville.use_saved_storage(t, m, self.delta.forecastSCWYT, dowy)
     #project if flood pool will be exceeded in the future & find min release rate to avoid reaching the flood pool
 	#monthly flow projections from self.reservoir.create_flow_shapes (i.e. flood available water)
-    for x in [self.shasta, self.folsom, self.oroville, self.yuba]:
-      x.find_flow_pumping(t, m, dowy, self.delta.forecastSCWYT, 'env')
+    self.sacramento_bank.find_flow_pumping(t, m, dowy, self.delta.forecastSCWYT)
 	  	  	
 	###DETERMINE RELEASES REQUIRED FOR DESIRED PUMPING
     ###Uses gains and environmental releases to determine additional releases required for
@@ -1436,8 +1527,8 @@ class Model():
 	##SAN JOAQUIN RESERVOIR OPERATIONS
 	##lower SJ basins - no 'release for exports' but used to meet delta targets @ vernalis
     ##Water Balance
-    for x in [self.newmelones, self.donpedro, self.exchequer]:	
-      x.step(t)
+    self.san_joaquin_bank.step(t)
+    for x in self.san_joaquin_bank.reservoirs:
 	  #forced spills also go to delta
       self.delta.total_inflow += x.force_spill
 
@@ -1446,8 +1537,8 @@ class Model():
 	##Water balance at each Northern Reservoir
     self.shasta.rights_call(self.delta.ccc[t]*-1.0,1)
     self.oroville.rights_call(self.delta.barkerslough[t]*-1.0,1)
-    for x in [self.shasta, self.oroville, self.yuba, self.folsom]:
-      x.step(t)
+    self.sacramento_bank.step(t)
+    for x in self.sacramento_bank.reservoirs:
 	  #forced spills also go to delta
       self.delta.total_inflow += x.force_spill
 
@@ -1489,8 +1580,8 @@ class Model():
 	####Various infrastructure & regulatory changes that 
 	####occurred during the duration of the 1996-2016 calibration period
     if self.model_mode == 'validation':
-      self.update_regulations_south(t,dowy,m,year + self.starting_year)
-    else:
+      self.update_regulations_south(t)
+    if self.millerton.sjrr_active:
       self.millerton.sjrr_release = self.millerton.sj_riv_res_flows(t, dowy)
 
 	  
@@ -1655,65 +1746,40 @@ class Model():
 
 	  
 	#Update Contract Allocations
+    #total deliveries already made from each reservoir, total carryover storage at the reservoir, and the total 
+	#priority/secondary allocations at that reservoir are the same for every contract stored there, so they are found once per reservoir
+    res_contract_totals = self.find_reservoir_contract_totals(wateryear, wyt)
     for y in self.contract_list:
       #for a specific contract, look up the reservoir it is stored in
       reservoir = self.contract_reservoir[y.key]
-      #then find all the contracts associated with that reservoir
-      this_reservoir_all_contract = self.reservoir_contract[reservoir.key]
-      #need to find the total deliveries already made from the reservoir,
-	  #total carryover storage at the reservoir, and the total priority/secondary allocations
-	  #at that reservoir
-      total_res_deliveries = 0.0
-      total_res_carryover = 0.0
-      priority_contract = 0.0
-      secondary_contract = 0.0
-      extra_allocation = 0.0
-      for yy in self.get_iterable(this_reservoir_all_contract):
-        total_res_deliveries += yy.annual_deliveries[wateryear]
-        total_res_carryover += yy.tot_carryover
-        extra_allocation += yy.tot_new_alloc
-        if yy.allocation_priority == 1:
-          priority_contract += yy.total*yy.reduction[wyt]
-        else:
-          secondary_contract += yy.total*yy.reduction[wyt]
+      res_totals = res_contract_totals[reservoir.key]
       #san luis doesn't have available_storage forecasts, so input from northern model is used
 	  #for state & federal portions
       if reservoir.key == "SLS":
-        total_allocation = self.swp_allocation[t] - self.pumping_turnback['SLS'] + extra_allocation
+        total_allocation = self.swp_allocation[t] - self.pumping_turnback['SLS'] + res_totals['extra_allocation']
       elif reservoir.key == "SLF":
-        total_allocation = self.cvp_allocation[t] - self.pumping_turnback['SLF'] + extra_allocation
+        total_allocation = self.cvp_allocation[t] - self.pumping_turnback['SLF'] + res_totals['extra_allocation']
       else:
         #otherwise, total allocation at the reservoir is equal to available storage + deliveries - the total carryover storage
-        total_allocation = reservoir.available_storage[t] + total_res_deliveries - total_res_carryover
+        total_allocation = reservoir.available_storage[t] + res_totals['deliveries'] - res_totals['carryover']
 		
-      y.calc_allocation(t, dowy, total_allocation, priority_contract, secondary_contract, wyt)
+      y.calc_allocation(t, dowy, total_allocation, res_totals['priority_contract'], res_totals['secondary_contract'], wyt)
     ##Find contract 'storage pools' - how much water is available right now	
 	##san luis federal storage is divided between 3 water contracts - cvpdelta, exchange, and crossvalley
 	##millerton storage is divided between 2 water contracts - friant1 and friant2
+	##(deliveries & carryover don't change when allocations are updated, so the totals from above are still good)
+    res_priority_storage = self.find_reservoir_priority_storage(t)
     for y in self.contract_list:
       #for a specific contract, look up the reservoir it is stored in
       reservoir = self.contract_reservoir[y.key]
-      #then find all the contracts associated with that reservoir
-      this_reservoir_all_contract = self.reservoir_contract[reservoir.key]
-      tot_res_deliveries = 0.0
-      priority_storage = 0.0
-      tot_res_carryover = 0.0
-      for yy in self.get_iterable(this_reservoir_all_contract):
-        #if some contracts at a reservoir have 'priority' over storage space
-		#(i.e., cvpdelta and exchange contracts have priority over the federal
-		#san luis storage), calculate the total allocation volume that has priority
-		#in a reservoir
-        tot_res_deliveries += yy.annual_deliveries[wateryear]
-        tot_res_carryover += yy.tot_carryover
-        if yy.storage_priority == 1:
-          priority_storage += yy.allocation[t]
+      res_totals = res_contract_totals[reservoir.key]
       ##contract storage pools are the existing storage plus all the deliveries
       ##that have been made so far in that water year - so 'storage pool' is all
       ##the contract water that has already come into the reservoir, even water
       ##that has already been delivered	  
-      total_water = reservoir.S[t] - reservoir.dead_pool + tot_res_deliveries - tot_res_carryover
+      total_water = reservoir.S[t] - reservoir.dead_pool + res_totals['deliveries'] - res_totals['carryover']
       #find the storage pool for each contract
-      y.find_storage_pool(t, wateryear, total_water, reservoir.S[t], priority_storage)
+      y.find_storage_pool(t, wateryear, total_water, reservoir.S[t], res_priority_storage[reservoir.key])
 
 	##Update District Contracts
     #self.assign_uncontrolled(t, wateryear)
@@ -2027,6 +2093,27 @@ class Model():
 
 
 	
+  def find_san_luis_schedule(self, year, m):
+  ##months (and the days in each) that san luis storage is projected through in find_pumping_release, starting in month m of year
+  ##and looping until april - only changes once a month, so it is stored & re-used for every day in the month
+    if self.san_luis_schedule_key != (year, m):
+      month_list = []
+      year_list = []
+      month_evaluate = m - 1
+      cross_counter_y = 0
+      while month_evaluate >= 5 or month_evaluate < 3:
+        month_list.append(month_evaluate)
+        year_list.append(year + cross_counter_y)
+        month_evaluate += 1
+        if month_evaluate > 11:
+          month_evaluate = 0
+          cross_counter_y = 1
+      self.san_luis_schedule = {}
+      self.san_luis_schedule['month'] = np.array(month_list, dtype = int)
+      self.san_luis_schedule['days'] = self.days_in_month[np.array(year_list, dtype = int), self.san_luis_schedule['month']]
+      self.san_luis_schedule_key = (year, m)
+    return self.san_luis_schedule
+
   def find_pumping_release(self, start_storage, pump_max, month_demand, month_demand_must_fill, allocation, expected_pumping, flood_supply, available_storage, projected_carryover, current_carryover, max_tax_free, wyt, t, key):
     ##this function is used by the swpdelta & cvpdelta contracts to manage san luis reservoir storage
 	##and coordinate pumping at the delta
@@ -2035,63 +2122,49 @@ class Model():
     da = self.day_month[t]
     year = self.year[t] - self.starting_year
 
-    month_evaluate = m - 1
-    # first_month_frac = max(self.days_in_month[year][month_evaluate] - da, 0.0)/self.days_in_month[year][month_evaluate]
-	
-	
-	###Initial storage projections - current month
-	##calculate expected deliveries during this month from san luis
-    #expected_demands = (month_demand[wyt][month_evaluate]*allocation + month_demand_must_fill[wyt][month_evaluate])/self.days_in_month[year][month_evaluate]
-    expected_demands = (month_demand[wyt][month_evaluate] + month_demand_must_fill[wyt][month_evaluate])/self.days_in_month[year][month_evaluate]
-    expected_inflow = expected_pumping['gains'][month_evaluate]/self.days_in_month[year][month_evaluate]
-    expected_untaxed = (expected_pumping['untaxed'][month_evaluate] - expected_pumping['gains'][month_evaluate])
-    expected_taxed = (expected_pumping['taxed'][month_evaluate] - expected_pumping['gains'][month_evaluate])
-
+	##loop through all months until april (april/may have very limited pumping, should not plan for any pumping to occur then)
+	##this loop helps to project storage in san luis up to a year out > so we know in advance if we need to pump or will be filling the reservoir
+	##note: this loop will go through one water year and into the next one
+    schedule = self.find_san_luis_schedule(year, m)
+    month_evaluate = schedule['month']
+    this_month_days = schedule['days'].astype(float)#running days in a month
+    if len(month_evaluate) > 0:
+      this_month_days[0] = max(schedule['days'][0] - da, 0.0)
+
+	###Initial storage projections - each month
+	##calculate expected deliveries during each month from san luis
+    expected_demands = (month_demand[wyt][month_evaluate] + month_demand_must_fill[wyt][month_evaluate])/schedule['days']
 	#how much 'unstored' pumping can we expect into San Luis?
-    #self.month_averages comes from self.predict_delta_gains
 	#proj_surplus & proj_surplus2 are generated in the northern model, from 8RI regression in self.predict_delta_gains
-    if month_evaluate == 3 or month_evaluate == 4:
-      expected_inflow = 0.75
+    #(the loop ends before april, so the april/may inflow limit is never used here)
+    expected_inflow = expected_pumping['gains'][month_evaluate]/schedule['days']
+    expected_untaxed = np.cumsum(expected_pumping['untaxed'][month_evaluate] - expected_pumping['gains'][month_evaluate])
+    expected_taxed = np.cumsum(expected_pumping['taxed'][month_evaluate] - expected_pumping['gains'][month_evaluate])
     #expected monthly change in san luis storage
-    net_monthly = (expected_inflow - expected_demands)*max(self.days_in_month[year][month_evaluate] - da, 0.0)
+    net_monthly = (expected_inflow - expected_demands)*this_month_days
+    total_days_remaining = np.cumsum(np.append(0.0, this_month_days[:-1]))#used for estimates of how long san luis will take to fill up (for districts to make carryover decisions)
+
     ##Enter into a loop for projecting storage & pumping forward one month at a time
 	##start with current estimates
     next_month_storage = start_storage#running storage levels
-    this_month_days = max(self.days_in_month[year][month_evaluate] - da, 0.0)#running days in a month
     article21 = 0.0#initialize article 21 release estimates
     numdays_fillup = 999.9#initialize numdays_fillup variable
-    numdays_fillup_override = 0.0
-    total_days_remaining = 0.0#used for estimates of how long san luis will take to fill up (for districts to make carryover decisions)
 
     pumping_toggle = 1#toggle for releasing water to maximum pumping levels
     tax_free_toggle = 1#toggle for releasing water to 'tax free' pumping levels
     pumping_toggle_override = 0#toggle for releasing water to maximum pumping levels
     tax_free_toggle_override = 0#toggle for releasing water to 'tax free' pumping levels
-	  
-    ##loop through all months until april (april/may have very limited pumping, should not plan for any pumping to occur then)
-	##this loop helps to project storage in san luis up to a year out > so we know in advance if we need to pump or will be filling the reservoir
-	##note: this loop will go through one water year and into the next one
-    cross_counter_y = 0
-    while month_evaluate >= 5 or month_evaluate < 3:
-    #while month_evaluate == m - 1:
+
+    for x in range(0, len(month_evaluate)):
       #estimate storage at the end of this month by adding monthly change to the running storage tally
-      next_month_storage += net_monthly
-      if net_monthly > 0.0:
-        partial_month_remaining = max(1 - max(next_month_storage - 1020.0, 0.0)/net_monthly, 0.0)*self.days_in_month[year+cross_counter_y][month_evaluate]
+      next_month_storage += net_monthly[x]
+      if net_monthly[x] > 0.0:
+        partial_month_remaining = max(1 - max(next_month_storage - 1020.0, 0.0)/net_monthly[x], 0.0)*schedule['days'][x]
       else:
-        next_month_storage = min(1020.0 + net_monthly, next_month_storage)
+        next_month_storage = min(1020.0 + net_monthly[x], next_month_storage)
         partial_month_remaining = 0.0
-     
+
 	  ##can we reach the storage targets only using 'tax free' pumping?
-      ##how much water can we expect to pump w/o additional E/I tax through the end of the month?
-      #if dowy <= self.dowy_eom[month_evaluate]:#running water year is the same as the beginning of the loop
-        #how much 'tax free' pumping through the end of this month? - total tax free remaining at the current simulation day, minus total tax free remaining at the end of the looped month
-        #running_tax_free_pumping = self.max_tax_free[wyt][key][dowy] - self.max_tax_free[wyt][key][self.dowy_eom[month_evaluate]]
-      #else:#looped into the next water year, so we have to calculate the tax free pumping remaining through the end of the current year, then add in the tax free remaining through the looped month in the next year
-        #running_tax_free_pumping = self.max_tax_free[wyt][key][dowy] + self.max_tax_free[wyt][key][0] - self.max_tax_free[wyt][key][self.dowy_eom[month_evaluate]]
-      #running_tax_free_pumping will be added to the net_month storage variable, so we don't want to double-count 'unstored pumping'
-      #if running_tax_free_pumping > available_pumping:
-        #running_tax_free_pumping = available_pumping
 	  ##note - beginning month = m; looped month = month_evaluate
       if start_storage > 1000.0:
         #if san luis storage is currently greater than capacity, no pumping, article21 releases triggered
@@ -2102,14 +2175,14 @@ class Model():
       if next_month_storage < 1020.0:
         article21 = max(0.0, article21)
         #if expected storage is less than 0 in any month, pump at max, no article 21
-        if next_month_storage + expected_untaxed > 1020.0:
-          numdays_fillup = min(numdays_fillup,total_days_remaining+partial_month_remaining)
+        if next_month_storage + expected_untaxed[x] > 1020.0:
+          numdays_fillup = min(numdays_fillup,total_days_remaining[x]+partial_month_remaining)
         else:
           numdays_fillup = min(numdays_fillup, 999.9)#reservoir does not fill up in this condition (if it was full in prior loop months, retains its value)
-        if next_month_storage + expected_untaxed > (1020.0 + current_carryover):
+        if next_month_storage + expected_untaxed[x] > (1020.0 + current_carryover):
           pumping_toggle = min(0, pumping_toggle)
           tax_free_toggle = min(0, tax_free_toggle)
-        elif next_month_storage + expected_taxed > (1020.0 + current_carryover):
+        elif next_month_storage + expected_taxed[x] > (1020.0 + current_carryover):
           pumping_toggle = min(0, pumping_toggle)
           tax_free_toggle = min(1, tax_free_toggle)
         else:
@@ -2120,40 +2193,19 @@ class Model():
         pumping_toggle = min(0, pumping_toggle)
         tax_free_toggle = min(0, tax_free_toggle)
         #article21 flows are the expected extra flows divided by the number of days until the end of the month
-        numdays_fillup = min(numdays_fillup,total_days_remaining+partial_month_remaining)   
+        numdays_fillup = min(numdays_fillup,total_days_remaining[x]+partial_month_remaining)
 
-      if (next_month_storage + expected_untaxed) < 0.0:
+      if (next_month_storage + expected_untaxed[x]) < 0.0:
         tax_free_toggle_override = 1
         pumping_toggle_override = 1
       elif next_month_storage < 0.0:
         tax_free_toggle_override = 1
-	  ##note - beginning month = m; looped month = month_evaluate
 
-		   		   
       ##After we calculate what the pumping for SL based off projections from this month, we step the month
       ##forward and project new storage & pumping for the next month, and re-evaluate all releases.  From Oct-Mar, if
       ##any month triggers the pumping to stop, the pumping stops.  From June-Sept, if any month triggers the pumping, the
 	  ##pumping occurs
 
-      month_evaluate += 1
-      if month_evaluate > 11:
-        month_evaluate = 0
-        cross_counter_y = 1
-      expected_demands = (month_demand[wyt][month_evaluate] + month_demand_must_fill[wyt][month_evaluate])/self.days_in_month[year+cross_counter_y][month_evaluate]
-      expected_inflow = expected_pumping['gains'][month_evaluate]/self.days_in_month[year+cross_counter_y][month_evaluate]
-      expected_untaxed += (expected_pumping['untaxed'][month_evaluate] - expected_pumping['gains'][month_evaluate])
-      expected_taxed += (expected_pumping['taxed'][month_evaluate] - expected_pumping['gains'][month_evaluate])
-
-	  #how much 'unstored' pumping can we expect into San Luis?
-      #self.month_averages comes from self.predict_delta_gains
-	  #proj_surplus & proj_surplus2 are generated in the northern model, from 8RI regression in self.predict_delta_gains
-      if month_evaluate == 3 or month_evaluate == 4:
-        expected_inflow = 0.75
-      #expected monthly change in san luis storage
-      net_monthly = (expected_inflow - expected_demands)*self.days_in_month[year+cross_counter_y][month_evaluate]
-      total_days_remaining += this_month_days
-      this_month_days = self.days_in_month[year+cross_counter_y][month_evaluate]
-
     return max(pumping_toggle, pumping_toggle_override), max(tax_free_toggle, tax_free_toggle_override), article21, numdays_fillup
       
 #####################################################################################################################
@@ -3300,8 +3352,13 @@ class Model():
 #####################################################################################################################
 
   
-  def results_as_df(self, time_step, list_type):
-    if time_step == "daily":
+  def results_as_df(self, time_step, list_type, resolution = 'daily'):
+    #daily output can also be collected at the 'monthly' or 'annual' resolution of the recording spec (districts, contracts & canals)
+    if time_step == "daily" and resolution != 'daily':
+      df = pd.DataFrame(index = self.recording_spec.period_index[resolution])
+      for x in list_type:
+        df = pd.concat([df, x.accounting_as_df(self.df.index, resolution)], axis = 1)
+    elif time_step == "daily":
       df = pd.DataFrame(index = self.df.index)
       for x in list_type:
         df = pd.concat([df, x.accounting_as_df(df.index)], axis = 1)
@@ -3314,28 +3371,47 @@ class Model():
         df = pd.concat([df, x.annual_results_as_df()], axis = 1)
     return df
 
-  def results_as_df_full(self, time_step, list_type):
+  def results_as_df_full(self, time_step, list_type, resolution = 'daily'):
     if time_step == "daily":
-      df = pd.DataFrame(index = self.df.index)
+      if resolution == 'daily':
+        df = pd.DataFrame(index = self.df.index)
+      else:
+        df = pd.DataFrame(index = self.recording_spec.period_index[resolution])
       for x in list_type:
-        df2 = x.accounting_as_df_full(df.index)
+        df2 = x.accounting_as_df_full(self.df.index, resolution)
         # only store non-zero columns
         non_zero = np.abs(df2).sum() > 0
         df2 = df2.loc[:,non_zero]
         df = pd.concat([df, df2], axis = 1)
     return df
      		
-  def bank_as_df(self, time_step, list_type):
+  def bank_as_df(self, time_step, list_type, resolution = 'daily'):
     if time_step == 'daily':
-      df = pd.DataFrame(index = self.df.index)
+      if resolution == 'daily':
+        df = pd.DataFrame(index = self.df.index)
+      else:
+        df = pd.DataFrame(index = self.recording_spec.period_index[resolution])
       for x in list_type:
-        df = pd.concat([df, x.bank_as_df(df.index)], axis = 1)	
+        df = pd.concat([df, x.bank_as_df(self.df.index, resolution)], axis = 1)	
     else:
       df = pd.DataFrame()
       for x in list_type:
         df = pd.concat([df, x.annual_bank_as_df()], axis = 1)
     return df
 
+  def summary_as_df(self, resolution, list_type):
+    #monthly or water-year summary tables (sum, min, max, end-of-period) of recorded district/contract/canal series
+    df = pd.DataFrame(index = self.recording_spec.period_index[resolution])
+    for x in list_type:
+      df = pd.concat([df, x.summary_as_df(self.recording_spec, resolution)], axis = 1)
+    return df
+
+  def bank_summary_as_df(self, resolution, list_type):
+    df = pd.DataFrame(index = self.recording_spec.period_index[resolution])
+    for x in list_type:
+      df = pd.concat([df, x.bank_summary_as_df(self.recording_spec, resolution)], axis = 1)
+    return df
+
 
 
 #####################################################################################################################
@@ -3350,6 +3426,7 @@ class Model():
     self.semitropic.leiu_recovery = 0.7945
     self.isabella.capacity = 361.25
     self.isabella.tocs_rule['storage'] = [[302.6,170,170,245,245,361.25,361.25,302.6],  [302.6,170,170,245,245,361.25,361.25,302.6]]
+    self.isabella.create_tocs_lookup()
     self.poso.initial_recharge = 420.0
     self.poso.recovery = 0.6942
     self.poso.tot_storage = 2.1
@@ -3382,6 +3459,9 @@ class Model():
   def set_regulations_current_north(self):
     self.yuba.env_min_flow = self.yuba.env_min_flow_ya
     self.yuba.temp_releases = self.yuba.temp_releases_ya
+    self.set_x2_fall_constraint()
+
+  def set_x2_fall_constraint(self):
     for x in range(318, 334):
       self.delta.x2constraint['W'][x] = 77.0 - 3.0*(x-318)/16
       self.delta.x2constraint['AN'][x] = 81.0
@@ -3392,95 +3472,26 @@ class Model():
       self.delta.x2constraint['W'][x] = 74.0
       self.delta.x2constraint['AN'][x] = 81.0
 
-	
-  def update_regulations_south(self,t,dowy,m,y):
+  def set_yuba_accord(self):
+	##Yuba River Accord, started in Jan of 2006 (repaces minimum flow requirements)
+    self.yuba.env_min_flow = self.yuba.env_min_flow_ya
+    self.yuba.temp_releases = self.yuba.temp_releases_ya
+    self.sacramento_bank.create_rule_tables()
+
+  def calc_sjrr_min_release(self):
     ##San Joaquin River Restoration Project, started in October of 2009 (WY 2009)
 	##Additional Releases from Millerton Lake depending on WYT
-    if y >= 2006:
-      self.semitropic.leiu_recovery = 0.7945
-    if y == 2009 and dowy == 1:
-      expected_outflow_releases = {}
-      for wyt in ['W', 'AN', 'BN', 'D', 'C']:
-        expected_outflow_releases[wyt] = np.zeros(366)
-      self.millerton.calc_expected_min_release(expected_outflow_releases, np.zeros(12), 1)
-
-    if y == 2009 and m >= 10:
-      self.millerton.sjrr_release = self.millerton.sj_riv_res_flows(t, dowy)
-    elif y > 2009:
-      self.millerton.sjrr_release = self.millerton.sj_riv_res_flows(t, dowy)
-    if t == 3501:
-      self.isabella.capacity = 361.25
-      self.isabella.tocs_rule['storage'] = [[302.6,170,170,245,245,361.25,361.25,302.6],  [302.6,170,170,245,245,361.25,361.25,302.6]]
-    if y == 2009 and dowy == 1:
-      self.poso.initial_recharge = 420.0
-      self.poso.recovery = 0.6942
-      self.poso.tot_storage = 2.1
-      self.find_all_triggers()
-      self.fkc.capacity["normal"] = [3797.0, 3797.0, 3797.0, 3797.0, 3427.0, 3427.0, 3427.0, 3427.0, 3427.0, 3427.0, 3427.0, 3427.0, 3427.0, 2921.0, 2921.0, 2921.0, 2793.0, 2299.0, 2299.0, 2299.0, 1893.0, 1893.0, 1893.0, 1893.0, 1000.0, 0.0]
-
-    if y == 2010 and dowy == 1:
-      self.irvineranch.initial_recharge = 300.0
-      self.irvineranch.recovery = 0.0479
-      self.irvineranch.tot_storage = 0.594
-    if y == 1998 and dowy == 1:
-      self.berrenda.project_contract['tableA'] =  0.032076
-      self.socal.project_contract['tableA'] = 0.63338264299
-    if y == 1999 and dowy == 1:
-      self.belridge.project_contract['tableA'] = 0.03636
-    if y == 2000 and dowy == 1:
-      self.southbay.project_contract['tableA'] = 0.05177514792
-      self.belridge.project_contract['tableA'] = 0.03538
-      self.berrenda.project_contract['tableA'] =  0.03035
-      self.losthills.project_contract['tableA'] = 0.0293663708
-      self.wheeler.project_contract['tableA'] =  0.04858926015
-      self.socal.project_contract['tableA'] = 0.64423076923
-    if y == 2001 and dowy == 1:
-      self.southbay.project_contract['tableA'] = 0.05424063116
-      self.belridge.project_contract['tableA'] = 0.0305
-      self.berrenda.project_contract['tableA'] =  0.02837
-    if y == 2004 and dowy == 1:
-      self.belridge.project_contract['tableA'] = 0.02995607
-      self.berrenda.project_contract['tableA'] =  0.02677
-      self.southbay.project_contract['tableA'] = 0.0548863
-      self.westkern.project_contract['tableA'] = 0.00776587
-    if y == 2010 and dowy == 1:
-      self.berrenda.project_contract['tableA'] =  0.02282922
-      self.socal.project_contract['tableA'] = 0.648310
+    expected_outflow_releases = {}
+    for wyt in ['W', 'AN', 'BN', 'D', 'C']:
+      expected_outflow_releases[wyt] = np.zeros(366)
+    self.millerton.calc_expected_min_release(expected_outflow_releases, np.zeros(12), 1)
 
-	  
-    if y == 2002 and dowy == 1:
-      self.kwbcanal.capacity["normal"] = [800.0, 800.0, 0.0, 0.0]
-      self.kwbcanal.capacity["reverse"] = [0.0, 440.0, 800.0, 800.0]
-      self.kwbcanal.capacity["closed"] = [0.0, 0.0, 0.0, 0.0]
-      self.kwbcanal.turnout["normal"] = [800.0, 800.0, 0.0]
-      self.kwbcanal.turnout["reverse"] = [0.0, 440.0, 800.0]
-      self.kwbcanal.turnout["closed"] = [0.0, 0.0, 0.0]
-      self.kwbcanal.flow_directions["recharge"]["caa"] = 'closed'
-      self.kwbcanal.flow_directions["recharge"]["knc"] = 'closed'
-      self.kwbcanal.flow_directions["recovery"]["caa"] = 'normal'
-      self.kwbcanal.flow_directions["recovery"]["knc"] = 'normal'
-      #self.fkc.flow_directions["recharge"]["xvc"] = 'normal'
-
-      self.kwb.initial_recharge = 1212.12
-      self.kwb.recovery = 0.7863
-      self.kwb.tot_storage = 2.4
-      self.find_all_triggers()
-	  
-      ####Calculates the requests for SWP allocations in WY 1997-2000
-      ###when less than full allocation was requested by MWD.  This is unlikely to 
-      ###occur in the future
+  def set_swp_table_a_requests(self):
+    ####Calculates the requests for SWP allocations in WY 1997-2000
+    ###when less than full allocation was requested by MWD.  This is unlikely to 
+    ###occur in the future (swpdelta.max_allocation is set by the regulation schedule)
+    ###table A shares are reset from these requests whenever they change
     self.swpdelta.total = 4056.0
-    if y == 1996:
-      self.swpdelta.max_allocation = 2977.0
-    elif y == 1997:
-      self.swpdelta.max_allocation = 3191.0
-    elif y == 1998:
-      self.swpdelta.max_allocation = 3214.0
-    elif y == 1999:
-      self.swpdelta.max_allocation = 3617.0
-    else:
-      self.swpdelta.max_allocation = 4056.0
-	  
     request_empty = self.swpdelta.total - self.swpdelta.max_allocation
     for x in self.district_list:
       contractor_toggle = 0
@@ -3504,117 +3515,18 @@ class Model():
           contractor_toggle = 1
       if contractor_toggle == 1:	  
         x.project_contract['tableA'] = x.table_a_request/self.swpdelta.total
-    
-  def update_regulations_north(self,t,dowy,y):
 
-	##Yuba River Accord, started in Jan of 2006 (repaces minimum flow requirements)
-    if y >= 2006:
-      self.yuba.env_min_flow = self.yuba.env_min_flow_ya
-      self.yuba.temp_releases = self.yuba.temp_releases_ya
-	  
-    if y == 2008 and dowy == 1:
-      #for wyt in ['W', 'AN', 'BN', 'D', 'C']:
-        #self.delta.max_tax_free[wyt]['cvp'] = np.zeros(366)
-        #self.delta.max_tax_free[wyt]['swp'] = np.zeros(366)
-      #for x in range(0,12):
-        #if x < 6:
-          #pump_max_cvp = 750.0*cfs_tafd
-          #pump_max_swp = 750.0*cfs_tafd
-        #else:
-          #pump_max_cvp = 4300.0*cfs_tafd
-          #pump_max_swp = 6680.0*cfs_tafd
-		
-      #calc pumping limit before inflow/export ratio is met
-        #for wyt in ['W', 'AN', 'BN', 'D', 'C']:
-          #outflow ratio 
-          #tax_free_pumping = (self.delta.min_outflow[wyt][x]*cfs_tafd - self.delta.expected_depletion[x])*((1/(1-self.#delta.export_ratio[wyt][x]))-1)
-          #if tax_free_pumping*0.55 > pump_max_cvp:
-            #self.delta.max_tax_free[wyt]['cvp'][0] += pump_max_cvp*self.days_in_month[x]
-            #self.delta.max_tax_free[wyt]['swp'][0] += min(tax_free_pumping - pump_max_cvp, pump_max_swp)*self.days_in_month[x]
-          #else:
-            #self.delta.max_tax_free[wyt]['cvp'][0] += tax_free_pumping*self.days_in_month[x]*0.55
-            #self.delta.max_tax_free[wyt]['swp'][0] += tax_free_pumping*self.days_in_month[x]*0.45
-
-      #for x in range(0,365):
-        #if x > 92 and x < 274:
-          #pump_max_cvp = 750.0*cfs_tafd
-          #pump_max_swp = 750.0*cfs_tafd
-        #else:
-          #pump_max_cvp = 4300.0*cfs_tafd
-          #pump_max_swp = 6680.0*cfs_tafd
-        #m = int(self.index.month[x])
-        #for wyt in ['W', 'AN', 'BN', 'D', 'C']:
-          #tax_free_pumping = (self.delta.min_outflow[wyt][m-1]*cfs_tafd - self.delta.expected_depletion[m-1])*((1/(1-self.#delta.export_ratio[wyt][m-1]))-1)
-          #if tax_free_pumping*0.55 > pump_max_cvp:
-            #self.delta.max_tax_free[wyt]['cvp'][x+1] = self.delta.max_tax_free[wyt]['cvp'][x] - pump_max_cvp
-            #self.delta.max_tax_free[wyt]['swp'][x+1] = self.delta.max_tax_free[wyt]['swp'][x] - min(tax_free_pumping - #pump_max_cvp, pump_max_swp)
-          #else:
-            #self.delta.max_tax_free[wyt]['cvp'][x+1] = self.delta.max_tax_free[wyt]['cvp'][x] - tax_free_pumping*0.55
-            #self.delta.max_tax_free[wyt]['swp'][x+1] = self.delta.max_tax_free[wyt]['swp'][x] - tax_free_pumping*0.45
-
-      for x in range(318, 334):
-        self.delta.x2constraint['W'][x] = 77.0 - 3.0*(x-318)/16
-        self.delta.x2constraint['AN'][x] = 81.0
-
-      for x in range(334,366):
-        self.delta.x2constraint['W'][x] = 74.0
-        self.delta.x2constraint['AN'][x] = 81.0
-      for x in range(0, 30):
-        self.delta.x2constraint['W'][x] = 74.0
-        self.delta.x2constraint['AN'][x] = 81.0
-		
+	
+  def update_regulations_south(self,t):
+    ##infrastructure, banking & contract changes in the southern system (SJRR, Isabella, KWB, SWP table A, ...)
+    ##events are listed in cord/regulations/historical_events.json, and applied on the timestep they occur
+    self.regulation_schedule.apply(self, t, 'south')
+
+  def update_regulations_north(self,t):
+    ##Yuba Accord, Fall X2 & drought TUCP orders in the northern system
     #tucp orders during the drought can be found here:
 	#https://www.waterboards.ca.gov/waterrights/water_issues/programs/drought/tucp/index.html
-    if y == 2014 and dowy == 123:
-      self.delta.min_outflow['C'][1] = 3000
-      self.delta.min_outflow['C'][2] = 3000
-      self.delta.min_outflow['C'][3] = 3000
-      self.delta.min_outflow['C'][4] = 3000
-      self.delta.min_outflow['C'][5] = 3000
-      self.delta.min_outflow['C'][6] = 3000
-	  
-      self.delta.rio_vista_min['C'][8] = 2000
-      self.delta.rio_vista_min['C'][9] = 2000
-      self.delta.rio_vista_min['C'][10] = 2000
-    elif y == 2014 and dowy == 228:
-      self.delta.san_joaquin_min_flow['C'][2] = 500
-    if y == 2014 and dowy == 1:
-      self.delta.san_joaquin_min_flow['C'][2] = 500
-      self.delta.rio_vista_min['C'][8] = 2500
-      self.delta.rio_vista_min['C'][9] = 2500
-      self.delta.rio_vista_min['C'][10] = 2500
-      self.delta.new_vamp_rule['C'] = 710.0
-    elif y == 2015 and dowy == 228:
-      self.delta.san_joaquin_min_flow['C'][2] = 300
-    elif y == 2015 and dowy == 242:
-      self.delta.san_joaquin_min_flow['C'][2] = 200
-	  
-      #expected_outflow_req, expected_depletion = self.delta.calc_expected_delta_outflow(self.shasta.downstream,self.oroville.downstream,self.yuba.downstream,self.folsom.downstream, self.shasta.temp_releases, self.oroville.temp_releases, self.yuba.temp_releases, self.folsom.temp_releases)
-      #expected_outflow_req = self.delta.min_outflow
-      #expected_outflow_req['EC'] = expected_outflow_req['C']
-      #inflow_list = [self.shasta, self.folsom, self.yuba, self.oroville]
-      #for x in inflow_list:
-        #x.calc_expected_min_release(expected_outflow_req, expected_depletion, 0)
-
-    if y == 2015 and dowy == 1:
-      self.delta.min_outflow['C'][1] = 7100
-      self.delta.min_outflow['C'][2] = 7100
-      self.delta.min_outflow['C'][3] = 7100
-      self.delta.min_outflow['C'][4] = 7100
-      self.delta.min_outflow['C'][5] = 7100
-      self.delta.min_outflow['C'][6] = 4000
-      self.delta.san_joaquin_min_flow['C'][2] = 1140
-      self.delta.rio_vista_min['C'][8] = 3000
-      self.delta.rio_vista_min['C'][9] = 3000
-      self.delta.rio_vista_min['C'][10] = 3500
-      self.delta.new_vamp_rule['C'] = 1500.0
-
-      #expected_outflow_req, expected_depletion = self.delta.calc_expected_delta_outflow(self.shasta.downstream,self.oroville.downstream,self.yuba.downstream,self.folsom.downstream, self.shasta.temp_releases, self.oroville.temp_releases, self.yuba.temp_releases, self.folsom.temp_releases)
-      #expected_outflow_req = self.delta.min_outflow
-      #expected_outflow_req['EC'] = expected_outflow_req['C']
-      #inflow_list = [self.shasta, self.folsom, self.yuba, self.oroville]
-      #for x in inflow_list:
-        #x.calc_expected_min_release(expected_outflow_req, expected_depletion, 0)
+    self.regulation_schedule.apply(self, t, 'north')
 
 	  
   def get_iterable(self, x):
@@ -3624,20 +3536,11 @@ class Model():
       return (x,)
 	  	  
   def proj_gains(self,t, dowy, m, year):
-    tot_sac_fnf = 0.0
-    tot_sj_fnf = 0.0
+    #30-day fnf totals are found in initialize_northern_res
+    tot_sac_fnf = self.sac_running_fnf[t]
+    tot_sj_fnf = self.sj_running_fnf[t]
     proj_surplus = np.zeros(12)
     proj_omr = np.zeros(12)
-    for reservoir in [self.shasta, self.oroville, self.yuba, self.folsom]:
-      if t < 30:
-        tot_sac_fnf += np.sum(reservoir.fnf[0:t])*30.0/(t+1)
-      else:
-        tot_sac_fnf += np.sum(reservoir.fnf[(t-30):t])
-    for reservoir in [self.newmelones, self.donpedro, self.exchequer, self.millerton]:
-      if t < 30:
-        tot_sj_fnf += np.sum(reservoir.fnf[0:t])*30.0/(t+1)
-      else:
-        tot_sj_fnf += np.sum(reservoir.fnf[(t-30):t])
 
     for x in range(0, 12):
       if x >= m:
@@ -3682,69 +3585,67 @@ class Model():
     return expected_pumping, max_pumping
 
 		
+  def find_wyt_class(self, index, thresholds, wyt_labels, right):
+    ##water year type of an index (scalar or array), from the bounds between each type (labels go from lowest to highest index)
+    ##right = True -> upper bounds are inclusive (index <= threshold), right = False -> lower bounds are inclusive (index >= threshold)
+    return np.asarray(wyt_labels, dtype = object)[np.digitize(index, thresholds, right = right)]
+
   def find_wyt(self,index):
-    if index <= 2.1:
-      wyt = "C"
-      self.isabella.forecastWYT = "C"
-      self.success.forecastWYT = "C"
-      self.kaweah.forecastWYT = "C"
-      self.millerton.forecastWYT = "C"
-    elif index <= 2.5:
-      wyt = "D"
-      self.isabella.forecastWYT = "D"
-      self.success.forecastWYT = "D"
-      self.kaweah.forecastWYT = "D"
-      self.millerton.forecastWYT = "D"
-    elif index <= 3.1:
-      wyt = "BN"
-      self.isabella.forecastWYT = "BN"
-      self.success.forecastWYT = "BN"
-      self.kaweah.forecastWYT = "BN"
-      self.millerton.forecastWYT = "BN"
-    elif index <= 3.8:
-      wyt = "AN"
-      self.isabella.forecastWYT = "AN"
-      self.success.forecastWYT = "AN"
-      self.kaweah.forecastWYT = "AN"
-      self.millerton.forecastWYT = "AN"
-    else:
-      wyt = "W"
-      self.isabella.forecastWYT = "W"
-      self.success.forecastWYT = "W"
-      self.kaweah.forecastWYT = "W"
-      self.millerton.forecastWYT = "W"
+    wyt = self.find_wyt_class(index, [2.1, 2.5, 3.1, 3.8], ['C', 'D', 'BN', 'AN', 'W'], True)
+    for x in [self.isabella, self.success, self.kaweah, self.millerton]:
+      x.forecastWYT = wyt
     return wyt
 
+  def find_wyt_series(self):
+    ##the water year type classifications used in calc_wytypes, for every day of the simulation
+    ##only the parts that use forecast indicies & fnf are found here, storage-based indicies are still done in calc_wytypes
+    wyt_list = ['C', 'D', 'BN', 'AN', 'W']
+    ##Sacramento Valley Index (shasta & delta)
+    self.delta.forecastSCWYT_daily = self.find_wyt_class(self.delta.forecastSRI, [5.4, 6.6, 7.8, 9.2], wyt_list, True)
+    self.shasta.forecastWYT_daily = self.delta.forecastSCWYT_daily
+    ##San Joaquin Valley Index (don pedro & delta)
+    self.delta.forecastSJWYT_daily = self.find_wyt_class(self.delta.forecastSJI, [2.1, 2.5, 3.1, 3.8], wyt_list, True)
+    self.donpedro.forecastWYT_daily = self.delta.forecastSJWYT_daily
+    ##Oroville - snowmelt forecast, critical in critical SRI years
+    self.oroville.forecastWYT_daily = self.find_wyt_class(self.oroville.snowflood_fnf[0:self.T], [0.55*1.942], ['D', 'W'], False)
+    self.oroville.forecastWYT_daily[self.delta.forecastSRI <= 5.4] = 'C'
+    ##Exchequer - snowmelt forecast
+    self.exchequer.forecastWYT_daily = self.find_wyt_class(self.exchequer.snowflood_fnf[0:self.T], [0.45], ['D', 'AN'], False)
+    ##Yuba - forecast fnf (end-of-september storage is added in calc_wytypes)
+    self.yuba.fnf_index = (self.yuba.rainflood_fnf[0:self.T] + self.yuba.snowflood_fnf[0:self.T])*1000
+
+    ##Folsom & New Melones use fnf totals from fixed periods of each water year
+    day_list = np.arange(self.T)
+    start_of_wy, wy_index = np.unique(day_list - self.dowy[0:self.T], return_inverse = True)
+    folsom_fnf_apr = np.zeros(len(start_of_wy))
+    folsom_fnf_aug = np.zeros(len(start_of_wy))
+    newmelones_fnf_early = np.zeros(len(start_of_wy))
+    newmelones_fnf_spring = np.zeros(len(start_of_wy))
+    newmelones_fnf_aug = np.zeros(len(start_of_wy))
+    for wy, start_day in enumerate(start_of_wy):
+      folsom_fnf_apr[wy] = sum(self.folsom.fnf[(start_day+181):(start_day+211)])
+      folsom_fnf_aug[wy] = sum(self.folsom.fnf[(start_day+304):(start_day+364)])
+      newmelones_fnf_early[wy] = sum(self.newmelones.fnf[(start_day-214):start_day])
+      newmelones_fnf_spring[wy] = sum(self.newmelones.fnf[(start_day+150):(start_day+181)])
+      newmelones_fnf_aug[wy] = sum(self.newmelones.fnf[(start_day+304):(start_day+365)])
+    ##Folsom - after day 150, snowmelt forecast (minus april, plus aug-sept)
+    folsom_index = (self.folsom.snowflood_fnf[0:self.T] - folsom_fnf_apr[wy_index] + folsom_fnf_aug[wy_index])*1000
+    self.folsom.forecastWYT_daily = self.find_wyt_class(folsom_index, [250, 375, 460, 550], wyt_list, False)
+    ##New Melones - fnf since end-of-february storage (before day 150), or forecast fnf after end-of-february (after day 150)
+    newmelones_index_spring = (newmelones_fnf_spring[wy_index] + self.newmelones.snowflood_fnf[0:self.T] + newmelones_fnf_aug[wy_index])*1000
+    self.newmelones.fnf_index = np.where(self.dowy[0:self.T] <= 150, newmelones_fnf_early[wy_index]*1000, newmelones_index_spring)
+
   def calc_wytypes(self,t,dowy):
   
 ####NOTE:  Full natural flow data is in MAF, inflow data is in TAF  
 ##Index for Shasta Min Flows
 ############################
-    if self.delta.forecastSRI[t] <= 5.4:
-      self.shasta.forecastWYT = "C"
-      self.delta.forecastSCWYT = "C"
-    elif self.delta.forecastSRI[t] <= 6.6:
-      self.shasta.forecastWYT = "D"
-      self.delta.forecastSCWYT = "D" 
-    elif self.delta.forecastSRI[t] <= 7.8:
-      self.shasta.forecastWYT = "BN"
-      self.delta.forecastSCWYT = "BN"
-    elif self.delta.forecastSRI[t] <= 9.2:
-      self.shasta.forecastWYT = "AN"
-      self.delta.forecastSCWYT = "AN" 
-    else:
-      self.shasta.forecastWYT = "W"
-      self.delta.forecastSCWYT = "W"
+    self.shasta.forecastWYT = self.shasta.forecastWYT_daily[t]
+    self.delta.forecastSCWYT = self.delta.forecastSCWYT_daily[t]
 
 ##Index for Oroville Min Flows
 ############################	  
-    if self.oroville.snowflood_fnf[t] < 0.55*1.942:
-      self.oroville.forecastWYT = "D"
-    else:
-      self.oroville.forecastWYT = "W"
-    
-    if self.delta.forecastSRI[t] <= 5.4:
-      self.oroville.forecastWYT = "C"
+    self.oroville.forecastWYT = self.oroville.forecastWYT_daily[t]
   
 ##Index for Yuba Min Flows
 ############################	
@@ -3752,7 +3653,7 @@ class Model():
     if eos_date < 0:
       eos_date = 0
 	  
-    yubaIndex = (self.yuba.rainflood_fnf[t] + self.yuba.snowflood_fnf[t])*1000 + self.yuba.S[eos_date] - 234.0
+    yubaIndex = self.yuba.fnf_index[t] + self.yuba.S[eos_date] - 234.0
     if yubaIndex >= 1400:
       self.yuba.forecastWYT = "W" 
     elif yubaIndex >= 1040:
@@ -3796,17 +3697,7 @@ class Model():
       else:
         self.folsom.forecastWYT = "W"
     else:
-      folsomIndex = (self.folsom.snowflood_fnf[t] - sum(self.folsom.fnf[(t-dowy+181):(t-dowy+211)]) + sum(self.folsom.fnf[(t-dowy+304):(t-dowy+364)]))*1000
-      if folsomIndex < 250:
-        self.folsom.forecastWYT = "C"
-      elif folsomIndex < 375:
-        self.folsom.forecastWYT = "D"
-      elif folsomIndex < 460:
-        self.folsom.forecastWYT = "BN"
-      elif folsomIndex < 550:
-        self.folsom.forecastWYT = "AN"
-      else:
-        self.folsom.forecastWYT = "W"
+      self.folsom.forecastWYT = self.folsom.forecastWYT_daily[t]
   
 ##Index for New Melones Min Flows
 ############################
@@ -3814,10 +3705,10 @@ class Model():
       eof_storage = t - dowy - 215
       if eof_storage < 0:
         eof_storage == 0
-      newmelonesIndex = self.newmelones.S[eof_storage] + sum(self.newmelones.fnf[(eof_storage+1):(t-dowy)])*1000
+      newmelonesIndex = self.newmelones.S[eof_storage] + self.newmelones.fnf_index[t]
     else:
       eof_storage = t - dowy + 149
-      newmelonesIndex = self.newmelones.S[eof_storage] + (sum(self.newmelones.fnf[(eof_storage+1):(t-dowy+181)]) + self.newmelones.snowflood_fnf[t] + sum(self.newmelones.fnf[(t-dowy+304):(t-dowy+365)]))*1000
+      newmelonesIndex = self.newmelones.S[eof_storage] + self.newmelones.fnf_index[t]
 	
     if newmelonesIndex < 1400:
       self.newmelones.forecastWYT = "C"
@@ -3832,29 +3723,12 @@ class Model():
   
 ##Index for Don Pedro Min Flows
 ############################
-    if self.delta.forecastSJI[t] <= 2.1:
-      self.donpedro.forecastWYT = "C"
-      self.delta.forecastSJWYT = "C"
-    elif self.delta.forecastSJI[t] <= 2.5:
-      self.donpedro.forecastWYT = "D"
-      self.delta.forecastSJWYT = "D"
-    elif self.delta.forecastSJI[t] <= 3.1:
-      self.donpedro.forecastWYT = "BN"
-      self.delta.forecastSJWYT = "BN"
-    elif self.delta.forecastSJI[t] <= 3.8:
-      self.donpedro.forecastWYT = "AN"
-      self.delta.forecastSJWYT = "AN"
-    else:
-      self.donpedro.forecastWYT = "W"
-      self.delta.forecastSJWYT = "W"
-    
+    self.donpedro.forecastWYT = self.donpedro.forecastWYT_daily[t]
+    self.delta.forecastSJWYT = self.delta.forecastSJWYT_daily[t]
   
 ##Index for Exchequer Min Flows
 ############################	  
-    if self.exchequer.snowflood_fnf[t] < .45:
-      self.exchequer.forecastWYT = "D"
-    else:
-      self.exchequer.forecastWYT = "AN"
+    self.exchequer.forecastWYT = self.exchequer.forecastWYT_daily[t]
   	
     return newmelonesIndex
 
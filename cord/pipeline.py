@@ -0,0 +1,235 @@
+from __future__ import division
+import os
+import time
+import queue
+import threading
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .model import Model
+from .inputter import Inputter
+from .results import write_results
+from .preprocess import find_process_context, init_preprocess_worker, generate_projection_inputs
+
+#####################################################################################################################
+##################################PROJECTION PIPELINE################################################################
+#####################################################################################################################
+
+# generate-and-simulate pipeline for GCM/RCP projections
+# a pool of Inputter worker processes generates each projection's daily inputs, & puts them in a bounded queue
+# a separate pool of Model worker processes takes inputs from the queue & simulates them (writing the release results)
+# when the queue is full, no new projections are generated until a simulation worker takes one (backpressure)
+# so generation runs ahead of simulation by at most queue_size + num_generators projections - up to queue_size waiting
+# in the queue, and up to num_generators being generated or generated & waiting for space in the queue
+# (plus the num_simulators projections being simulated)
+
+#seconds between checks of the queue & the worker pools (so each stage can stop or take finished work while it waits)
+queue_poll_interval = 1.0
+
+
+# northern & southern models for one set of inputs, simulated together (see main.py)
+def simulate_projection(input_data, expected_release_datafile, sd, model_mode, recording_spec, short_test = -1, startTime = None, check_inputs = False):
+  if startTime is None:
+    startTime = datetime.now()
+  modelno = Model(input_data, expected_release_datafile, sd, model_mode, recording_spec)
+  modelso = Model(input_data, expected_release_datafile, sd, model_mode, recording_spec)
+  modelso.max_tax_free = {}
+  modelso.omr_rule_start, modelso.max_tax_free = modelno.northern_initialization_routine(startTime)
+  modelso.southern_initialization_routine(startTime)
+  if check_inputs:
+    modelno.check_daily_inputs()
+    modelso.check_daily_inputs()
+  if (short_test < 0):
+    timeseries_length = min(modelno.T, modelso.T)
+  else:
+    timeseries_length = short_test
+  ###initial parameters for northern model input
+  ###generated from southern model at each timestep
+  swp_release = 1
+  cvp_release = 1
+  swp_release2 = 1
+  cvp_release2 = 1
+  swp_pump = 999.0
+  cvp_pump = 999.0
+  for t in range(0, timeseries_length):
+    if (t % 365 == 364):
+      print('Year ', (t+1)/365, ', ', datetime.now() - startTime)
+    # the northern model takes variables from the southern model as inputs (initialized above), & outputs are used as input variables in the southern model
+    swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, flood_release, flood_volume = modelno.simulate_north(t, swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump)
+
+    swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump = modelso.simulate_south(t, swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, modelno.delta.forecastSJWYT, modelno.delta.max_tax_free, flood_release, flood_volume)
+  return modelno, modelso
+
+# reservoir, canal & pumping releases recorded for each projection
+def find_release_results(modelno, modelso):
+  release_df = pd.DataFrame(index=modelno.index)
+  northern_res_list = [modelno.shasta, modelno.folsom, modelno.oroville, modelno.yuba, modelno.newmelones,
+                       modelno.donpedro, modelno.exchequer]
+  southern_res_list = [modelso.millerton, modelso.success, modelso.kaweah, modelso.isabella]
+  canal_list = [modelso.fkc, modelso.madera, modelso.kernriverchannel, modelso.kaweahriverchannel,
+                modelso.tuleriverchannel]
+  canal_turnout_list = ['OFK', 'MAD', 'CWY', 'OKW', 'OTL']
+  pump_list = [modelno.delta.TRP_pump, modelno.delta.HRO_pump, modelso.calaqueduct.daily_flow['OSW'],
+               modelso.calaqueduct.daily_flow['WRM'], modelso.calaqueduct.daily_flow['SOC']]
+  pump_names = ['TRP_pump', 'HRO_pump', 'DOS_pump', 'BVA_pump', 'EDM_pump']
+  for x in northern_res_list:
+    temp_df = pd.DataFrame(index=modelno.index)
+    temp_df['%s_release' % x.key] = pd.Series(x.R, index=modelno.index)
+    release_df = pd.concat([release_df, temp_df], axis=1)
+  for x in southern_res_list:
+    temp_df = pd.DataFrame(index=modelno.index)
+    temp_df['%s_release' % x.key] = pd.Series(x.R, index=modelso.index)
+    release_df = pd.concat([release_df, temp_df], axis=1)
+  for x, y in zip(canal_list, canal_turnout_list):
+    temp_df = pd.DataFrame(index=modelno.index)
+    temp_df['%s_release' % x.key] = pd.Series(x.daily_flow[y], index=modelso.index)
+    release_df = pd.concat([release_df, temp_df], axis=1)
+  for x, y in zip(pump_list, pump_names):
+    temp_df = pd.DataFrame(index=modelno.index)
+    temp_df[y] = pd.Series(x, index=modelso.index)
+    release_df = pd.concat([release_df, temp_df], axis=1)
+  return release_df
+
+def write_release_results(release_df, file_name, result_format):
+  return write_results(release_df, 'cord/data/results/release_results_' + os.path.splitext(file_name)[0], result_format, os.path.splitext(file_name)[0])
+
+
+# generation stage (runs in an Inputter worker process, set up by preprocess.init_preprocess_worker)
+def generate_projection(file_folder, file_name, number_years, first_leap, seed, export_inputs):
+  start = time.time()
+  input_data = generate_projection_inputs(file_folder, file_name, number_years, first_leap, seed, export_inputs)
+  return file_name, input_data, time.time() - start
+
+# simulation stage (runs in a Model worker process)
+def simulate_projection_inputs(file_name, input_data, expected_release_datafile, sd, model_mode, recording_spec, short_test, result_format):
+  start = time.time()
+  modelno, modelso = simulate_projection(input_data, expected_release_datafile, sd, model_mode, recording_spec, short_test)
+  write_release_results(find_release_results(modelno, modelso), file_name, result_format)
+  return file_name, time.time() - start
+
+
+class PipelineMetrics():
+  #per-stage counts, busy time (in worker processes) & throughput, and how long each stage was held up by the other
+  #'blocked' - generation waiting for space in a full queue (backpressure), simulation waiting for inputs in an empty queue
+  def __init__(self, stages):
+    self.stages = stages
+    self.completed = dict((x, 0) for x in stages)
+    self.busy_time = dict((x, 0.0) for x in stages)
+    self.blocked_time = dict((x, 0.0) for x in stages)
+    self.max_queue_depth = 0
+    self.lock = threading.Lock()
+    self.start_time = time.time()
+    self.end_time = None
+
+  def record(self, stage, busy_time):
+    with self.lock:
+      self.completed[stage] += 1
+      self.busy_time[stage] += busy_time
+
+  def record_blocked(self, stage, blocked_time):
+    with self.lock:
+      self.blocked_time[stage] += blocked_time
+
+  def record_queue_depth(self, depth):
+    with self.lock:
+      self.max_queue_depth = max(self.max_queue_depth, depth)
+
+  def finish(self):
+    self.end_time = time.time()
+
+  def as_df(self):
+    wall_time = (self.end_time if self.end_time is not None else time.time()) - self.start_time
+    df = pd.DataFrame(index = self.stages)
+    df['completed'] = [self.completed[x] for x in self.stages]
+    df['busy_seconds'] = [self.busy_time[x] for x in self.stages]
+    df['blocked_seconds'] = [self.blocked_time[x] for x in self.stages]
+    df['seconds_per_projection'] = df['busy_seconds'] / df['completed'].where(df['completed'] > 0)
+    df['projections_per_hour'] = df['completed'] * 3600.0 / wall_time
+    df['wall_seconds'] = wall_time
+    df['max_queue_depth'] = self.max_queue_depth
+    return df
+
+
+def run_projection_pipeline(file_folder, file_names, base_data_file, expected_release_datafile, sd, model_mode, recording_spec, fit_folder, result_format = 'csv', short_test = -1, number_years = 150, first_leap = 2, seed = 1001, num_generators = 2, num_simulators = 4, queue_size = 2, export_inputs = False):
+  #returns the PipelineMetrics of the run
+  metrics = PipelineMetrics(['generate', 'simulate'])
+  input_queue = queue.Queue(maxsize = queue_size)
+  pipeline_error = []
+  stop_generating = threading.Event()
+
+  def put_input(next_input):
+    #waits for space in the queue, unless the pipeline is stopped
+    while not stop_generating.is_set():
+      try:
+        input_queue.put(next_input, timeout = queue_poll_interval)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def produce(generator_pool):
+    #submits up to num_generators projections at a time, & puts finished inputs in the queue (blocking while it is full)
+    pending = set()
+    try:
+      remaining_files = list(file_names)
+      while (len(remaining_files) > 0 or len(pending) > 0) and not stop_generating.is_set():
+        while len(remaining_files) > 0 and len(pending) < num_generators:
+          pending.add(generator_pool.submit(generate_projection, file_folder, remaining_files.pop(0), number_years, first_leap, seed, export_inputs))
+        done, pending = wait(pending, timeout = queue_poll_interval, return_when = FIRST_COMPLETED)
+        for job in done:
+          file_name, input_data, busy_time = job.result()
+          metrics.record('generate', busy_time)
+          print('Generated ' + file_name)
+          blocked_start = time.time()
+          if not put_input((file_name, input_data)):
+            break
+          metrics.record_blocked('generate', time.time() - blocked_start)
+          metrics.record_queue_depth(input_queue.qsize())
+    except Exception as e:
+      pipeline_error.append(e)
+    finally:
+      for job in pending:
+        job.cancel()
+      #end of inputs (also after an error, so the simulation stage doesn't wait forever)
+      put_input(None)
+
+  #the historical fit is made (or loaded) once here, so generator processes only load it from fit_folder
+  Inputter(base_data_file, expected_release_datafile, model_mode).fit_stochastic_model(fit_folder)
+  with ProcessPoolExecutor(max_workers = num_generators, mp_context = find_process_context(), initializer = init_preprocess_worker, initargs = (base_data_file, expected_release_datafile, model_mode, fit_folder)) as generator_pool, ProcessPoolExecutor(max_workers = num_simulators, mp_context = find_process_context()) as simulator_pool:
+    producer = threading.Thread(target = produce, args = (generator_pool,))
+    producer.daemon = True
+    producer.start()
+    pending = set()
+    inputs_remaining = True
+    try:
+      while inputs_remaining or len(pending) > 0:
+        #take inputs from the queue whenever a simulation worker is free (checking for finished simulations in between)
+        workers_free = inputs_remaining and len(pending) < num_simulators
+        if workers_free:
+          blocked_start = time.time()
+          try:
+            next_input = input_queue.get(timeout = queue_poll_interval)
+          except queue.Empty:
+            next_input = ()
+          metrics.record_blocked('simulate', time.time() - blocked_start)
+          if next_input is None:
+            inputs_remaining = False
+          elif len(next_input) > 0:
+            file_name, input_data = next_input
+            print('Starting ' + file_name)
+            pending.add(simulator_pool.submit(simulate_projection_inputs, file_name, input_data, expected_release_datafile, sd, model_mode, recording_spec, short_test, result_format))
+        if len(pending) > 0:
+          #only waits for a simulation to finish when there are no free workers (or no more inputs)
+          done, pending = wait(pending, timeout = 0 if workers_free else None, return_when = FIRST_COMPLETED)
+          for job in done:
+            file_name, busy_time = job.result()
+            metrics.record('simulate', busy_time)
+            print('Simulated ' + file_name)
+    finally:
+      #stops generation if the simulation stage failed (so the producer isn't left waiting on a full queue)
+      stop_generating.set()
+      producer.join()
+  metrics.finish()
+  if len(pipeline_error) > 0:
+    raise pipeline_error[0]
+  return metrics
@@ -10,6 +10,7 @@ import matplotlib.ticker as ticker
 from matplotlib import gridspec
 from matplotlib.lines import Line2D
 from .util import *
+from .results import read_results
 import seaborn as sns
 from matplotlib.ticker import FormatStrFormatter
 
@@ -141,7 +142,7 @@ def compare_simulation(res_old,res_new,obs,name,freq,freq2, data_name):
 
 
 def compare_contracts():
-  contract_values = pd.read_csv('cord/data/results/contract_results_annual_simulation.csv', index_col = 0)
+  contract_values = read_results('cord/data/results/contract_results_annual_simulation', index_col = 0)
   sns.set()
   fig = plt.figure()
   gs = gridspec.GridSpec(2, 2, width_ratios=[1, 1]) 
@@ -0,0 +1,109 @@
+from __future__ import division
+import io
+import os
+import json
+import zlib
+import hashlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from .inputter import Inputter
+
+#####################################################################################################################
+##################################PROJECTION PREPROCESSING###########################################################
+#####################################################################################################################
+
+# stochastic daily inputs (cord-data-*.csv) for a set of GCM/RCP full-natural flow projections, made before simulation
+# source files are read, hashed & parsed in a thread pool (file I/O), & projections are generated in a process pool from the
+# parsed flows - each worker process loads the fitted historical model once (Inputter.fit_stochastic_model) & runs
+# Inputter.run_routine for each projection
+# a manifest in the projection folder records the source & historical fit hashes (and the seed & calendar) of each output,
+# so projections that are already up to date are skipped (adding a projection file only processes that file)
+manifest_name = 'cord-data-manifest.json'
+
+# Inputter w/ the fitted historical model, one for each worker process
+preprocess_inputter = None
+
+
+def projection_file_name(model_name, projection):
+  return 'CA_FNF_%s_%s_r1i1p1.csv' % (model_name, projection)
+
+def load_manifest(file_folder):
+  manifest_file = os.path.join(file_folder, manifest_name)
+  if os.path.isfile(manifest_file):
+    with open(manifest_file) as f:
+      return json.load(f)
+  return {}
+
+def write_manifest(file_folder, manifest):
+  #written to a temporary file first, so an interrupted run doesn't leave a partial manifest
+  manifest_file = os.path.join(file_folder, manifest_name)
+  with open(manifest_file + '.tmp', 'w') as f:
+    json.dump(manifest, f, indent = 2, sort_keys = True)
+  os.replace(manifest_file + '.tmp', manifest_file)
+
+def find_projection_seed(seed, file_name):
+  #each projection has its own seed, so its inputs don't depend on the order projections are processed in
+  return (seed + zlib.crc32(file_name.encode())) % (2**32)
+
+def find_process_context():
+  #worker processes are started by a forkserver (or spawned, where there is no forkserver) - forking a parent w/
+  #running threads (e.g., the reader threads here, or the pipeline's producer) can leave locks held in the child
+  if 'forkserver' in multiprocessing.get_all_start_methods():
+    return multiprocessing.get_context('forkserver')
+  return multiprocessing.get_context('spawn')
+
+def init_preprocess_worker(base_data_file, expected_release_datafile, model_mode, fit_folder):
+  global preprocess_inputter
+  preprocess_inputter = Inputter(base_data_file, expected_release_datafile, model_mode)
+  preprocess_inputter.fit_stochastic_model(fit_folder)
+
+def generate_projection_inputs(file_folder, file_name, number_years, first_leap, seed, write_csv = True, fnf_df = None):
+  #daily model inputs for one projection, from the worker process' Inputter (fnf_df is the projection file, if it is already read)
+  np.random.seed(find_projection_seed(seed, file_name))
+  return preprocess_inputter.run_routine(file_folder, file_name, 'daily', 1, number_years, first_leap, '1/1/1950', '12/31/2099', 1950, write_csv, fnf_df)
+
+def preprocess_projection(file_folder, file_name, fnf_df, number_years, first_leap, seed):
+  generate_projection_inputs(file_folder, file_name, number_years, first_leap, seed, True, fnf_df)
+  return file_name
+
+def find_manifest_record(source_hash, fit_hash, seed, file_name, number_years, first_leap):
+  #everything an output depends on - it is up to date if its manifest record is the same
+  return {'source_hash': source_hash, 'fit_hash': fit_hash, 'seed': find_projection_seed(seed, file_name), 'number_years': number_years, 'first_leap': first_leap}
+
+def read_stale_projection(file_folder, file_name, record, fit_hash, seed, number_years, first_leap):
+  #reads a projection file once (in an I/O thread) & checks its hash against the manifest record of its output
+  #if the output is out of date, the file is also parsed here, so worker processes only generate the inputs
+  with open(os.path.join(file_folder, file_name), 'rb') as input_file:
+    file_data = input_file.read()
+  new_record = find_manifest_record(hashlib.sha1(file_data).hexdigest(), fit_hash, seed, file_name, number_years, first_leap)
+  if record == new_record and os.path.isfile(os.path.join(file_folder, 'cord-data-' + file_name)):
+    return file_name, new_record, None
+  return file_name, new_record, pd.read_csv(io.BytesIO(file_data))
+
+def preprocess_projections(file_folder, file_names, base_data_file, expected_release_datafile, model_mode, fit_folder, number_years = 150, first_leap = 2, seed = 1001, num_processes = None, num_threads = 4):
+  #returns the list of projection files that were (re)processed
+  #the historical fit is made (or loaded) here first, so worker processes only load it from fit_folder
+  inputter = Inputter(base_data_file, expected_release_datafile, model_mode)
+  inputter.fit_stochastic_model(fit_folder)
+  fit_hash = inputter.find_fit_hash()
+  manifest = load_manifest(file_folder)
+  stale_files = []
+  with ThreadPoolExecutor(max_workers = num_threads) as read_pool, ProcessPoolExecutor(max_workers = num_processes, mp_context = find_process_context(), initializer = init_preprocess_worker, initargs = (base_data_file, expected_release_datafile, model_mode, fit_folder)) as pool:
+    read_jobs = [read_pool.submit(read_stale_projection, file_folder, x, manifest.get(x), fit_hash, seed, number_years, first_leap) for x in file_names]
+    #stale projections are handed to the worker processes as soon as they are read
+    preprocess_jobs = {}
+    for job in as_completed(read_jobs):
+      file_name, record, fnf_df = job.result()
+      if fnf_df is not None:
+        stale_files.append(file_name)
+        preprocess_jobs[pool.submit(preprocess_projection, file_folder, file_name, fnf_df, number_years, first_leap, seed)] = record
+    print('Preprocessing %d of %d projections' % (len(stale_files), len(file_names)))
+    for job in as_completed(preprocess_jobs):
+      file_name = job.result()
+      #manifest is updated as each projection finishes, so an interrupted run keeps the completed ones
+      manifest[file_name] = preprocess_jobs[job]
+      write_manifest(file_folder, manifest)
+      print('Finished ' + file_name)
+  return stale_files
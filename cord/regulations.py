@@ -0,0 +1,105 @@
+from __future__ import division
+import json
+import numpy as np
+
+#####################################################################################################################
+##################################REGULATION SCHEDULE################################################################
+#####################################################################################################################
+
+# dated infrastructure & regulatory changes (e.g., SJRR, Yuba Accord, TUCP orders), applied once on the timestep they occur
+# each event has a trigger & an ordered list of actions:
+# triggers - {'date': 'YYYY-MM-DD'} first timestep on/after the date (the first timestep if the simulation starts later)
+#            {'year': y, 'dowy': d} the day of the water year d in calendar year y
+#            {'timestep': t}
+# events from before the start of the simulation are all applied on the first timestep (in order), events after the end are dropped
+# actions -  {'set': [object, attribute/key, ...], 'value': v} sets model.object.attribute[key]... = v
+#            {'call': 'object.function'} calls model.object.function() (or {'call': 'function'} for model.function())
+# 'region' is 'north' (applied in simulate_north) or 'south' (applied in simulate_south)
+class RegulationSchedule():
+
+  def __init__(self, events = None):
+    self.events = []
+    self.step_events = None
+    self.date_index = None
+    if events is not None:
+      self.add_events(events)
+
+  def add_events(self, events):
+    #events are applied in the order they are added when they fall on the same timestep
+    for x in events:
+      if 'region' not in x or x['region'] not in ['north', 'south']:
+        raise ValueError('regulation event %s needs a region, north or south' % x.get('name', ''))
+      self.events.append(x)
+    self.step_events = None
+
+  def set_calendar(self, index, year, dowy):
+    self.date_index = np.asarray(index.values)
+    self.year = np.asarray(year)
+    self.dowy = np.asarray(dowy)
+    self.step_events = None
+
+  def find_event_timestep(self, event):
+    #timestep that the event is applied on (None if it is not in the simulation)
+    T = len(self.date_index)
+    if 'timestep' in event:
+      t = event['timestep']
+    elif 'date' in event:
+      t = np.searchsorted(self.date_index, np.datetime64(event['date']))
+    elif 'year' in event and 'dowy' in event:
+      event_days = np.nonzero((self.year == event['year']) & (self.dowy == event['dowy']))[0]
+      if len(event_days) > 0:
+        t = event_days[0]
+      elif find_calendar_order(event['year'], event['dowy']) < find_calendar_order(int(self.year[0]), int(self.dowy[0])):
+        t = 0
+      else:
+        t = T
+    else:
+      raise ValueError('regulation event %s needs a date, timestep, or year & dowy' % event.get('name', ''))
+    if t < T:
+      return max(int(t), 0)
+    return None
+
+  def create_step_events(self):
+    self.step_events = {'north': {}, 'south': {}}
+    for x in self.events:
+      t = self.find_event_timestep(x)
+      if t is not None:
+        self.step_events[x['region']].setdefault(t, []).append(x)
+
+  def apply(self, model, t, region):
+    if self.step_events is None:
+      self.create_step_events()
+    if t in self.step_events[region]:
+      for x in self.step_events[region][t]:
+        for action in x['actions']:
+          apply_regulation_action(model, action)
+
+
+# (calendar year, day of the water year) in date order - oct-dec (dowy < 92) come after jan-sep in their calendar year
+def find_calendar_order(year, dowy):
+  return (year, dowy < 92, dowy)
+
+# follow an attribute/key path from the model to the object holding the last item
+def find_regulation_target(model, path):
+  target = model
+  for x in path:
+    if isinstance(target, (dict, list, np.ndarray)):
+      target = target[x]
+    else:
+      target = getattr(target, x)
+  return target
+
+def apply_regulation_action(model, action):
+  if 'set' in action:
+    target = find_regulation_target(model, action['set'][:-1])
+    if isinstance(target, (dict, list, np.ndarray)):
+      target[action['set'][-1]] = action['value']
+    else:
+      setattr(target, action['set'][-1], action['value'])
+  elif 'call' in action:
+    find_regulation_target(model, action['call'].split('.'))()
+  else:
+    raise ValueError('regulation actions are either set or call, not %s' % ', '.join(action))
+
+def load_regulation_schedule(file_name):
+  return RegulationSchedule(json.load(open(file_name))['events'])
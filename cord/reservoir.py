@@ -4,21 +4,27 @@ import calendar
 import matplotlib.pyplot as plt
 import pandas as pd
 import json
+import hashlib
 from .util import *
 
+##flow shape regressions (create_flow_shapes), keyed by reservoir & short record - shared between model instances
+flow_shape_cache = {}
+##expected minimum release tables (calc_expected_min_release), keyed by reservoir & inputs
+min_release_cache = {}
+
 
 class Reservoir():
 
   def __init__(self, df, df_short, key, model_mode):
     self.T = len(df)
     self.index = df.index
-    self.day_year = self.index.dayofyear
-    self.day_month = self.index.day
-    self.year = self.index.year
+    self.day_year = np.asarray(self.index.dayofyear)
+    self.day_month = np.asarray(self.index.day)
+    self.year = np.asarray(self.index.year)
     self.starting_year = int(self.year[0])
     self.ending_year = int(self.year[self.T-1])
     self.number_years = self.ending_year - self.starting_year
-    self.month = self.index.month
+    self.month = np.asarray(self.index.month)
     self.dowy = water_day(self.day_year, self.year)
     self.water_year = water_year(self.month, self.year, self.starting_year)
 
@@ -31,10 +37,10 @@ class Reservoir():
     self.first_d_of_month = first_d_of_month(self.dowy_eom, self.days_in_month)
 
     self.T_short = len(df_short)
-    self.short_day_year = df_short.index.dayofyear
-    self.short_day_month = df_short.index.day
-    self.short_month = df_short.index.month
-    self.short_year = df_short.index.year
+    self.short_day_year = np.asarray(df_short.index.dayofyear)
+    self.short_day_month = np.asarray(df_short.index.day)
+    self.short_month = np.asarray(df_short.index.month)
+    self.short_year = np.asarray(df_short.index.year)
     self.short_starting_year = self.short_year[0]
     self.short_ending_year = int(self.short_year[self.T_short-1])
     self.short_dowy = water_day(self.short_day_year, self.short_year)
@@ -94,7 +100,11 @@ class Reservoir():
       self.precip = df['%s_precip'% key].values * cfs_tafd
       self.downstream = df['%s_gains'% key].values * cfs_tafd
       self.fnf = df['%s_fnf'% key].values / 1000000.0
+      #30-day trailing fnf (through yesterday) used in flow projections
+      self.running_fnf = trailing_window_sum(self.fnf, 30, 1)
       self.R[0] = 0
+      #top of conservation pool for each flood control rule/day of water year
+      self.create_tocs_lookup()
       if model_mode == 'validation':
         self.historical_storage = df['%s_storage'% key].values
         self.hist_releases = df['%s_otf' % key].values * cfs_tafd
@@ -131,6 +141,8 @@ class Reservoir():
     self.consumed_releases = 0.0
     
     self.sjrr_release = 0.0
+    ##SJRR releases are made throughout simulations, validation runs start them in Oct. 2009 (see cord/regulations)
+    self.sjrr_active = model_mode != 'validation'
     self.eos_day = 0
 	##Vectors for flow projections
     self.rainfnf_stds = np.zeros(365)
@@ -151,6 +163,7 @@ class Reservoir():
     self.monthly_demand = {}
     self.monthly_demand_must_fill = {}
     self.numdays_fillup = {}
+    self.month_schedule_key = None
     self.lastYearRainflood = 9999.9
     self.variable_min_flow = 0.0
 
@@ -319,133 +332,150 @@ class Reservoir():
     self.R_to_delta[t] = max(self.R[t] - self.basinuse - self.consumed_releases, 0) # delta calcs need this
 	
 	
+  def find_month_schedule(self, year, m):
+  ##calendar for the 12 monthly blocks projected forward in find_flow_pumping, starting in month m of year -
+  ##only changes once a month, so it is stored & re-used for every day in the month
+    if self.month_schedule_key != (year, m):
+      month_counter = np.arange(0,12)
+      month_evaluate = (m - 1 + month_counter) % 12
+      #flow count restarts in Oct (new water year), new calendar year starts in Jan
+      cross_counter_wy = np.cumsum(np.logical_and(month_evaluate == 9, month_counter > 0)) > 0
+      cross_counter_y = np.cumsum(np.logical_and(month_evaluate == 0, month_counter > 0)) > 0
+      schedule_year = year + cross_counter_y.astype(int)
+      self.month_schedule = {}
+      self.month_schedule['month'] = month_evaluate
+      self.month_schedule['cross_wy'] = cross_counter_wy.astype(int)
+      self.month_schedule['days'] = self.days_in_month[schedule_year, month_evaluate]
+      self.month_schedule['block_end'] = self.dowy_eom[schedule_year, month_evaluate]
+      self.month_schedule['start_of_month'] = self.month_schedule['block_end'] - self.month_schedule['days'] + 1
+      self.month_schedule_key = (year, m)
+    return self.month_schedule
+
   def find_flow_pumping(self, t, m, dowy, wyt, release):
-    # projection_length = 15
-    # first_of_month_shift = dowy - (1 + self.dowy_eom[m-1] - self.days_in_month[m-1])
 	###This function allows us to predict, at a monthly step, how much
     ###flow might come into the reservoir, and the rate at which we will
     ###have to release it, starting right now, in order to avoid spilling water
     ###from flood control rules.  This considers the variable inflow over time but
     ###also the variable flood control rules over time
-    # if t < projection_length:
-    #   flow_range = range(0,projection_length)
-    # else:
-    #   flow_range = range(t-projection_length, t)
-
+    ###the calendar for each month is taken from find_month_schedule, and all 12 months are projected at once -
+    ###only the running min/max rates at the end depend on the months before them
     year = self.year[t] - self.starting_year
     current_storage = self.S[t]#starting storage
-    running_storage = current_storage#storage after each (monthly) timestep
+    schedule = self.find_month_schedule(year, m)
+    month_evaluate = schedule['month']
+    start_of_month = schedule['start_of_month']
+    block_end = schedule['block_end']
+
+    #Project flow for each month
+    ##monthly flow projections based on regression run in create_flow_shapes
+    running_fnf = self.running_fnf[t]
+    if self.key == "MIL" and dowy < 180:
+      running_fnf = min(running_fnf,0.25)
+    month_flow_int = self.flow_shape_regression['slope'][dowy][month_evaluate]*running_fnf + self.flow_shape_regression['intercept'][dowy][month_evaluate]
+    #current month starts today, the rest start on the first of the month
+    block_start = start_of_month.copy()
+    block_start[0] = dowy
+    block_length = block_end - block_start + 1
+    days_remaining = block_end + 1 + schedule['cross_wy']*365 - dowy
+	#what are the mandatory releases between now and the end of each month?
+    if release == 'demand':
+      total_mandatory_releases = self.monthly_demand[wyt][month_evaluate] + self.monthly_demand_must_fill[wyt][month_evaluate]
+    elif release == 'env':
+      # Note: cum_min_release is indexed 0 (for cum total before year starts), 1 for min release left after subtracting first day, ..., to 366 after last day. So for each month, we want the end of this month minus end of last month, indexed +1
+      total_mandatory_releases = self.cum_min_release[wyt][start_of_month] - self.cum_min_release[wyt][block_end+1] + self.aug_sept_min_release[wyt][start_of_month] - self.aug_sept_min_release[wyt][block_end+1]
+    #expected change in reservoir storage
+    reservoir_change_rate = (month_flow_int - total_mandatory_releases)/schedule['days']
+
+    #flood control pool at start and end of each month
+    storage_cap_start, max_cap_start = self.current_tocs_days(np.where(block_start > 0, block_start - 1, 0), self.fci[t])
+    storage_cap_end, max_cap_end = self.current_tocs_days(block_end, self.fci[t])
+    #expected storage at the start & end of each month
+    eom_storage = np.cumsum(np.append(current_storage, reservoir_change_rate*block_length))
+    running_storage = eom_storage[:-1]
+    eom_storage = eom_storage[1:]
+    #rate which flow cannot be released pass in order to avoid missing EOS targets (running minimum through each month)
+    max_daily_uncontrolled = np.minimum.accumulate(np.append(999.99, (eom_storage - self.EOS_target)/days_remaining))[1:]
 
     self.min_daily_uncontrolled = 0.0#rate at which flow has to be released in order to avoid overtopping
-    self.max_daily_uncontrolled = 999.99#rate which flow cannot be released pass in order to avoid missing EOS targets
+    self.max_daily_uncontrolled = max_daily_uncontrolled[-1]
     self.uncontrolled_available = 0.0#maximum volume 'above' flood control, w/o releases
     self.numdays_fillup[release] = 999.99#number of days until reservoir fills
-
-    # this_month_flow = 0.0#period-to-date flow (for calculating monthly distribution)
-    cross_counter_wy = 0
-    cross_counter_y = 0
-    for month_counter in range(0,12):
-      month_evaluate = m - 1 + month_counter
-      if month_evaluate > 11:
-        month_evaluate -= 12
-      if month_evaluate == 9 and month_counter > 0:
-        #restart flow count for new period (Oct-Mar)
-        # this_month_flow = 0
-        cross_counter_wy = 1
-      elif month_evaluate == 0 and month_counter > 0:
-        cross_counter_y = 1
-      # elif month_evaluate == 3:
-      #   #restart flow count for new period (Apr-July)
-      #   this_month_flow = 0
-      # elif month_evaluate == 7:
-      #   #restart flow count for new perio (Aug-Sept)
-      #   this_month_flow = 0
-
-      #Project flow for this month
-	  ##find an estimate for the remaining flow in the given period
-	  ### i.e. total period projection - observed period flow - running monthly flow count
-      ##monthly flow projections based on regression run in create_flow_shapes
-      if t < 30:
-        running_fnf = np.sum(self.fnf[0:t])*30.0/(t+1)
-      else:
-        running_fnf = np.sum(self.fnf[(t-30):(t-1)])
-      if self.key == "MIL" and dowy < 180:
-        month_flow_int = self.flow_shape_regression['slope'][dowy][month_evaluate]*min(running_fnf,0.25) + self.flow_shape_regression['intercept'][dowy][month_evaluate]
+    for month_counter in np.nonzero(eom_storage > storage_cap_end)[0]:
+      #rate of release to avoid flood pool
+      this_month_min_release = (eom_storage[month_counter] - storage_cap_end[month_counter]) / days_remaining[month_counter]
+      #volume of water over the flood pool, no release
+      total_min_release = eom_storage[month_counter] - storage_cap_end[month_counter]
+      differential_storage_change = reservoir_change_rate[month_counter] - (storage_cap_end[month_counter] - storage_cap_start[month_counter])/block_length[month_counter]
+      if storage_cap_start[month_counter] > running_storage[month_counter]:
+        crossover_date = (storage_cap_start[month_counter] - running_storage[month_counter])/differential_storage_change
       else:
-        month_flow_int = self.flow_shape_regression['slope'][dowy][month_evaluate]*running_fnf + self.flow_shape_regression['intercept'][dowy][month_evaluate]
-
-      #month_flow_int = (remaining_flow_proj*self.flow_shape['slope'][month_evaluate]+self.flow_shape['intercept'][month_evaluate])*remaining_flow_proj
-	  #running tally of total flow in the month
-      # this_month_flow += month_flow_int
-      #current month start dowy
-      start_of_month = self.dowy_eom[year+cross_counter_y][month_evaluate] - self.days_in_month[year+cross_counter_y][month_evaluate] + 1
-      block_start = np.where(month_counter == 0, dowy, start_of_month)
-      #current month end dowy
-      block_end = self.dowy_eom[year+cross_counter_y][month_evaluate]
-	  #what are the mandatory releases between now and the end of this month?
-      if release == 'demand':
-        total_mandatory_releases = self.monthly_demand[wyt][month_evaluate] + self.monthly_demand_must_fill[wyt][month_evaluate]
-      elif release == 'env':
-        # Note: cum_min_release is indexed 0 (for cum total before year starts), 1 for min release left after subtracting first day, ..., to 366 after last day. So for each month, we want the end of this month minus end of last month, indexed +1
-        total_mandatory_releases = self.cum_min_release[wyt][start_of_month] - self.cum_min_release[wyt][block_end+1] + self.aug_sept_min_release[wyt][start_of_month] - self.aug_sept_min_release[wyt][block_end+1]
-      #expected change in reservoir storage
-      reservoir_change_rate = (month_flow_int - total_mandatory_releases)/self.days_in_month[year+cross_counter_y][month_evaluate]
-
-      #flood control pool at start and end of the month
-      storage_cap_start, max_cap_start = self.current_tocs(np.where(block_start > 0, block_start - 1, 0) ,self.fci[t])
-      storage_cap_end, max_cap_end = self.current_tocs(block_end, self.fci[t])
-      eom_storage = running_storage
-      crossover_date = 0.0
-      #expected storage at the end of the month
-      eom_storage = running_storage + reservoir_change_rate*(block_end - block_start + 1)
-      self.max_daily_uncontrolled = min((eom_storage - self.EOS_target)/(block_end + 1 + cross_counter_wy*365 - dowy), self.max_daily_uncontrolled)
-      if eom_storage > storage_cap_end:
-        #rate of release to avoid flood pool
-        this_month_min_release = (eom_storage - storage_cap_end ) / (block_end + 1 + cross_counter_wy*365 - dowy)
-        #volume of water over the flood pool, no release
-        total_min_release = eom_storage - storage_cap_end
-        differential_storage_change = reservoir_change_rate - (storage_cap_end - storage_cap_start)/(block_end - block_start + 1)
-        if storage_cap_start > running_storage:
-          crossover_date = (storage_cap_start - running_storage)/differential_storage_change
-        else:
-          crossover_date = 0.0
-        numdays_fillup = block_start + crossover_date + cross_counter_wy*365 - dowy
-
-        #total volume & rate are the maximum monthly value over the next 12 months
-        self.min_daily_uncontrolled = min(max(this_month_min_release, self.min_daily_uncontrolled), self.max_daily_uncontrolled)
-        self.uncontrolled_available = max(total_min_release, self.uncontrolled_available)
-        self.numdays_fillup[release] = min(numdays_fillup, self.numdays_fillup[release])
-
-      # if (self.key == 'MIL'):
-      #   print(t,dowy,m,month_evaluate,start_of_month,block_start,block_end,self.numdays_fillup[release],
-      #         self.min_daily_uncontrolled,self.uncontrolled_available,eom_storage,storage_cap_end)
-      running_storage = eom_storage
-
-
-
-
+        crossover_date = 0.0
+      numdays_fillup = block_start[month_counter] + crossover_date + schedule['cross_wy'][month_counter]*365 - dowy
+
+      #total volume & rate are the maximum monthly value over the next 12 months
+      self.min_daily_uncontrolled = min(max(this_month_min_release, self.min_daily_uncontrolled), max_daily_uncontrolled[month_counter])
+      self.uncontrolled_available = max(total_min_release, self.uncontrolled_available)
+      self.numdays_fillup[release] = min(numdays_fillup, self.numdays_fillup[release])
+
+
+  def create_tocs_lookup(self):
+  ##Evaluates the rules from tocs_rule in *_properties.json file for every day of the water year, one row for each
+  ##flood control index in tocs_rule['index'] - tocs_storage_table is the rule curve interpolated to that day, tocs_day_table
+  ##is the lowest point on the rule curve for the rest of the water year (capped at capacity)
+  ##needs to be re-run whenever tocs_rule or capacity are changed (i.e. regulation updates in the model class)
+    num_rules = len(self.tocs_rule['index'])
+    self.tocs_index = list(self.tocs_rule['index'])
+    self.tocs_storage_table = np.zeros((num_rules, 366))
+    self.tocs_day_table = np.ones((num_rules, 366))*self.capacity
+    for i in range(0, num_rules):
+      self.tocs_storage_table[i] = np.interp(np.arange(366), self.tocs_rule['dowy'][i], self.tocs_rule['storage'][i])
+      for x, y in enumerate(self.tocs_rule['dowy'][i]):
+        self.tocs_day_table[i][0:max(y, 0)] = np.minimum(self.tocs_day_table[i][0:max(y, 0)], self.tocs_rule['storage'][i][x])
 
   def current_tocs(self,dowy,ix):
   ##Interpolates rules from tocs_rule in *_properties.json file to get the top of the conservation
   ##pool in order to determine flood control releases in reservoir.step
-    for i,v in enumerate(self.tocs_rule['index']):
+  ##rule curves are looked up from the tables made in create_tocs_lookup, then interpolated between the two
+  ##flood control index values that bound ix (same arithmetic as np.interp, so results are identical)
+    for i,v in enumerate(self.tocs_index):
       if ix > v:
         break
-    storage_bounds = np.zeros(2)
-    index_bounds = np.zeros(2)
-    day_bounds = np.ones(2)*self.capacity
-    for x, y in enumerate(self.tocs_rule['dowy'][i-1]):
-      if dowy < y:
-        day_bounds[1] = min(day_bounds[1], self.tocs_rule['storage'][i-1][x])
-    for x, y in enumerate(self.tocs_rule['dowy'][i]):
-      if dowy < y:
-        day_bounds[0] = min(day_bounds[0], self.tocs_rule['storage'][i][x])
-		
-    storage_bounds[1] = np.interp(dowy, self.tocs_rule['dowy'][i-1], self.tocs_rule['storage'][i-1])
-    storage_bounds[0] = np.interp(dowy, self.tocs_rule['dowy'][i], self.tocs_rule['storage'][i])
-    index_bounds[1] = self.tocs_rule['index'][i-1]
-    index_bounds[0] = self.tocs_rule['index'][i]
-    return np.interp(ix, index_bounds, storage_bounds), np.interp(ix, index_bounds, day_bounds)
+    dowy = int(dowy)
+    storage_low = self.tocs_storage_table[i][dowy]
+    storage_high = self.tocs_storage_table[i-1][dowy]
+    day_low = self.tocs_day_table[i][dowy]
+    day_high = self.tocs_day_table[i-1][dowy]
+    index_low = self.tocs_index[i]
+    index_high = self.tocs_index[i-1]
+    if index_low >= index_high:
+      return np.interp(ix, [index_low, index_high], [storage_low, storage_high]), np.interp(ix, [index_low, index_high], [day_low, day_high])
+    elif ix <= index_low:
+      return storage_low, day_low
+    elif ix >= index_high:
+      return storage_high, day_high
+    index_range = index_high - index_low
+    return (storage_high - storage_low)/index_range*(ix - index_low) + storage_low, (day_high - day_low)/index_range*(ix - index_low) + day_low
+
+  def current_tocs_days(self,dowy,ix):
+  ##same as current_tocs, but for an array of days of the water year w/ a single flood control index
+    for i,v in enumerate(self.tocs_index):
+      if ix > v:
+        break
+    storage_low = self.tocs_storage_table[i][dowy]
+    storage_high = self.tocs_storage_table[i-1][dowy]
+    day_low = self.tocs_day_table[i][dowy]
+    day_high = self.tocs_day_table[i-1][dowy]
+    index_low = self.tocs_index[i]
+    index_high = self.tocs_index[i-1]
+    if index_low >= index_high:
+      tocs_days = [self.current_tocs(d, ix) for d in dowy]
+      return np.array([x[0] for x in tocs_days]), np.array([x[1] for x in tocs_days])
+    elif ix <= index_low:
+      return storage_low, day_low
+    elif ix >= index_high:
+      return storage_high, day_high
+    index_range = index_high - index_low
+    return (storage_high - storage_low)/index_range*(ix - index_low) + storage_low, (day_high - day_low)/index_range*(ix - index_low) + day_low
 
   def rights_call(self,downstream_flow, reset = 0):
     if reset == 0:
@@ -490,10 +520,7 @@ class Reservoir():
 	  
   def find_emergency_supply(self, t, m, dowy):
     
-    if t < 30:
-      running_fnf = np.sum(self.fnf[0:t])*30.0/(t+1)
-    else:
-      running_fnf = np.sum(self.fnf[(t-30):(t-1)])
+    running_fnf = self.running_fnf[t]
 
     if m < 10:
       flow_oct_nov = (self.flow_shape_regression['slope'][dowy][9] + self.flow_shape_regression['slope'][dowy][10])*running_fnf + self.flow_shape_regression['intercept'][dowy][9] + self.flow_shape_regression['intercept'][dowy][10]
@@ -511,125 +538,138 @@ class Reservoir():
   def calc_expected_min_release(self,delta_req,depletions,sjrr_toggle):
     ##this function calculates the total expected releases needed to meet environmental minimums used in the find_available_storage function
     ##calclulated as a pre-processing function (w/find_release_func)
-    startYear = self.short_year[0]
+    ##the tables only depend on the inputs & the short record, so they are shared by all calls with the same inputs
     startFeb = (self.dowy_eom[self.non_leap_year][0] + 1)
     startAug = (self.dowy_eom[self.non_leap_year][6] + 1)
-    for wyt in self.wytlist:
-      self.cum_min_release[wyt][0] = 0.0
-      self.aug_sept_min_release[wyt][0] = 0.0	  
-      self.oct_nov_min_release[wyt][0] = 0.0 	  
+    cache_key = (self.key, self.find_min_release_hash(delta_req, depletions, sjrr_toggle))
+    if cache_key not in min_release_cache:
+      min_release_cache[cache_key] = self.find_min_release_tables(delta_req, depletions, sjrr_toggle, startFeb, startAug)
+    min_release_tables = min_release_cache[cache_key]
 
     ##the cum_min_release is a 365x1 vector representing each day of the coming water year.  In each day, the value is equal to 
 	##the total expected minimum releases remaining in the water year, so that the 0 index is the sum of all expected releases,
 	##with the total value being reduce as the index values go up, until the value is zero at the last index spot
+	##(only the spots through july are filled for cum_min_release, oct_nov/aug_sept hold their totals outside of their periods)
+    for wyt in self.wytlist:
+      self.cum_min_release[wyt][0:startAug] = min_release_tables['cum'][wyt]
+      self.aug_sept_min_release[wyt][0:365] = min_release_tables['aug_sept'][wyt]
+      self.oct_nov_min_release[wyt][0:365] = min_release_tables['oct_nov'][wyt]
+
+  def find_min_release_hash(self, delta_req, depletions, sjrr_toggle):
+    ##fingerprint of everything that goes into the expected minimum release tables
+    input_list = [np.asarray(depletions, dtype=float), np.asarray([sjrr_toggle, self.delta_outflow_pct, self.nodd_meets_envmin, self.has_downstream_target_flow], dtype=float)]
+    ##calendar of the simulation (month of each day in the first water year, and the month boundaries of a non-leap year)
+    input_list.append(np.asarray(self.month[0:364], dtype=float))
+    input_list.append(np.asarray(self.dowy_eom[self.non_leap_year], dtype=float))
+    input_list.append(np.asarray(self.first_d_of_month[self.non_leap_year], dtype=float))
+    for wyt in self.wytlist:
+      input_list.append(np.asarray(delta_req[wyt], dtype=float))
+      input_list.append(np.asarray(self.env_min_flow[wyt], dtype=float))
+      input_list.append(np.asarray(self.temp_releases[wyt], dtype=float))
+    if not self.nodd_meets_envmin:
+      input_list.append(np.asarray(self.nodd, dtype=float))
+    if self.has_downstream_target_flow:
+      input_list.append(np.asarray(self.downstream_short[0:self.T_short], dtype=float))
+      ##days in each month of each year (leap year phase) used to average the monthly shortfalls
+      input_list.append(np.asarray(self.days_in_month, dtype=float))
+      input_list.append(np.asarray([ord(x) for x in ''.join(self.hist_wyt)], dtype=float))
+      if sjrr_toggle == 1:
+        input_list.append(np.asarray(self.rainflood_fnf[0:self.T_short], dtype=float))
+        input_list.append(np.asarray(self.snowflood_fnf[0:self.T_short], dtype=float))
+        input_list.append(np.asarray([ord(x) for x in json.dumps(self.sj_restoration_proj, sort_keys=True)], dtype=float))
+    return hashlib.sha1(b''.join([np.ascontiguousarray(x).tobytes() for x in input_list])).hexdigest()
+
+  def find_min_release_tables(self, delta_req, depletions, sjrr_toggle, startFeb, startAug):
+    ##expected minimum releases on each day of the water year (days 1 - 364), in each wyt
+    ##remaining releases are then found w/running sums of the daily values, from the start of each period
     downstream_release = {}
     for wyt in self.wytlist:
       downstream_release[wyt] = np.zeros(12)
 
     if self.has_downstream_target_flow:
-      current_obs = np.zeros(12)
-      for t in range(1,self.T_short):
-        dowy = self.short_dowy[t - 1]
-        m = self.short_month[t - 1]
-        da = self.short_day_month[t - 1]
-        y = self.short_year[t - 1] - self.short_starting_year
-        wateryear = self.short_water_year[t - 1]
-        wyt = self.hist_wyt[wateryear]
-        if m == 9 and da == 30:
-          for month_count in range(0,9):
-            if current_obs[month_count]/self.days_in_month[y][month_count] > downstream_release[wyt][month_count]:
-              downstream_release[wyt][month_count] = current_obs[month_count]/self.days_in_month[y][month_count]
-          for month_count in range(9,12):
-            if current_obs[month_count]/self.days_in_month[y-1][month_count] > downstream_release[wyt][month_count]:
-              downstream_release[wyt][month_count] = current_obs[month_count]/self.days_in_month[y-1][month_count]
-          current_obs = np.zeros(12)
-        if sjrr_toggle == 1:
-          sjrr_flow = self.sj_riv_res_flows(t, dowy)
-          downstream_req = max(self.temp_releases[wyt][m-1]*cfs_tafd, sjrr_flow)
-        else:
-          sjrr_flow = 0.0
-          downstream_req = self.temp_releases[wyt][m-1]*cfs_tafd
-		
-        current_obs[m-1] += max(downstream_req - self.downstream_short[t-1],0.0)
+      ##daily shortfall of the downstream gains relative to the downstream temperature/flow target
+      num_days = self.T_short - 1
+      wyt_keys = sorted(set(self.hist_wyt))
+      wyt_index = np.asarray([wyt_keys.index(x) for x in self.hist_wyt])[self.short_water_year[0:num_days]]
+      month_index = self.short_month[0:num_days] - 1
+      temp_release_table = np.asarray([self.temp_releases[x] for x in wyt_keys], dtype=float)
+      downstream_req = temp_release_table[wyt_index, month_index]*cfs_tafd
+      if sjrr_toggle == 1:
+        sjrr_flow = np.asarray([self.sj_riv_res_flows(t, self.short_dowy[t - 1]) for t in range(1,self.T_short)])
+        downstream_req = np.maximum(downstream_req, sjrr_flow)
+      daily_obs = np.maximum(downstream_req - self.downstream_short[0:num_days], 0.0)
+
+      ##shortfalls are summed by month from each sept. 30th to the next (the sept. 30th shortfall counts toward the following year)
+      ##and each complete year sets the maximum monthly average shortfall for its wyt
+      end_of_year = (self.short_month[0:num_days] == 9) & (self.short_day_month[0:num_days] == 30)
+      year_index = np.cumsum(end_of_year)
+      end_days = np.nonzero(end_of_year)[0]
+      current_obs = np.zeros((len(end_days) + 1, 12))
+      np.add.at(current_obs, (year_index, month_index), daily_obs)
+      for year_count, t in enumerate(end_days):
+        wyt = self.hist_wyt[self.short_water_year[t]]
+        y = self.short_year[t] - self.short_starting_year
+        monthly_obs = np.zeros(12)
+        monthly_obs[0:9] = current_obs[year_count][0:9]/self.days_in_month[y][0:9]
+        monthly_obs[9:12] = current_obs[year_count][9:12]/self.days_in_month[y-1][9:12]
+        downstream_release[wyt] = np.maximum(downstream_release[wyt], monthly_obs)
       for x in range(0,12):
         for wyt in self.wytlist:
           downstream_release[wyt][x] = max((delta_req[wyt][x]*cfs_tafd-depletions[x])*self.delta_outflow_pct + max(downstream_release[wyt][x] - self.temp_releases[wyt][x],0.0), downstream_release[wyt][x])
-		  
-    if self.nodd_meets_envmin:
-	   ###First, the total environmental minimum flows are summed over the whole year at day 0
-      for x in range(1,365):
-        for wyt in self.wytlist:
-          m = self.month[x - 1]
-          reservoir_target_release = self.env_min_flow[wyt][m-1]*cfs_tafd
-          downstream_needs = downstream_release[wyt][m-1]
-          if x < startAug:
-            self.cum_min_release[wyt][0] += max(reservoir_target_release,downstream_needs)
-          else:
-            self.aug_sept_min_release[wyt][0] += max(reservoir_target_release,downstream_needs)	  
-          if x < startFeb:
-            self.oct_nov_min_release[wyt][0] += max(reservoir_target_release,downstream_needs)	  
-	    ##THen, we loop through all 365 index spots, removing one day of releases at a time until index 365 = 0.0
-      for x in range(1,365):
-        for wyt in self.wytlist:
-          m = self.month[x - 1]
-          reservoir_target_release = self.env_min_flow[wyt][m-1]*cfs_tafd
-          downstream_needs = downstream_release[wyt][m-1]
-          if x < startAug:
-            self.cum_min_release[wyt][x] = self.cum_min_release[wyt][x-1] - max(reservoir_target_release,downstream_needs)
-            self.aug_sept_min_release[wyt][x] = self.aug_sept_min_release[wyt][0]
-          else:
-            self.aug_sept_min_release[wyt][x] = self.aug_sept_min_release[wyt][x-1] - max(reservoir_target_release,downstream_needs)
-          if x < startFeb:
-            self.oct_nov_min_release[wyt][x] = self.oct_nov_min_release[wyt][x-1] - max(reservoir_target_release,downstream_needs)
-          else:
-            self.oct_nov_min_release[wyt][x] = self.oct_nov_min_release[wyt][0]
 
+    ##north of delta demands are included w/ release requirements (if they are not already met by the environmental minimums)
+    day_list = np.arange(1,365)
+    month_index = self.month[0:364] - 1
+    if self.nodd_meets_envmin:
+      nodd_needs = np.zeros(364)
     else:
-	##Same as above, but north of delta demands are included w/ release requirements
-      for x in range(1,365):
-        for wyt in self.wytlist:
-          m = self.month[x - 1]
-          reservoir_target_release = self.env_min_flow[wyt][m-1]*cfs_tafd
-          downstream_needs = downstream_release[wyt][m-1] + np.interp(x,self.first_d_of_month[self.non_leap_year], self.nodd)
-          if x < startAug:
-            self.cum_min_release[wyt][0] += max(reservoir_target_release,downstream_needs)
-          else:
-            self.aug_sept_min_release[wyt][0] += max(reservoir_target_release,downstream_needs)	  
-          if x < startFeb:
-            self.oct_nov_min_release[wyt][0] += max(reservoir_target_release,downstream_needs)	  
-			
-      for x in range(1,365):
-        for wyt in self.wytlist:
-          m = self.month[x - 1]
-          reservoir_target_release = self.env_min_flow[wyt][m-1]*cfs_tafd
-          downstream_needs = downstream_release[wyt][m-1] + np.interp(x,self.first_d_of_month[self.non_leap_year], self.nodd)
-          if x < startAug:
-            self.cum_min_release[wyt][x] = self.cum_min_release[wyt][x-1] - max(reservoir_target_release,downstream_needs)
-            self.aug_sept_min_release[wyt][x] = self.aug_sept_min_release[wyt][0]
-          else:
-            self.aug_sept_min_release[wyt][x] = self.aug_sept_min_release[wyt][x-1] - max(reservoir_target_release,downstream_needs)
-          if x < startFeb:
-            self.oct_nov_min_release[wyt][x] = self.oct_nov_min_release[wyt][x-1] - max(reservoir_target_release,downstream_needs)
-          else:
-            self.oct_nov_min_release[wyt][x] = self.oct_nov_min_release[wyt][0]
+      nodd_needs = np.interp(day_list, self.first_d_of_month[self.non_leap_year], self.nodd)
+
+    min_release_tables = {}
+    for table_name in ['cum', 'aug_sept', 'oct_nov']:
+      min_release_tables[table_name] = {}
+    for wyt in self.wytlist:
+      reservoir_target_release = np.asarray(self.env_min_flow[wyt], dtype=float)[month_index]*cfs_tafd
+      downstream_needs = downstream_release[wyt][month_index]
+      if not self.nodd_meets_envmin:
+        downstream_needs = downstream_needs + nodd_needs
+      daily_release = np.maximum(reservoir_target_release, downstream_needs)
+      ##cumulative releases remaining through july, during aug-sept, and during oct-jan
+      min_release_tables['cum'][wyt] = self.find_remaining_release(daily_release[day_list < startAug])
+      aug_sept_remaining = self.find_remaining_release(daily_release[day_list >= startAug])
+      min_release_tables['aug_sept'][wyt] = np.concatenate((np.ones(startAug - 1)*aug_sept_remaining[0], aug_sept_remaining))
+      oct_nov_remaining = self.find_remaining_release(daily_release[day_list < startFeb])
+      min_release_tables['oct_nov'][wyt] = np.concatenate((oct_nov_remaining, np.ones(365 - startFeb)*oct_nov_remaining[0]))
+
+    return min_release_tables
+
+  def find_remaining_release(self, daily_release):
+    ##total release over the period at index 0, then removing one day of releases at a time until the last index = 0.0
+    ##(running sums are taken in order, so the totals are summed/subtracted the same way as a daily loop)
+    total_release = np.cumsum(np.concatenate(([0.0], daily_release)))[-1]
+    return np.cumsum(np.concatenate(([total_release], -1.0*daily_release)))
 	
   def create_flow_shapes(self, df_short):
+    ##linear regressions of the flow in each month against the 30-day trailing fnf on each day of the water year (365 x 12 regressions)
+    ##for days after the end of a month, the month is regressed against the fnf in the year before it
+    ##slope & intercept are found in closed form (centered sums), same least-squares fit as np.polyfit(x, y, 1)
+    ##the tables only depend on the short record, so they are shared by all reservoirs (i.e., both model instances) with the same inputs
     flow_series = df_short['%s_inf'% self.key].values * cfs_tafd
     fnf_series = df_short['%s_fnf'% self.key].values / 1000000.0
+    cache_key = (self.key, hashlib.sha1(np.ascontiguousarray(flow_series).tobytes() + np.ascontiguousarray(fnf_series).tobytes()).hexdigest())
+    if cache_key in flow_shape_cache:
+      self.flow_shape_regression = flow_shape_cache[cache_key]
+      return
     startYear = self.short_starting_year
     endYear = self.short_ending_year
     numYears = endYear - startYear
-    self.flow_shape_regression = {}
-    self.flow_shape_regression['slope'] = np.zeros((365,12))
-    self.flow_shape_regression['intercept'] = np.zeros((365,12))
     monthly_flow = np.zeros((12, (endYear - startYear)))
     running_fnf = np.zeros((365,(endYear - startYear)))
+    np.add.at(monthly_flow, (self.short_month[1:self.T_short] - 1, self.short_water_year[1:self.T_short]), flow_series[0:(self.T_short - 1)])
     prev_fnf = 0.0
     for t in range(1,(self.T_short)):
-      m = self.short_month[t]
       dowy = self.short_dowy[t]
       wateryear = self.short_water_year[t]
-      monthly_flow[m-1][wateryear] += flow_series[t-1]
       prev_fnf += fnf_series[t-1]
       if t > 30:
         prev_fnf -= fnf_series[t-31]
@@ -641,55 +681,49 @@ class Reservoir():
         else:
           running_fnf[dowy][wateryear] = prev_fnf
 
-		
-    for x in range(0,365): 
-      if self.key == "XXX":
+    #regress for gains in oct-mar period and april-jul period. Use non-leap year.
+    #same-year regression (day x is before the end of month mm), and lagged regression (month mm in the year after the fnf observation)
+    same_year = self.find_linear_coefficients(running_fnf, monthly_flow)
+    lagged_year = self.find_linear_coefficients(running_fnf[:, 0:(numYears-1)], monthly_flow[:, 1:numYears])
+    use_same_year = np.arange(365)[:, None] <= self.dowy_eom[self.non_leap_year][None, :]
+    self.flow_shape_regression = {}
+    self.flow_shape_regression['slope'] = np.where(use_same_year, same_year[0], lagged_year[0])
+    self.flow_shape_regression['intercept'] = np.where(use_same_year, same_year[1], lagged_year[1])
+    flow_shape_cache[cache_key] = self.flow_shape_regression
+
+    if self.key == "XXX":
+      for x in range(0,365):
         fig = plt.figure()
-      #regress for gains in oct-mar period and april-jul period. Use non-leap year.
-      coef_save = np.zeros((12,2))
-      for mm in range(0,12):
-        if x <= self.dowy_eom[self.non_leap_year][mm]:
-          one_year_runfnf = running_fnf[x]
-          monthly_flow_predict = monthly_flow[mm]
-        else:
-          monthly_flow_predict = np.zeros(numYears-1)
-          one_year_runfnf = np.zeros(numYears-1)
-          for yy in range(1,numYears):
-            monthly_flow_predict[yy-1] = monthly_flow[mm][yy]
-            one_year_runfnf[yy-1] = running_fnf[x][yy-1]
-
-
-        coef = np.polyfit(one_year_runfnf, monthly_flow_predict, 1)
-        self.flow_shape_regression['slope'][x][mm] = coef[0]
-        self.flow_shape_regression['intercept'][x][mm] = coef[1]
-        if self.key == "XXX":
-          coef_save[mm][0] = coef[0]
-          coef_save[mm][1] = coef[1]
-          r = np.corrcoef(one_year_runfnf,monthly_flow_predict)[0,1]
-          print(x, end = " ")
-          print(mm, end = " ")
-          print(r, end = " ")
-          print(self.key)
-      if self.key == "XXX":
         for mm in range(0,12):
           ax1 = fig.add_subplot(4,3,mm+1)
-          if x <= self.dowy_eom[self.non_leap_year][mm]:
+          if use_same_year[x][mm]:
             monthly_flow_predict = monthly_flow[mm]
             one_year_runfnf = running_fnf[x]
           else:
-            monthly_flow_predict = np.zeros(numYears-1)
-            one_year_runfnf = np.zeros(numYears-1)
-            for yy in range(1,numYears):
-              monthly_flow_predict[yy-1] = monthly_flow[mm][yy]
-              one_year_runfnf[yy-1] = running_fnf[x][yy-1]
-
+            monthly_flow_predict = monthly_flow[mm][1:numYears]
+            one_year_runfnf = running_fnf[x][0:(numYears-1)]
           ax1.scatter(one_year_runfnf, monthly_flow_predict, s=50, c='red', edgecolor='none', alpha=0.7)
-          ax1.plot([0.0, np.max(one_year_runfnf)], [coef_save[mm][1], (np.max(one_year_runfnf)*coef_save[mm][0] + coef_save[mm][1])],c='red')
+          ax1.plot([0.0, np.max(one_year_runfnf)], [self.flow_shape_regression['intercept'][x][mm], (np.max(one_year_runfnf)*self.flow_shape_regression['slope'][x][mm] + self.flow_shape_regression['intercept'][x][mm])],c='red')
           ax1.set_xlim([np.min(one_year_runfnf), np.max(one_year_runfnf)])
         plt.show()
         plt.close()
 
-			
+  def find_linear_coefficients(self, x_obs, y_obs):
+    ##least-squares slope & intercept of every row of y_obs (months) regressed on every row of x_obs (days), from centered sums
+    ##returns (rows of x_obs x rows of y_obs) arrays - if a row of x_obs has no variance, the fit is flat (slope 0, intercept = mean of y)
+    x_mean = np.mean(x_obs, axis = 1)
+    y_mean = np.mean(y_obs, axis = 1)
+    x_centered = x_obs - x_mean[:, None]
+    y_centered = y_obs - y_mean[:, None]
+    sum_xx = np.sum(x_centered*x_centered, axis = 1)
+    sum_xy = np.dot(x_centered, y_centered.T)
+    slope = np.zeros(sum_xy.shape)
+    has_variance = sum_xx > 0.0
+    slope[has_variance] = sum_xy[has_variance]/sum_xx[has_variance][:, None]
+    intercept = y_mean[None, :] - slope*x_mean[:, None]
+    return slope, intercept
+
+
   def find_release_func(self):
     ##this function is used to make forecasts when calculating available storage for export releases from reservoir
     ##using data from 1996 to 2016 (b/c data is available for all inputs needed), calculate total flows in oct-mar period and apr-jul period
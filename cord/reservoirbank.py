@@ -0,0 +1,300 @@
+from __future__ import division
+import numpy as np
+from .reservoir import Reservoir
+from .util import *
+
+
+##scalar operating state of a reservoir that is held in the ReservoirBank arrays (one value per member reservoir)
+bank_state = ['consumed_releases', 'gains_to_delta', 'basinuse', 'envmin', 'fcr', 'max_fcr', 'variable_min_flow', 'sjrr_release', 'din', 'dout', 'sodd', 'force_spill',
+              'min_daily_uncontrolled', 'max_daily_uncontrolled', 'uncontrolled_available', 'rainflood_flows', 'snowflood_flows', 'baseline_flows', 'evap_forecast',
+              'EOS_target', 'lastYearEOS_target', 'lastYearRainflood', 'saved_water']
+bank_state_int = ['exceedence_level', 'eos_day']
+##daily (length T) & day-of-water-year (length 365) reservoir series stacked into ReservoirBank arrays
+bank_series = ['S', 'R', 'Q', 'E', 'tocs', 'available_storage', 'flood_storage', 'Rtarget', 'R_to_delta', 'downstream', 'fci', 'running_fnf',
+               'rainflood_forecast', 'snowflood_forecast', 'baseline_forecast', 'rainflood_inf', 'snowflood_inf', 'baseline_inf',
+               'raininf_stds', 'snowinf_stds', 'baseinf_stds']
+bank_wytlist = ['W', 'AN', 'BN', 'D', 'C', 'EC']
+
+
+class BankState(object):
+  ##attribute of a BankedReservoir that reads/writes its element of a ReservoirBank state array
+  def __init__(self, name):
+    self.name = name
+
+  def __get__(self, obj, objtype = None):
+    if obj is None:
+      return self
+    return obj.bank.state[self.name][obj.bank_index]
+
+  def __set__(self, obj, value):
+    obj.bank.state[self.name][obj.bank_index] = value
+
+
+class BankedReservoir(Reservoir):
+  ##Reservoir that is a member of a ReservoirBank - all reservoir methods & attributes work as before, but the scalar
+  ##operating state (bank_state) and the daily series (bank_series) are views into the bank arrays
+  pass
+
+for name in bank_state + bank_state_int:
+  setattr(BankedReservoir, name, BankState(name))
+
+
+class ReservoirBank():
+  ##Operates a group of reservoirs together - parameters & state of all member reservoirs are stored in arrays (one row per reservoir)
+  ##so that the daily phases (rights_call, release_environmental, find_available_storage, find_flow_pumping, step) are evaluated
+  ##for the whole group at once, with the same arithmetic as the Reservoir methods.  The member Reservoir objects stay in place
+  ##as views of the bank, so the rest of the model can keep reading & setting their attributes
+
+  def __init__(self, reservoir_list):
+    self.reservoirs = reservoir_list
+    self.n = len(reservoir_list)
+    self.members = np.arange(self.n)
+    self.T = reservoir_list[0].T
+    self.starting_year = reservoir_list[0].starting_year
+    self.year = reservoir_list[0].year
+    self.month = reservoir_list[0].month
+    self.day_month = reservoir_list[0].day_month
+    self.day_year = reservoir_list[0].day_year
+    self.dowy = reservoir_list[0].dowy
+    self.wyt_index = dict((wyt, x) for x, wyt in enumerate(bank_wytlist))
+    self.z_table = np.array(z_table_transform)
+
+    self.state = {}
+    for name in bank_state:
+      self.state[name] = np.array([getattr(x, name, 0.0) for x in reservoir_list], dtype = float)
+    for name in bank_state_int:
+      self.state[name] = np.array([getattr(x, name, 0) for x in reservoir_list], dtype = int)
+    for name in bank_series:
+      setattr(self, name, np.array([getattr(x, name) for x in reservoir_list], dtype = float))
+    for i, x in enumerate(reservoir_list):
+      for name in bank_state + bank_state_int:
+        x.__dict__.pop(name, None)
+      for name in bank_series:
+        setattr(x, name, getattr(self, name)[i])
+      x.bank = self
+      x.bank_index = i
+      x.__class__ = BankedReservoir
+
+    self.create_rule_tables()
+
+  def create_rule_tables(self):
+    ##member parameters & rules (from *_properties.json and the preprocessing routines) stacked into arrays
+	##needs to be re-run whenever the rules of a member reservoir change (i.e. regulation updates in the model class)
+    self.dead_pool = np.array([x.dead_pool for x in self.reservoirs], dtype = float)
+    self.capacity = np.array([x.capacity for x in self.reservoirs], dtype = float)
+    self.max_outflow = np.array([x.max_outflow * cfs_tafd for x in self.reservoirs])
+    self.nodd_meets_envmin = np.array([x.nodd_meets_envmin for x in self.reservoirs], dtype = bool)
+    self.forecast_conservative = np.array([x.key == "FOL" or x.key == "YRS" for x in self.reservoirs], dtype = bool)
+    self.short_fnf_key = np.array([x.key == "MIL" for x in self.reservoirs], dtype = bool)
+    self.rainflood_end = np.array([x.days_through_month[x.melt_start] for x in self.reservoirs])
+    self.carryover_excess_use = np.array([x.carryover_excess_use for x in self.reservoirs], dtype = float)
+    self.max_carryover_target = np.array([x.max_carryover_target for x in self.reservoirs], dtype = float)
+    ##rules that depend on water year type - (reservoir x wyt x month/dowy), nan for wyt a reservoir doesn't use
+    num_wyt = len(bank_wytlist)
+    self.env_min_flow = np.full((self.n, num_wyt, 12), np.nan)
+    self.temp_releases = np.full((self.n, num_wyt, 12), np.nan)
+    self.carryover_target = np.full((self.n, num_wyt), np.nan)
+    self.cum_min_release = np.full((self.n, num_wyt, 366), np.nan)
+    self.aug_sept_min_release = np.full((self.n, num_wyt, 366), np.nan)
+    for i, x in enumerate(self.reservoirs):
+      for wyt in bank_wytlist:
+        w = self.wyt_index[wyt]
+        if wyt in x.env_min_flow:
+          self.env_min_flow[i][w] = np.array(x.env_min_flow[wyt], dtype = float) * cfs_tafd
+        if wyt in x.temp_releases:
+          self.temp_releases[i][w] = np.array(x.temp_releases[wyt], dtype = float) * cfs_tafd
+        if wyt in x.carryover_target:
+          self.carryover_target[i][w] = x.carryover_target[wyt]
+        if wyt in x.cum_min_release:
+          self.cum_min_release[i][w] = x.cum_min_release[wyt]
+          self.aug_sept_min_release[i][w] = x.aug_sept_min_release[wyt]
+    ##north-of-delta diversions, interpolated for every day of the year (reservoir x year x day of year)
+    day_index = np.arange(367)
+    self.basinuse_table = np.zeros((self.n, len(self.reservoirs[0].first_d_of_month), 367))
+    for i, x in enumerate(self.reservoirs):
+      for y in range(0, len(x.first_d_of_month)):
+        self.basinuse_table[i][y] = np.interp(day_index, x.first_d_of_month[y], x.nodd)
+    ##monthly flow projections from create_flow_shapes (reservoir x dowy x month)
+    self.flow_shape_slope = np.array([x.flow_shape_regression['slope'] for x in self.reservoirs], dtype = float)
+    self.flow_shape_intercept = np.array([x.flow_shape_regression['intercept'] for x in self.reservoirs], dtype = float)
+
+  def find_wyt_index(self, wyt_list):
+    return np.array([self.wyt_index[wyt] for wyt in wyt_list])
+
+  def rights_call(self, downstream_flow, reset = 0):
+    ##same as Reservoir.rights_call, w/ one downstream flow for each member reservoir
+    consumed = downstream_flow < 0.0
+    if reset == 0:
+      self.state['consumed_releases'][:] = np.where(consumed, downstream_flow*-1.0, 0.0)
+      self.state['gains_to_delta'][:] = np.where(consumed, 0.0, downstream_flow)
+    else:
+      self.state['consumed_releases'][consumed] -= downstream_flow[consumed]
+      self.state['gains_to_delta'][~consumed] += downstream_flow[~consumed]
+
+  def release_environmental(self, t, basinWYT):
+    ##same as Reservoir.release_environmental, for all member reservoirs (see reservoir.py for description)
+    d = self.day_year[t]
+    m = self.month[t]
+    dowy = self.dowy[t]
+    year = self.year[t] - self.starting_year
+    wyt = self.find_wyt_index([x.forecastWYT for x in self.reservoirs])
+    state = self.state
+
+	####ENVIRONMENTAL FLOWS
+	##What releases are needed directly downstream of reservoir
+    state['basinuse'][:] = self.basinuse_table[:, year, d]
+    state['gains_to_delta'] += state['basinuse']
+    env_min_flow = self.env_min_flow[self.members, wyt, m-1]
+    reservoir_target_release = np.where(self.nodd_meets_envmin, np.maximum(np.maximum(env_min_flow - state['basinuse'], 0.0), state['variable_min_flow']), np.maximum(env_min_flow, state['variable_min_flow']))
+
+	###What releases are needed to meet flow requirements further downstream (at a point we can calculate 'gains')
+    downstream_target_release = self.temp_releases[:, self.wyt_index[basinWYT], m-1] - self.downstream[:, t]
+
+	####FLOOD CONTROL
+	##Top of storage pool - each reservoir has its own set of flood control rules
+    for i, x in enumerate(self.reservoirs):
+      self.tocs[i][t], state['max_fcr'][i] = x.current_tocs(dowy, self.fci[i][t])
+    #What size release needs to be made
+    W = self.S[:, t] + self.Q[:, t]
+    state['fcr'][:] = np.maximum(0.2*(W - self.tocs[:, t]), 0.0)
+
+	###Based on the above requirements, what flow will make it to the delta?
+    state['envmin'][:] = np.maximum(np.maximum(np.maximum(reservoir_target_release, downstream_target_release), state['sjrr_release']), state['fcr'])
+    state['envmin'][:] = np.minimum(state['envmin'], W - self.dead_pool)
+    state['envmin'] -= state['consumed_releases']
+
+  def find_available_storage(self, t):
+    ##same as Reservoir.find_available_storage (and calc_EOS_storage), for all member reservoirs (see reservoir.py for description)
+    m = self.month[t]
+    da = self.day_month[t]
+    dowy = self.dowy[t]
+    wyt_list = [x.forecastWYT for x in self.reservoirs]
+    wyt = self.find_wyt_index(wyt_list)
+    dry_year = np.array([x == 'D' or x == 'C' for x in wyt_list], dtype = bool)
+    state = self.state
+
+	###Find the target end of year storage, and the expected minimum releases, at the beginning of each water year
+    if m == 10 and da == 1:
+      state['rainflood_flows'][:] = 0.0
+      state['snowflood_flows'][:] = 0.0
+      state['baseline_flows'][:] = 0.0
+      state['exceedence_level'][:] = np.where(self.forecast_conservative | dry_year, 2, 9)
+      ###Evap. projections are a perfect forecast (running sum, so the total is the same as sum())
+      state['evap_forecast'][:] = np.cumsum(self.E[:, t:(t + 364)], axis = 1)[:, -1]
+      state['eos_day'][:] = t
+    if m == 8 and da == 1:
+      state['lastYearEOS_target'][:] = state['EOS_target']
+      state['lastYearRainflood'][:] = self.rainflood_inf[:, t]
+
+	##Update the target EOS storage as the water year type forecasts change
+    if t == 0:
+      startingStorage = self.S[self.members, state['eos_day']]
+    else:
+      startingStorage = np.maximum(self.S[self.members, state['eos_day']], state['EOS_target'])
+    carryover_target = self.carryover_target[self.members, wyt]
+    state['saved_water'][:] = np.maximum(startingStorage - carryover_target, 0.0)*self.carryover_excess_use
+    state['EOS_target'][:] = np.minimum(state['saved_water'] + carryover_target, self.max_carryover_target)
+    ##Update the projected evaporation (its a perfect forecast)
+    state['evap_forecast'] -= self.E[:, t]
+
+	##Forecast exccedence levels
+    if m < 8:
+      state['exceedence_level'][:] = np.where(self.forecast_conservative | dry_year, min(m+2,7), 9)
+    elif m == 8 or m == 9:
+      state['exceedence_level'][:] = 9
+
+    ##YTD observed flows (divided between rainflood and snowflood seasons)
+    rainflood_season = dowy < self.rainflood_end
+    snowflood_season = ~rainflood_season & (dowy < 304)
+    baseline_season = ~rainflood_season & ~snowflood_season
+    state['rainflood_flows'][rainflood_season] += self.Q[rainflood_season, t]
+    state['snowflood_flows'][snowflood_season] += self.Q[snowflood_season, t]
+    state['baseline_flows'][baseline_season] += self.Q[baseline_season, t]
+
+	###Rain- and snow-flood forecasts are predictions of future flows to come into the reservoir, for a given confidence interval
+    z_score = self.z_table[state['exceedence_level']]
+    snowflood_projection = self.snowflood_inf[:, t] + self.snowinf_stds[:, dowy]*z_score
+    baseline_projection = self.baseline_inf[:, t] + self.baseinf_stds[:, dowy]*z_score
+    rainflood_forecast = np.where(rainflood_season, np.minimum(state['lastYearRainflood'], self.rainflood_inf[:, t] + self.raininf_stds[:, dowy]*z_score) - state['rainflood_flows'], 0.0)
+    snowflood_forecast = np.where(rainflood_season, snowflood_projection, np.where(snowflood_season, snowflood_projection - state['snowflood_flows'], 0.0))
+    baseline_forecast = np.where(baseline_season, baseline_projection - state['baseline_flows'], baseline_projection)
+    self.rainflood_forecast[:, t] = np.where(rainflood_forecast < 0.0, 0.0, rainflood_forecast)
+    self.snowflood_forecast[:, t] = np.where(snowflood_forecast < 0.0, 0.0, snowflood_forecast)
+    self.baseline_forecast[:, t] = np.where(np.logical_and(~baseline_season, baseline_forecast < 0.0), 0.0, baseline_forecast)
+
+    #available storage is storage in reservoir in exceedence of end-of-september target plus forecasts, minus expected environmental releases
+    cum_min_release = self.cum_min_release[self.members, wyt, dowy]
+    self.available_storage[:, t] = self.S[:, t] - state['EOS_target'] + self.rainflood_forecast[:, t] + self.snowflood_forecast[:, t] + self.baseline_forecast[:, t] - cum_min_release - state['evap_forecast'] - self.aug_sept_min_release[self.members, wyt, dowy]
+    self.flood_storage[:, t] = self.S[:, t] - state['max_fcr'] + self.rainflood_forecast[:, t] - np.maximum(cum_min_release - self.cum_min_release[self.members, wyt, 181], 0.0)
+    if dowy < 123:
+      self.available_storage[:, t] = np.maximum(self.available_storage[:, t], (self.S[:, t] - state['lastYearEOS_target'])*(123-dowy)/123 + self.available_storage[:, t]*dowy/123)
+    if dowy > 274:
+      below_target = self.S[:, t] < state['EOS_target']
+      self.available_storage[below_target, t] = np.minimum(self.available_storage[below_target, t], 0.0)
+      self.flood_storage[below_target, t] = np.minimum(self.flood_storage[below_target, t], 0.0)
+
+  def find_flow_pumping(self, t, m, dowy, wyt):
+    ##same as Reservoir.find_flow_pumping w/ release = 'env', for all member reservoirs (see reservoir.py for description)
+    ##rows are member reservoirs, columns are the 12 monthly blocks from Reservoir.find_month_schedule (same calendar for all members)
+    year = self.year[t] - self.starting_year
+    schedule = self.reservoirs[0].find_month_schedule(year, m)
+    month_evaluate = schedule['month']
+    start_of_month = schedule['start_of_month']
+    block_end = schedule['block_end']
+    state = self.state
+
+    running_fnf = self.running_fnf[:, t]
+    if dowy < 180:
+      running_fnf = np.where(self.short_fnf_key, np.minimum(running_fnf, 0.25), running_fnf)
+    month_flow_int = self.flow_shape_slope[:, dowy][:, month_evaluate]*running_fnf[:, None] + self.flow_shape_intercept[:, dowy][:, month_evaluate]
+    block_start = start_of_month.copy()
+    block_start[0] = dowy
+    block_length = block_end - block_start + 1
+    days_remaining = block_end + 1 + schedule['cross_wy']*365 - dowy
+    w = self.wyt_index[wyt]
+    total_mandatory_releases = self.cum_min_release[:, w, start_of_month] - self.cum_min_release[:, w, block_end+1] + self.aug_sept_min_release[:, w, start_of_month] - self.aug_sept_min_release[:, w, block_end+1]
+    reservoir_change_rate = (month_flow_int - total_mandatory_releases)/schedule['days']
+
+    #flood control pool at start and end of each month - each reservoir has its own set of flood control rules
+    storage_cap_start = np.zeros((self.n, len(month_evaluate)))
+    storage_cap_end = np.zeros((self.n, len(month_evaluate)))
+    for i, x in enumerate(self.reservoirs):
+      storage_cap_start[i], max_cap_start = x.current_tocs_days(np.where(block_start > 0, block_start - 1, 0), self.fci[i][t])
+      storage_cap_end[i], max_cap_end = x.current_tocs_days(block_end, self.fci[i][t])
+    eom_storage = np.cumsum(np.column_stack((self.S[:, t], reservoir_change_rate*block_length)), axis = 1)
+    running_storage = eom_storage[:, :-1]
+    eom_storage = eom_storage[:, 1:]
+    max_daily_uncontrolled = np.minimum.accumulate(np.column_stack((np.ones(self.n)*999.99, (eom_storage - state['EOS_target'][:, None])/days_remaining)), axis = 1)[:, 1:]
+
+    state['min_daily_uncontrolled'][:] = 0.0
+    state['max_daily_uncontrolled'][:] = max_daily_uncontrolled[:, -1]
+    state['uncontrolled_available'][:] = 0.0
+    numdays_fillup = np.ones(self.n)*999.99
+    for i, month_counter in zip(*np.nonzero(eom_storage > storage_cap_end)):
+      this_month_min_release = (eom_storage[i][month_counter] - storage_cap_end[i][month_counter]) / days_remaining[month_counter]
+      total_min_release = eom_storage[i][month_counter] - storage_cap_end[i][month_counter]
+      differential_storage_change = reservoir_change_rate[i][month_counter] - (storage_cap_end[i][month_counter] - storage_cap_start[i][month_counter])/block_length[month_counter]
+      if storage_cap_start[i][month_counter] > running_storage[i][month_counter]:
+        crossover_date = (storage_cap_start[i][month_counter] - running_storage[i][month_counter])/differential_storage_change
+      else:
+        crossover_date = 0.0
+      numdays_fillup_month = block_start[month_counter] + crossover_date + schedule['cross_wy'][month_counter]*365 - dowy
+      state['min_daily_uncontrolled'][i] = min(max(this_month_min_release, state['min_daily_uncontrolled'][i]), max_daily_uncontrolled[i][month_counter])
+      state['uncontrolled_available'][i] = max(total_min_release, state['uncontrolled_available'][i])
+      numdays_fillup[i] = min(numdays_fillup_month, numdays_fillup[i])
+    for i, x in enumerate(self.reservoirs):
+      x.numdays_fillup['env'] = numdays_fillup[i]
+
+  def step(self, t):
+    ##same as Reservoir.step, for all member reservoirs
+    state = self.state
+    state['envmin'] += (state['basinuse'] + state['consumed_releases'])
+    self.Rtarget[:, t] = state['envmin'] + state['sodd'] + state['din'] + state['dout']
+    W = self.S[:, t] + self.Q[:, t]
+    self.R[:, t] = np.maximum(np.minimum(self.Rtarget[:, t], W - self.dead_pool), 0.0)
+    self.R[:, t] = np.minimum(self.R[:, t], self.max_outflow)
+    state['force_spill'][:] = np.maximum(W - self.R[:, t] - self.capacity, 0.0)
+    self.R[:, t] += state['force_spill']
+    if t < (self.T - 1):
+      self.S[:, t+1] = np.maximum(W - self.R[:, t] - self.E[:, t], 0)
+    self.R_to_delta[:, t] = np.maximum(self.R[:, t] - state['basinuse'] - state['consumed_releases'], 0)
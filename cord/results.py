@@ -0,0 +1,412 @@
+from __future__ import division
+import os
+import json
+import fnmatch
+import numpy as np
+import pandas as pd
+try:
+  import fcntl
+except ImportError:
+  #no file locking on windows - results store catalogs should only be written by one process at a time there
+  fcntl = None
+
+#file extension used for each of the supported result formats ('store' tables go into a ResultsStore in the same folder)
+result_extensions = {'csv': '.csv', 'parquet': '.parquet', 'hdf5': '.h5', 'store': ''}
+#file formats that read_results can open (tables in a ResultsStore are read if there is no file in any of them)
+read_order = ['parquet', 'hdf5', 'csv']
+
+# write a result dataframe to file_stem (path without extension) in the selected format
+# run_id is only used by the 'store' format, where the table is added to the ResultsStore in the folder of file_stem
+def write_results(df, file_stem, result_format = 'csv', run_id = 'default'):
+  if result_format not in result_extensions:
+    raise ValueError('unknown result format %s, use one of %s' % (result_format, ', '.join(result_extensions)))
+  file_name = file_stem + result_extensions[result_format]
+  if result_format == 'store':
+    #returns the path of the table in the store
+    results_store = ResultsStore(os.path.join(os.path.dirname(file_stem), 'store'))
+    file_name = results_store.write(df, run_id, os.path.basename(file_stem))
+  elif result_format == 'csv':
+    df.to_csv(file_name)
+  elif result_format == 'parquet':
+    #parquet keeps the index and column dtypes, but needs string column names (renamed on a copy, the caller's dataframe is unchanged)
+    df.rename(columns = str).to_parquet(file_name, compression = 'zstd')
+  elif result_format == 'hdf5':
+    #string column names, same as csv & parquet (e.g., the 0/1 columns of the annual district table are read as '0'/'1')
+    df.rename(columns = str).to_hdf(file_name, key = 'results', mode = 'w', complevel = 9, complib = 'blosc:zstd')
+  return file_name
+
+# find the format of a result file from its extension
+def find_result_format(file_name):
+  extension = os.path.splitext(file_name)[1]
+  for result_format in read_order:
+    if result_extensions[result_format] == extension:
+      return result_format
+  return None
+
+# read a result dataframe written by write_results
+# file_name can include an extension, or be a path stem - in that case the most recently written format on disk is used
+# (so a file left by an earlier run in another format isn't read instead of the latest results)
+# if there is no file for a path stem, the table is read from the ResultsStore in its folder ('store' format, see read_store_results)
+# csv_kwargs (e.g. index_col, parse_dates) are only used when the file is a csv
+def read_results(file_name, columns = None, run_id = None, **csv_kwargs):
+  result_format = find_result_format(file_name)
+  if result_format is None:
+    result_files = [(os.path.getmtime(file_name + result_extensions[x]), x) for x in read_order if os.path.isfile(file_name + result_extensions[x])]
+    if len(result_files) == 0:
+      return read_store_results(file_name, columns, run_id)
+    result_format = max(result_files)[1]
+    file_name = file_name + result_extensions[result_format]
+
+  if result_format == 'parquet':
+    #parquet files are columnar, so only the requested columns are read from disk
+    return pd.read_parquet(file_name, columns = columns)
+  elif result_format == 'hdf5':
+    df = pd.read_hdf(file_name, key = 'results')
+  else:
+    df = pd.read_csv(file_name, **csv_kwargs)
+  if columns is not None:
+    return df[columns]
+  return df
+
+# read a table written by write_results in the 'store' format, from the ResultsStore in the folder of file_stem
+# run_id can be left out when only one run in the store has the table
+def read_store_results(file_stem, columns = None, run_id = None):
+  results_store = ResultsStore(os.path.join(os.path.dirname(file_stem), 'store'))
+  table = os.path.basename(file_stem)
+  run_list = [x for x in sorted(results_store.catalog) if table in results_store.catalog[x]]
+  if run_id is None:
+    if len(run_list) > 1:
+      raise ValueError('%s is in the results store for runs %s, use run_id to pick one' % (table, ', '.join(run_list)))
+    elif len(run_list) == 1:
+      run_id = run_list[0]
+  if run_id not in run_list:
+    raise IOError('no result file found for %s' % file_stem)
+  return results_store.read(run_id, table, columns = columns)
+
+
+#####################################################################################################################
+##################################RECORDING SPECIFICATION############################################################
+#####################################################################################################################
+
+class DaySeries():
+  #stand-in for a timeseries that is not recorded - only keeps the value of the current timestep, so accounting that
+  #builds values with += (and reads them back on the same timestep) works the same way without allocating an array
+  def __init__(self):
+    self.t = -1
+    self.value = 0.0
+
+  def __getitem__(self, t):
+    if t == self.t:
+      return self.value
+    return 0.0
+
+  def __setitem__(self, t, value):
+    self.t = t
+    self.value = value
+
+
+class RunningSummary():
+  #running sum, min, max & end-of-period value of a daily variable for each period (month or water year)
+  #days that are never written count as 0.0, the same as the unwritten days of a daily array (see summarize_array)
+  stat_list = ['sum', 'min', 'max', 'end']
+  def __init__(self, slots, num_periods):
+    self.slots = slots
+    self.period_days = np.bincount(slots, minlength = num_periods)
+    self.period_end = np.append(np.nonzero(np.diff(slots))[0], len(slots) - 1)
+    self.days_written = np.zeros(num_periods, dtype = int)
+    self.last_t = np.full(num_periods, -1)
+    self.sum = np.zeros(num_periods)
+    self.min = np.full(num_periods, np.inf)
+    self.max = np.full(num_periods, -np.inf)
+    self.end = np.zeros(num_periods)
+
+  def add(self, t, value):
+    p = self.slots[t]
+    self.days_written[p] += 1
+    self.last_t[p] = t
+    self.sum[p] += value
+    if value < self.min[p]:
+      self.min[p] = value
+    if value > self.max[p]:
+      self.max[p] = value
+    self.end[p] = value
+
+  def stats(self):
+    #periods with unwritten days include a 0.0 in their min & max, and end at 0.0 if their last day wasn't written
+    unwritten_days = self.days_written < self.period_days
+    stats = {}
+    stats['sum'] = self.sum.copy()
+    stats['min'] = np.where(unwritten_days, np.minimum(self.min, 0.0), self.min)
+    stats['max'] = np.where(unwritten_days, np.maximum(self.max, 0.0), self.max)
+    stats['end'] = np.where(self.last_t == self.period_end, self.end, 0.0)
+    return stats
+
+
+class PeriodSeries(DaySeries):
+  #timeseries recorded at monthly or annual resolution - every daily write also overwrites the value for the
+  #period that contains the timestep, so each period stores its end-of-period value
+  #summaries (if used) are running monthly/water-year aggregates - a timestep is added to them once the simulation
+  #moves to the next timestep, after all the accounting (+=) for that day is done
+  def __init__(self, slots, period_index, resolution, summaries = None):
+    DaySeries.__init__(self)
+    self.slots = slots
+    self.period_index = period_index
+    self.resolution = resolution
+    self.values = np.zeros(len(period_index))
+    self.summaries = summaries
+    self.closed_t = -1
+
+  def __setitem__(self, t, value):
+    if self.summaries is not None and t != self.t:
+      self.close()
+    self.t = t
+    self.value = value
+    self.values[self.slots[t]] = value
+
+  def close(self):
+    #add the final value of the last timestep written to the running summaries
+    if self.t >= 0 and self.t != self.closed_t:
+      for x in self.summaries:
+        self.summaries[x].add(self.t, self.value)
+      self.closed_t = self.t
+
+
+class RecordingSpec():
+  #rules are [object glob, variable glob, resolution] - they are checked in order, and the first rule that matches the object key
+  #and variable name sets the resolution it is recorded at ('daily', 'monthly' or 'annual'), or None to not record it at all
+  #variables not matched by any rule are not recorded.  the default spec records everything daily
+  #variable names are the output column names without the leading object key (annual tables are matched as 'annual_' + name)
+  #summaries = True keeps monthly & water-year sum/min/max/end-of-period tables for every recorded variable
+  def __init__(self, rules = None, summaries = False):
+    if rules is None:
+      rules = [['*', '*', 'daily']]
+    for x in rules:
+      if x[2] not in ['daily', 'monthly', 'annual', None]:
+        raise ValueError('unknown recording resolution %s' % x[2])
+    self.rules = rules
+    self.summaries = summaries
+    self.slots = {}
+    self.period_index = {}
+    self.period_start = {}
+
+  def set_index(self, index):
+    #copy of the spec for one model's timesteps (the same spec can be shared by several models) - maps each timestep
+    #onto its month & water year, and finds the last date in each period (used to label period output)
+    spec = RecordingSpec(self.rules, self.summaries)
+    T = len(index)
+    water_year = index.year + (index.month > 9)
+    spec.slots['monthly'] = np.asarray((index.year - index.year[0])*12 + index.month - index.month[0])
+    spec.slots['annual'] = np.asarray(water_year - water_year[0])
+    for resolution in ['monthly', 'annual']:
+      period_end = np.append(np.nonzero(np.diff(spec.slots[resolution]))[0], T - 1)
+      spec.period_index[resolution] = index[period_end]
+      spec.period_start[resolution] = np.append(0, period_end[:-1] + 1)
+    return spec
+
+  def resolution(self, key, variable):
+    for object_glob, variable_glob, resolution in self.rules:
+      if fnmatch.fnmatchcase(key, object_glob) and fnmatch.fnmatchcase(variable, variable_glob):
+        return resolution
+    return None
+
+  def uses_resolution(self, resolution):
+    for x in self.rules:
+      if x[2] == resolution:
+        return True
+    return False
+
+  def daily_series(self, key, variable, T):
+    #storage for a variable written every timestep - a full array for daily recording, one value per period
+    #for monthly/annual recording, and only the current value if the variable is not recorded
+    resolution = self.resolution(key, variable)
+    if resolution == 'daily':
+      return np.zeros(T)
+    elif resolution is None:
+      return DaySeries()
+    summaries = None
+    if self.summaries:
+      #daily arrays are summarized at the end of the run, period series have to keep running summaries
+      summaries = {}
+      for x in ['monthly', 'annual']:
+        summaries[x] = RunningSummary(self.slots[x], len(self.period_index[x]))
+    return PeriodSeries(self.slots[resolution], self.period_index[resolution], resolution, summaries)
+
+  def annual_series(self, key, variable, number_years):
+    #storage for a variable that is already indexed by water year - any resolution records it
+    if self.resolution(key, variable) is None:
+      return DaySeries()
+    return np.zeros(number_years)
+
+
+# read a recording spec from a json file of the form {"rules": [["SLS", "*", "daily"], ["*", "delivery", "annual"]]}
+def load_recording_spec(file_name):
+  spec_data = json.load(open(file_name))
+  return RecordingSpec([list(x) for x in spec_data['rules']], spec_data.get('summaries', False))
+
+# check if a series is being recorded (not just holding the current timestep value)
+def is_recorded(series):
+  return not isinstance(series, DaySeries) or isinstance(series, PeriodSeries)
+
+# loop through the recorded series in a dictionary at a given resolution, with the index to use for each
+def recorded_series(series_dict, index, resolution = 'daily'):
+  for n in series_dict:
+    x = series_dict[n]
+    if isinstance(x, PeriodSeries):
+      if x.resolution == resolution:
+        yield n, x.values, x.period_index
+    elif resolution == 'daily' and is_recorded(x):
+      yield n, x, index
+
+# sum, min, max & end-of-period value of a daily array over each period, in one pass
+def summarize_array(values, period_start):
+  stats = {}
+  stats['sum'] = np.add.reduceat(values, period_start)
+  stats['min'] = np.minimum.reduceat(values, period_start)
+  stats['max'] = np.maximum.reduceat(values, period_start)
+  stats['end'] = values[np.append(period_start[1:] - 1, len(values) - 1)]
+  return stats
+
+# loop through the recorded series in a dictionary, with the monthly or water-year summary statistics of each
+def summarized_series(series_dict, recording_spec, resolution):
+  for n in series_dict:
+    x = series_dict[n]
+    if isinstance(x, PeriodSeries):
+      if x.summaries is not None:
+        x.close()
+        yield n, x.summaries[resolution].stats()
+    elif is_recorded(x):
+      yield n, summarize_array(x, recording_spec.period_start[resolution])
+
+# make a dataframe of the summary statistics of each recorded series in a dictionary (columns are key_variable_stat)
+def series_summary_as_df(name_format, series_dict, recording_spec, resolution, skip_zero = False):
+  df = pd.DataFrame(index = recording_spec.period_index[resolution])
+  for n, stats in summarized_series(series_dict, recording_spec, resolution):
+    if skip_zero and np.nanmax(np.abs(stats['max'])) == 0.0 and np.nanmax(np.abs(stats['min'])) == 0.0:
+      continue
+    for x in RunningSummary.stat_list:
+      df[(name_format % n) + '_' + x] = stats[x]
+  return df
+
+
+#####################################################################################################################
+##################################INDEXED RESULTS STORE##############################################################
+#####################################################################################################################
+
+class ResultsStore():
+  #results from many runs in one folder - each table is saved as a (column x timestep) .npy array, so every column
+  #is a contiguous block of bytes that can be memory-mapped.  a json catalog indexes every table by run id, with the
+  #object key & variable of each column (taken from the key_variable column names) and the date range of the table
+  #runs writing to the same store in parallel each update the catalog under a file lock, re-reading it first
+  def __init__(self, folder):
+    self.folder = folder
+    self.catalog_file = os.path.join(folder, 'catalog.json')
+    self.catalog = self.load_catalog()
+
+  def load_catalog(self):
+    if os.path.isfile(self.catalog_file):
+      with open(self.catalog_file) as f:
+        return json.load(f)
+    return {}
+
+  def update_catalog(self, run_id, table, table_info):
+    #re-read the catalog while holding the lock (so entries written by other processes are kept), and replace it
+    #with a complete new file, so readers never see a partly written catalog
+    with open(self.catalog_file + '.lock', 'w') as lock_file:
+      if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+      try:
+        self.catalog = self.load_catalog()
+        if run_id not in self.catalog:
+          self.catalog[run_id] = {}
+        self.catalog[run_id][table] = table_info
+        temp_file = '%s.%d.tmp' % (self.catalog_file, os.getpid())
+        with open(temp_file, 'w') as f:
+          json.dump(self.catalog, f, indent = 1)
+        os.replace(temp_file, self.catalog_file)
+      finally:
+        if fcntl is not None:
+          fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+  def write(self, df, run_id, table):
+    if not os.path.isdir(self.folder):
+      os.makedirs(self.folder)
+    table_file = '%s__%s' % (run_id, table)
+    values = np.ascontiguousarray(df.values.T)
+    np.save(os.path.join(self.folder, table_file + '.npy'), values)
+    np.save(os.path.join(self.folder, table_file + '_index.npy'), np.asarray(df.index.values))
+    columns = [str(x) for x in df.columns]
+    keys = []
+    variables = []
+    for x in columns:
+      name_parts = x.split('_', 1)
+      keys.append(name_parts[0])
+      if len(name_parts) > 1:
+        variables.append(name_parts[1])
+      else:
+        variables.append('')
+    table_info = {'file': table_file, 'columns': columns, 'keys': keys, 'variables': variables, 'dtype': str(values.dtype), 'length': len(df)}
+    if isinstance(df.index, pd.DatetimeIndex) and len(df) > 0:
+      table_info['start'] = str(df.index[0])
+      table_info['end'] = str(df.index[-1])
+    self.update_catalog(run_id, table, table_info)
+    return os.path.join(self.folder, table_file + '.npy')
+
+  def find(self, run_id = '*', table = '*', key = '*', variable = '*', start = None, end = None):
+    #list the (run id, table, [columns]) with columns matching the key/variable globs, in tables that overlap the date range
+    found = []
+    for run in sorted(self.catalog):
+      if not fnmatch.fnmatchcase(run, run_id):
+        continue
+      for table_name in sorted(self.catalog[run]):
+        table_info = self.catalog[run][table_name]
+        if not fnmatch.fnmatchcase(table_name, table):
+          continue
+        if 'start' in table_info:
+          if end is not None and pd.Timestamp(end) < pd.Timestamp(table_info['start']):
+            continue
+          if start is not None and pd.Timestamp(start) > pd.Timestamp(table_info['end']):
+            continue
+        columns = []
+        for x, y, z in zip(table_info['columns'], table_info['keys'], table_info['variables']):
+          if fnmatch.fnmatchcase(y, key) and fnmatch.fnmatchcase(z, variable):
+            columns.append(x)
+        if len(columns) > 0:
+          found.append((run, table_name, columns))
+    return found
+
+  def read(self, run_id, table, key = '*', variable = '*', start = None, end = None, columns = None):
+    #read the matching columns of one table from one run, between start & end dates (inclusive)
+    #only the requested rows of the requested columns are read from the memory-mapped table
+    table_info = self.catalog[run_id][table]
+    if columns is None:
+      columns = []
+      for x, y, z in zip(table_info['columns'], table_info['keys'], table_info['variables']):
+        if fnmatch.fnmatchcase(y, key) and fnmatch.fnmatchcase(z, variable):
+          columns.append(x)
+    values = np.load(os.path.join(self.folder, table_info['file'] + '.npy'), mmap_mode = 'r')
+    index = np.load(os.path.join(self.folder, table_info['file'] + '_index.npy'), allow_pickle = True)
+    first_row = 0
+    last_row = len(index)
+    if 'start' in table_info:
+      if start is not None:
+        first_row = np.searchsorted(index, np.datetime64(pd.Timestamp(start)), side = 'left')
+      if end is not None:
+        last_row = np.searchsorted(index, np.datetime64(pd.Timestamp(end)), side = 'right')
+      index = pd.DatetimeIndex(index[first_row:last_row])
+    else:
+      index = index[first_row:last_row]
+    column_position = {}
+    for i, x in enumerate(table_info['columns']):
+      column_position[x] = i
+    df = pd.DataFrame(index = index)
+    for x in columns:
+      df[x] = np.array(values[column_position[x], first_row:last_row])
+    return df
+
+  def read_runs(self, run_id, table, key = '*', variable = '*', start = None, end = None):
+    #read the same slice from every run matching the run_id glob (e.g. every projection in an ensemble)
+    run_results = {}
+    for run, table_name, columns in self.find(run_id, table, key, variable, start, end):
+      if table_name == table:
+        run_results[run] = self.read(run, table_name, start = start, end = end, columns = columns)
+    return run_results
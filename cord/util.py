@@ -69,6 +69,19 @@ def dowy_eom(year, leap):
       dowy[i,:] = eom
   return dowy
 
+# trailing window sums of a daily series - sum(x[(t-window):(t-end_lag)]) at each timestep t, or before a full window is available,
+# the sum to date scaled up to the window length, sum(x[0:t])*window/(t+1).  rows of windows are summed w/ np.sum, so each
+# value matches np.sum of the same slice exactly
+def trailing_window_sum(x, window, end_lag):
+  T = len(x)
+  sums = np.zeros(T)
+  for t in range(0, min(window, T)):
+    sums[t] = np.sum(x[0:t])*float(window)/(t+1)
+  if T > window:
+    window_index = np.arange(window, T)[:, None] + np.arange(-window, -end_lag)
+    sums[window:] = np.sum(x[window_index], axis = 1)
+  return sums
+
 # get first day of each month, 1-indexed (i.e. first day Jan = 1). Each row is a year in historical record.
 def first_d_of_month(dowyeom, daysinmonth):
   first_d = np.empty([len(dowyeom), 12], dtype=int)
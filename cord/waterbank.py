@@ -5,17 +5,25 @@ import pandas as pd
 import collections as cl
 import json
 from .util import *
+from .results import RecordingSpec, recorded_series, is_recorded, series_summary_as_df
 
 
 class Waterbank():
+  #recording spec variable names of each member's bank account - the output columns are key_name
+  #(daily and annual tables), and the annual series is recorded as 'annual_' + name
+  bank_name = '%s'
+  annual_bank_name = '%s_leiu'
 
-  def __init__(self, df, key):
+  def __init__(self, df, key, recording_spec = None):
     self.T = len(df)
     self.index = df.index
     self.number_years = self.index.year[self.T - 1] - self.index.year[0]
     self.key = key
     for k,v in json.load(open('cord/banks/%s_properties.json' % key)).items():
         setattr(self,k,v)
+    #recording spec sets which output timeseries are stored (and at what resolution)
+    if recording_spec is None:
+      recording_spec = RecordingSpec()
 		
     self.recharge_rate = self.initial_recharge*cfs_tafd
     self.tot_current_storage = 0.0#total above-ground storage being used in water bank 
@@ -28,11 +36,11 @@ class Waterbank():
 	#timeseries for export to csv
     self.bank_timeseries = {}#daily
     self.annual_timeseries = {}#annual
-    self.recharge_rate_series = np.zeros(self.T)#daily recharge rate
+    self.recharge_rate_series = recording_spec.daily_series(self.key, 'rate', self.T)#daily recharge rate
     for x in self.participant_list:
       self.storage[x] = 0.0
-      self.bank_timeseries[x] = np.zeros(self.T)
-      self.annual_timeseries[x] = np.zeros(self.number_years)
+      self.bank_timeseries[x] = recording_spec.daily_series(self.key, self.bank_name % x, self.T)
+      self.annual_timeseries[x] = recording_spec.annual_series(self.key, 'annual_' + self.annual_bank_name % x, self.number_years)
       self.recovery_use[x] = 0.0
       self.banked[x] = 0.0
 	  
@@ -206,21 +214,29 @@ class Waterbank():
           sum_total += self.annual_timeseries[x][year_counter]
         self.annual_timeseries[x][wateryear] = self.banked[x] - sum_total
 	  	
-  def bank_as_df(self, index):
+  def bank_as_df(self, index, resolution = 'daily'):
     #take daily bank account balances (w/running recharge capacities) and save them as a data frame (for export to csv)
     df = pd.DataFrame()
-    for n in self.participant_list:
-      df['%s_%s' % (self.key,n)] = pd.Series(self.bank_timeseries[n], index = index)
-    df['%s_rate' % self.key] = pd.Series(self.recharge_rate_series, index = index)
+    for n, values, series_index in recorded_series(self.bank_timeseries, index, resolution):
+      df[self.key + '_' + self.bank_name % n] = pd.Series(values, index = series_index)
+    for n, values, series_index in recorded_series({'rate': self.recharge_rate_series}, index, resolution):
+      df['%s_rate' % self.key] = pd.Series(values, index = series_index)
     return df
 	
   def annual_bank_as_df(self):
     #save annual bank changes as data frame (for export to csv)
     df = pd.DataFrame()
     for n in self.participant_list:
-      df['%s_%s_leiu' % (self.key,n)] = pd.Series(self.annual_timeseries[n])
+      if is_recorded(self.annual_timeseries[n]):
+        df[self.key + '_' + self.annual_bank_name % n] = pd.Series(self.annual_timeseries[n])
     return df
 
+  def bank_summary_as_df(self, recording_spec, resolution):
+    #save monthly or water-year sum/min/max/end-of-period of bank account balances as a data frame
+    df = series_summary_as_df(self.key + '_' + self.bank_name, self.bank_timeseries, recording_spec, resolution)
+    df2 = series_summary_as_df(self.key + '_%s', {'rate': self.recharge_rate_series}, recording_spec, resolution)
+    return pd.concat([df, df2], axis = 1)
+
   def get_iterable(self, x):
     if isinstance(x, cl.Iterable):
       return x
@@ -14,6 +14,7 @@
 # (h) Pumping off the CA Aqueduct to Urban demands in the South Bay, Central Coast, and Southern California
 ##################################################################################
 
+import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -22,207 +23,199 @@ from cord import *
 from datetime import datetime
 
 
-model_mode = 'simulation'
-# model_mode = 'validation'
-# model_mode = 'forecast'
-
-startTime = datetime.now()
-
-# To run full dataset, short_test = -1. Else enter number of days to run, starting at sd. e.g. 365 for 1 year only.
-short_test = -1
-
-# always use shorter historical dataframe for expected delta releases
-expected_release_datafile = 'cord/data/input/cord-data.csv'
-
-# data for actual simulation
-if model_mode == 'simulation':
-  sd = '10-01-1905'
-  input_data_file = 'cord/data/input/cord-data-sim.csv'
-elif model_mode == 'validation':
-  sd = '10-01-1996'
-  input_data_file = 'cord/data/input/cord-data.csv'
-elif model_mode == 'forecast':
-  sd = '01-01-1950'
-  base_data_file = 'cord/data/input/cord-data.csv'
-if model_mode == 'simulation' or model_mode == 'validation':
+# worker processes (preprocess_projections, run_projection_pipeline) import this file, so the run only starts here
+if __name__ == '__main__':
+  model_mode = 'simulation'
+  # model_mode = 'validation'
+  # model_mode = 'forecast'
+
+  # format of the result tables written to cord/data/results - 'csv', 'parquet' or 'hdf5' (compressed, keeps dtypes & is much faster to write/read)
+  # or 'store' - indexed by run_id in cord/data/results/store, for sliced reads w/ ResultsStore (forecast runs use the projection file name as run_id)
+  result_format = 'csv'
+  run_id = model_mode
+
+  # district, contract, canal & bank timeseries to record - RecordingSpec() records everything daily, or use a list of [object, variable, resolution] rules
+  # e.g. RecordingSpec([['SLS', '*', 'daily'], ['*', 'annual_*', 'annual'], ['W*', 'delivery', 'monthly']]), or load_recording_spec(json file)
+  # summaries = True also writes monthly & water-year sum/min/max/end-of-period tables, so post-processing doesn't need the daily output
+  recording_spec = RecordingSpec(summaries = False)
+
+  startTime = datetime.now()
+
+  # To run full dataset, short_test = -1. Else enter number of days to run, starting at sd. e.g. 365 for 1 year only.
+  short_test = -1
+  # debug check that no daily input is still a pandas object (slow to index each timestep), run after initialization
+  check_inputs = False
+
+  # always use shorter historical dataframe for expected delta releases
+  expected_release_datafile = 'cord/data/input/cord-data.csv'
+
+  # data for actual simulation
+  if model_mode == 'simulation':
+    sd = '10-01-1905'
+    input_data_file = 'cord/data/input/cord-data-sim.csv'
+  elif model_mode == 'validation':
+    sd = '10-01-1996'
+    input_data_file = 'cord/data/input/cord-data.csv'
+  elif model_mode == 'forecast':
+    sd = '01-01-1950'
+    base_data_file = 'cord/data/input/cord-data.csv'
+    # also save each projection's daily inputs as cord-data-*.csv (the models use the inputs in memory either way)
+    export_inputs = False
+    # simulate from the cord-data-*.csv inputs made by preprocess_projections.py (any missing or out of date ones are made first)
+    use_preprocessed_inputs = False
+    # generate & simulate projections concurrently (cord/pipeline.py) - num_generators Inputter processes fill a queue of up to
+    # pipeline_queue_size projection inputs, which num_simulators Model processes simulate
+    use_pipeline = False
+    num_generators = 2
+    num_simulators = 4
+    pipeline_queue_size = 2
+  if model_mode == 'simulation' or model_mode == 'validation':
+    ######################################################################################
+    # Model Class Initialization
+    ## There are two instances of the class 'Model', one for the Nothern System and one for the Southern System
+    ##
+    modelno = Model(input_data_file, expected_release_datafile, sd, model_mode, recording_spec)
+    modelso = Model(input_data_file, expected_release_datafile, sd, model_mode, recording_spec)
+    modelso.max_tax_free = {}
+    modelso.omr_rule_start, modelso.max_tax_free = modelno.northern_initialization_routine(startTime)
+    modelso.southern_initialization_routine(startTime)
+    if check_inputs:
+      modelno.check_daily_inputs()
+      modelso.check_daily_inputs()
+
+    ######################################################################################
+    ###Model Simulation
+    ######################################################################################
+    if (short_test < 0):
+      timeseries_length = min(modelno.T, modelso.T)
+    else:
+      timeseries_length = short_test
+    ###initial parameters for northern model input
+    ###generated from southern model at each timestep
+    swp_release = 1
+    cvp_release = 1
+    swp_release2 = 1
+    cvp_release2 = 1
+    swp_pump = 999.0
+    cvp_pump = 999.0
+    proj_surplus = 0.0
+    swp_available = 0.0
+    cvp_available = 0.0
+    ############################################
+    for t in range(0, timeseries_length):
+      if (t % 365 == 364):
+        print('Year ', (t+1)/365, ', ', datetime.now() - startTime)
+      # the northern model takes variables from the southern model as inputs (initialized above), & outputs are used as input variables in the southern model
+      swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, flood_release, flood_volume = modelno.simulate_north(t, swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump)
+
+      swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump = modelso.simulate_south(t, swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, modelno.delta.forecastSJWYT, modelno.delta.max_tax_free, flood_release, flood_volume)
   ######################################################################################
-  # Model Class Initialization
-  ## There are two instances of the class 'Model', one for the Nothern System and one for the Southern System
-  ##
-  modelno = Model(input_data_file, expected_release_datafile, sd, model_mode)
-  modelso = Model(input_data_file, expected_release_datafile, sd, model_mode)
-  modelso.max_tax_free = {}
-  modelso.omr_rule_start, modelso.max_tax_free = modelno.northern_initialization_routine(startTime)
-  modelso.southern_initialization_routine(startTime)
-
-  ######################################################################################
-  ###Model Simulation
-  ######################################################################################
-  if (short_test < 0):
-    timeseries_length = min(modelno.T, modelso.T)
   else:
-    timeseries_length = short_test
-  ###initial parameters for northern model input
-  ###generated from southern model at each timestep
-  swp_release = 1
-  cvp_release = 1
-  swp_release2 = 1
-  cvp_release2 = 1
-  swp_pump = 999.0
-  cvp_pump = 999.0
-  proj_surplus = 0.0
-  swp_available = 0.0
-  cvp_available = 0.0
-  ############################################
-  for t in range(0, timeseries_length):
-    if (t % 365 == 364):
-      print('Year ', (t+1)/365, ', ', datetime.now() - startTime)
-    # the northern model takes variables from the southern model as inputs (initialized above), & outputs are used as input variables in the southern model
-    swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, flood_release, flood_volume = modelno.simulate_north(t, swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump)
-
-    swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump = modelso.simulate_south(t, swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, modelno.delta.forecastSJWYT, modelno.delta.max_tax_free, flood_release, flood_volume)
-######################################################################################
-else:
-  #####FLOW GENERATOR#####
-  #seed
-  np.random.seed(1001)
-
-  file_folder = 'cord/data/CA_FNF_climate_change/'
-  model_name_list = ['gfdl-esm2m']#, 'canesm2', 'ccsm4', 'cnrm-cm5', 'csiro-mk3-6-0', 'gfdl-cm3', 'hadgem2-cc', 'hadgem2-es', 'inmcm4', 'ipsl-cm5a-mr', 'miroc5']
-  proj_list = ['rcp45']#, 'rcp85']
-  new_inputs = Inputter(base_data_file, expected_release_datafile, model_mode)
-  new_inputs.initialize_reservoirs()
-  new_inputs.generate_relationships('XXX')
-  new_inputs.autocorrelate_residuals('XXX')
-  new_inputs.fill_snowpack('XXX')
-  new_inputs.generate_relationships_delta('XXX')
-  new_inputs.autocorrelate_residuals_delta('XXX')
-  for model_name in model_name_list:
-    for projection in proj_list:
-      file_name = 'CA_FNF_' + model_name + '_' + projection + '_r1i1p1.csv'
-      print('Starting ' + file_name)
-      new_inputs.run_routine(file_folder, file_name, 'daily', 1, 150, 2, '1/1/1950', '12/31/2099', 1950)
-      input_data_file = file_folder + 'cord-data-' + file_name
-
-      ######################################################################################
-      # Model Class Initialization
-      ## There are two instances of the class 'Model', one for the Nothern System and one for the Southern System
-      ##
-      modelno = Model(input_data_file, expected_release_datafile, sd, model_mode)
-      modelso = Model(input_data_file, expected_release_datafile, sd, model_mode)
-      modelso.max_tax_free = {}
-      modelso.omr_rule_start, modelso.max_tax_free = modelno.northern_initialization_routine(startTime)
-      modelso.southern_initialization_routine(startTime)
-      ######################################################################################
-      ###Model Simulation
-      ######################################################################################
-      if (short_test < 0):
-        timeseries_length = min(modelno.T, modelso.T)
+    #####FLOW GENERATOR#####
+    #seed
+    np.random.seed(1001)
+
+    file_folder = 'cord/data/CA_FNF_climate_change/'
+    model_name_list = ['gfdl-esm2m']#, 'canesm2', 'ccsm4', 'cnrm-cm5', 'csiro-mk3-6-0', 'gfdl-cm3', 'hadgem2-cc', 'hadgem2-es', 'inmcm4', 'ipsl-cm5a-mr', 'miroc5']
+    proj_list = ['rcp45']#, 'rcp85']
+    file_names = [projection_file_name(model_name, projection) for model_name in model_name_list for projection in proj_list]
+    if use_pipeline:
+      # generate & simulate projections in separate worker pools, w/ generated inputs waiting in a bounded queue
+      pipeline_metrics = run_projection_pipeline(file_folder, file_names, base_data_file, expected_release_datafile, sd, model_mode, recording_spec, 'cord/data/cache/', result_format, short_test, num_generators = num_generators, num_simulators = num_simulators, queue_size = pipeline_queue_size, export_inputs = export_inputs)
+      pipeline_metrics_df = pipeline_metrics.as_df()
+      print(pipeline_metrics_df)
+      write_results(pipeline_metrics_df, 'cord/data/results/pipeline_metrics_' + model_mode, result_format, run_id)
+    else:
+      if use_preprocessed_inputs:
+        preprocess_projections(file_folder, file_names, base_data_file, expected_release_datafile, model_mode, 'cord/data/cache/')
       else:
-        timeseries_length = short_test
-      ###initial parameters for northern model input
-      ###generated from southern model at each timestep
-      swp_release = 1
-      cvp_release = 1
-      swp_release2 = 1
-      cvp_release2 = 1
-      swp_pump = 999.0
-      cvp_pump = 999.0
-      proj_surplus = 0.0
-      swp_available = 0.0
-      cvp_available = 0.0
-      ############################################
-      for t in range(0, timeseries_length):
-        if (t % 365 == 364):
-          print('Year ', (t+1)/365, ', ', datetime.now() - startTime)        # the northern model takes variables from the southern model as inputs (initialized above), & outputs are used as input variables in the southern model
-        swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, flood_release, flood_volume = modelno.simulate_north(t, swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump)
-
-        swp_release, cvp_release, swp_release2, cvp_release2, swp_pump, cvp_pump = modelso.simulate_south(t, swp_pumping, cvp_pumping, swp_alloc, cvp_alloc, proj_surplus, max_pumping, swp_forgo, cvp_forgo, swp_AF, cvp_AF, swp_AS, cvp_AS, modelno.delta.forecastSJWYT, modelno.delta.max_tax_free, flood_release, flood_volume)
-        ######################################################################################
-      release_df = pd.DataFrame(index=modelno.index)
-      northern_res_list = [modelno.shasta, modelno.folsom, modelno.oroville, modelno.yuba, modelno.newmelones,
-                           modelno.donpedro, modelno.exchequer]
-      southern_res_list = [modelso.millerton, modelso.success, modelso.kaweah, modelso.isabella]
-      canal_list = [modelso.fkc, modelso.madera, modelso.kernriverchannel, modelso.kaweahriverchannel,
-                    modelso.tuleriverchannel]
-      canal_turnout_list = ['OFK', 'MAD', 'CWY', 'OKW', 'OTL']
-      pump_list = [modelno.delta.TRP_pump, modelno.delta.HRO_pump, modelso.calaqueduct.daily_flow['OSW'],
-                   modelso.calaqueduct.daily_flow['WRM'], modelso.calaqueduct.daily_flow['SOC']]
-      pump_names = ['TRP_pump', 'HRO_pump', 'DOS_pump', 'BVA_pump', 'EDM_pump']
-      for x in northern_res_list:
-        temp_df = pd.DataFrame(index=modelno.index)
-        temp_df['%s_release' % x.key] = pd.Series(x.R, index=modelno.index)
-        release_df = pd.concat([release_df, temp_df], axis=1)
-      for x in southern_res_list:
-        temp_df = pd.DataFrame(index=modelno.index)
-        temp_df['%s_release' % x.key] = pd.Series(x.R, index=modelso.index)
-        release_df = pd.concat([release_df, temp_df], axis=1)
-      for x, y in zip(canal_list, canal_turnout_list):
-        temp_df = pd.DataFrame(index=modelno.index)
-        temp_df['%s_release' % x.key] = pd.Series(x.daily_flow[y], index=modelso.index)
-        release_df = pd.concat([release_df, temp_df], axis=1)
-      for x, y in zip(pump_list, pump_names):
-        temp_df = pd.DataFrame(index=modelno.index)
-        temp_df[y] = pd.Series(x, index=modelso.index)
-        release_df = pd.concat([release_df, temp_df], axis=1)
-      release_df.to_csv('cord/data/results/release_results_' + file_name)
-
-      # del modelno
-      # del modelso
-      # del release_df
-
-######################################################################################
-###Record Simulation Results
-######################################################################################
-
-if model_mode == 'validation' or model_mode == 'simulation':
-  district_output_list = [modelso.berrenda, modelso.belridge, modelso.buenavista, modelso.cawelo, modelso.henrymiller, modelso.ID4, modelso.kerndelta, modelso.losthills, modelso.rosedale, modelso.semitropic, modelso.tehachapi, modelso.tejon, modelso.westkern, modelso.wheeler, modelso.kcwa, modelso.arvin, modelso.delano, modelso.lowertule, modelso.porterville, modelso.socal, modelso.southbay, modelso.centralcoast, modelso.dudleyridge, modelso.tularelake, modelso.westlands, modelso.othercvp, modelso.othercrossvalley, modelso.otherswp]
-  district_results = modelso.results_as_df('daily', district_output_list)
-  district_results.to_csv('cord/data/results/district_results_' + model_mode + '.csv')
-  del district_results
-  
-  district_results = modelso.results_as_df_full('daily', district_output_list)
-  district_results.to_csv('cord/data/results/district_results_full_' + model_mode + '.csv')
-  del district_results
-  district_results_annual = modelso.results_as_df('annual', district_output_list)
-  district_results_annual.to_csv('cord/data/results/annual_district_results_' + model_mode + '.csv')
-  del district_results_annual
-
-  contract_results = modelso.results_as_df('daily', modelso.contract_list)
-  contract_results.to_csv('cord/data/results/contract_results_' + model_mode + '.csv')
-  contract_results_annual = modelso.results_as_df('annual', modelso.contract_list)
-  contract_results_annual.to_csv('cord/data/results/contract_results_annual_' + model_mode + '.csv')
-  del contract_results
-
-  northern_res_list = [modelno.shasta, modelno.folsom, modelno.oroville, modelno.yuba, modelno.newmelones,
-                     modelno.donpedro, modelno.exchequer, modelno.delta]
-  southern_res_list = [modelso.sanluisstate, modelso.sanluisfederal, modelso.millerton, modelso.isabella,
-                     modelso.kaweah, modelso.success]
-  reservoir_results_no = modelno.results_as_df('daily', northern_res_list)
-  reservoir_results_no.to_csv('cord/data/results/reservoir_results_no_' + model_mode + '.csv')
-  del reservoir_results_so  
-  
-  reservoir_results_so = modelso.results_as_df('daily', southern_res_list)
-  reservoir_results_so.to_csv('cord/data/results/reservoir_results_so_' + model_mode + '.csv')
-  del reservoir_results_so
-
-  canal_results = modelso.results_as_df('daily', modelso.canal_list)
-  canal_results.to_csv('cord/data/results/canal_results_' + model_mode + '.csv')
-  del canal_results
-
-  bank_results = modelso.bank_as_df('daily', modelso.waterbank_list)
-  bank_results.to_csv('cord/data/results/bank_results_' + model_mode + '.csv')
-  bank_results_annual = modelso.bank_as_df('annual', modelso.waterbank_list)
-  bank_results_annual.to_csv('cord/data/results/bank_results_annual_' + model_mode + '.csv')
-  del bank_results
+        new_inputs = Inputter(base_data_file, expected_release_datafile, model_mode)
+        # historical fits are saved in cord/data/cache (keyed on the historical file & fit version), and re-used by later runs
+        new_inputs.fit_stochastic_model('cord/data/cache/')
+      for file_name in file_names:
+        print('Starting ' + file_name)
+        if use_preprocessed_inputs:
+          input_data = file_folder + 'cord-data-' + file_name
+        else:
+          input_data = new_inputs.run_routine(file_folder, file_name, 'daily', 1, 150, 2, '1/1/1950', '12/31/2099', 1950, export_inputs)
 
-  leiu_results = modelso.bank_as_df('daily', modelso.leiu_list)
-  leiu_results.to_csv('cord/data/results/leiu_results_' + model_mode + '.csv')
-  leiu_results_annual = modelso.bank_as_df('annual', modelso.leiu_list)
-  leiu_results_annual.to_csv('cord/data/results/leiu_results_annual_' + model_mode + '.csv')
-  del leiu_results
-
-print ('completed in ', datetime.now() - startTime)
+        ######################################################################################
+        # Model Class Initialization & Simulation
+        ## There are two instances of the class 'Model', one for the Nothern System and one for the Southern System
+        ##
+        modelno, modelso = simulate_projection(input_data, expected_release_datafile, sd, model_mode, recording_spec, short_test, startTime, check_inputs)
+        release_df = find_release_results(modelno, modelso)
+        write_release_results(release_df, file_name, result_format)
 
 
+  ######################################################################################
+  ###Record Simulation Results
+  ######################################################################################
 
+  if model_mode == 'validation' or model_mode == 'simulation':
+    district_output_list = [modelso.berrenda, modelso.belridge, modelso.buenavista, modelso.cawelo, modelso.henrymiller, modelso.ID4, modelso.kerndelta, modelso.losthills, modelso.rosedale, modelso.semitropic, modelso.tehachapi, modelso.tejon, modelso.westkern, modelso.wheeler, modelso.kcwa, modelso.arvin, modelso.delano, modelso.lowertule, modelso.porterville, modelso.socal, modelso.southbay, modelso.centralcoast, modelso.dudleyridge, modelso.tularelake, modelso.westlands, modelso.othercvp, modelso.othercrossvalley, modelso.otherswp]
+    district_results = modelso.results_as_df('daily', district_output_list)
+    write_results(district_results, 'cord/data/results/district_results_' + model_mode, result_format, run_id)
+    del district_results
+  
+    district_results = modelso.results_as_df_full('daily', district_output_list)
+    write_results(district_results, 'cord/data/results/district_results_full_' + model_mode, result_format, run_id)
+    del district_results
+    district_results_annual = modelso.results_as_df('annual', district_output_list)
+    write_results(district_results_annual, 'cord/data/results/annual_district_results_' + model_mode, result_format, run_id)
+    del district_results_annual
+
+    contract_results = modelso.results_as_df('daily', modelso.contract_list)
+    write_results(contract_results, 'cord/data/results/contract_results_' + model_mode, result_format, run_id)
+    contract_results_annual = modelso.results_as_df('annual', modelso.contract_list)
+    write_results(contract_results_annual, 'cord/data/results/contract_results_annual_' + model_mode, result_format, run_id)
+    del contract_results
+
+    northern_res_list = [modelno.shasta, modelno.folsom, modelno.oroville, modelno.yuba, modelno.newmelones,
+                       modelno.donpedro, modelno.exchequer, modelno.delta]
+    southern_res_list = [modelso.sanluisstate, modelso.sanluisfederal, modelso.millerton, modelso.isabella,
+                       modelso.kaweah, modelso.success]
+    reservoir_results_no = modelno.results_as_df('daily', northern_res_list)
+    write_results(reservoir_results_no, 'cord/data/results/reservoir_results_no_' + model_mode, result_format, run_id)
+    del reservoir_results_no
+  
+    reservoir_results_so = modelso.results_as_df('daily', southern_res_list)
+    write_results(reservoir_results_so, 'cord/data/results/reservoir_results_so_' + model_mode, result_format, run_id)
+    del reservoir_results_so
+
+    canal_results = modelso.results_as_df('daily', modelso.canal_list)
+    write_results(canal_results, 'cord/data/results/canal_results_' + model_mode, result_format, run_id)
+    del canal_results
+
+    bank_results = modelso.bank_as_df('daily', modelso.waterbank_list)
+    write_results(bank_results, 'cord/data/results/bank_results_' + model_mode, result_format, run_id)
+    bank_results_annual = modelso.bank_as_df('annual', modelso.waterbank_list)
+    write_results(bank_results_annual, 'cord/data/results/bank_results_annual_' + model_mode, result_format, run_id)
+    del bank_results
+
+    leiu_results = modelso.bank_as_df('daily', modelso.leiu_list)
+    write_results(leiu_results, 'cord/data/results/leiu_results_' + model_mode, result_format, run_id)
+    leiu_results_annual = modelso.bank_as_df('annual', modelso.leiu_list)
+    write_results(leiu_results_annual, 'cord/data/results/leiu_results_annual_' + model_mode, result_format, run_id)
+    del leiu_results
+
+    ##timeseries recorded at coarser resolutions (end-of-month/end-of-water-year values)
+    for resolution, file_tag in zip(['monthly', 'annual'], ['monthly_', 'end_of_wy_']):
+      if recording_spec.uses_resolution(resolution):
+        write_results(modelso.results_as_df('daily', district_output_list, resolution), 'cord/data/results/district_results_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.results_as_df_full('daily', district_output_list, resolution), 'cord/data/results/district_results_full_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.results_as_df('daily', modelso.contract_list, resolution), 'cord/data/results/contract_results_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.results_as_df('daily', modelso.canal_list, resolution), 'cord/data/results/canal_results_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.bank_as_df('daily', modelso.waterbank_list, resolution), 'cord/data/results/bank_results_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.bank_as_df('daily', modelso.leiu_list, resolution), 'cord/data/results/leiu_results_' + file_tag + model_mode, result_format, run_id)
+
+    ##monthly & water-year summary tables (sum, min, max, end-of-period) of every recorded series
+    if recording_spec.summaries:
+      for resolution, file_tag in zip(['monthly', 'annual'], ['monthly_', 'wy_']):
+        write_results(modelso.summary_as_df(resolution, district_output_list), 'cord/data/results/district_summary_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.summary_as_df(resolution, modelso.contract_list), 'cord/data/results/contract_summary_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.summary_as_df(resolution, modelso.canal_list), 'cord/data/results/canal_summary_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.bank_summary_as_df(resolution, modelso.waterbank_list), 'cord/data/results/bank_summary_' + file_tag + model_mode, result_format, run_id)
+        write_results(modelso.bank_summary_as_df(resolution, modelso.leiu_list), 'cord/data/results/leiu_summary_' + file_tag + model_mode, result_format, run_id)
+
+  print ('completed in ', datetime.now() - startTime)
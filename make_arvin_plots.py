@@ -9,9 +9,9 @@ from cord import *
 ######################################################################################
 ###Plot Simulation Results
 ######################################################################################
-district_results = pd.read_csv('cord/data/annual_district_results_simulation.csv')
-contract_results = pd.read_csv('cord/data/contract_results_annual_simulation.csv')
-bank_results = pd.read_csv('cord/data/leiu_results_simulation.csv', index_col=0, parse_dates=True)
+district_results = read_results('cord/data/annual_district_results_simulation')
+contract_results = read_results('cord/data/contract_results_annual_simulation')
+bank_results = read_results('cord/data/leiu_results_simulation', index_col=0, parse_dates=True)
 bank_index = bank_results.index
 bank_T = len(bank_results)
 starting_year = int(bank_index.year[0])
@@ -22,11 +22,11 @@ if validation_plots:
        # waterbank_results_old = pd.read_csv('../../Documents/DataFilesNonGit/ORCA_master/validation_01292019/bank_results_validation.csv')
        # leiubank_results_old = pd.read_csv('../../Documents/DataFilesNonGit/ORCA_master/validation_01292019/leiu_results_validation.csv')
 
-       res_results_no_new = pd.read_csv('cord/data/results/reservoir_results_no_validation.csv', index_col=0, parse_dates=True)
-       res_results_so_new = pd.read_csv('cord/data/results/reservoir_results_so_validation.csv', index_col=0, parse_dates=True)
-       # district_results_new = pd.read_csv('cord/data/results/district_results_validation.csv')
-       # waterbank_results_new = pd.read_csv('cord/data/results/bank_results_validation.csv')
-       # leiubank_results_new = pd.read_csv('cord/data/results/leiu_results_validation.csv')
+       res_results_no_new = read_results('cord/data/results/reservoir_results_no_validation', index_col=0, parse_dates=True)
+       res_results_so_new = read_results('cord/data/results/reservoir_results_so_validation', index_col=0, parse_dates=True)
+       # district_results_new = read_results('cord/data/results/district_results_validation')
+       # waterbank_results_new = read_results('cord/data/results/bank_results_validation')
+       # leiubank_results_new = read_results('cord/data/results/leiu_results_validation')
 
 else:
        # res_results_no_old = pd.read_csv('../../Documents/DataFilesNonGit/ORCA_master/simulation/reservoir_results_no_simulation.csv', index_col=0, parse_dates=True)
@@ -35,15 +35,15 @@ else:
        # waterbank_results_old = pd.read_csv('../../Documents/DataFilesNonGit/ORCA_master/simulation/bank_results_simulation.csv')
        # leiubank_results_old = pd.read_csv('../../Documents/DataFilesNonGit/ORCA_master/simulation/leiu_results_simulation.csv')
 
-       res_results_no_old = pd.read_csv('cord/data/results/reservoir_results_no_simulation_validation.csv', index_col=0,
+       res_results_no_old = read_results('cord/data/results/reservoir_results_no_simulation_validation', index_col=0,
                                         parse_dates=True)
-       res_results_so_old = pd.read_csv('cord/data/results/reservoir_results_so_simulation_validation.csv', index_col=0,
+       res_results_so_old = read_results('cord/data/results/reservoir_results_so_simulation_validation', index_col=0,
                                         parse_dates=True)
-       res_results_no_new = pd.read_csv('cord/data/results/reservoir_results_no_simulation.csv', index_col=0, parse_dates=True)
-       res_results_so_new = pd.read_csv('cord/data/results/reservoir_results_so_simulation.csv', index_col=0, parse_dates=True)
-       # district_results_new = pd.read_csv('cord/data/results/district_results_simulation.csv')
-       # waterbank_results_new = pd.read_csv('cord/data/results/bank_results_simulation.csv')
-       # leiubank_results_new = pd.read_csv('cord/data/results/leiu_results_simulation.csv')
+       res_results_no_new = read_results('cord/data/results/reservoir_results_no_simulation', index_col=0, parse_dates=True)
+       res_results_so_new = read_results('cord/data/results/reservoir_results_so_simulation', index_col=0, parse_dates=True)
+       # district_results_new = read_results('cord/data/results/district_results_simulation')
+       # waterbank_results_new = read_results('cord/data/results/bank_results_simulation')
+       # leiubank_results_new = read_results('cord/data/results/leiu_results_simulation')
 
 # columns for results files ***make sure these match the corresponding columns in observations***
 columns = ['DEL_HRO_pump',
@@ -144,7 +144,7 @@ else:
                      plt.savefig('cord/figs/simulation_%s.png' % (name), dpi=150)
 
 #
-# # results = pd.read_csv('cord/data/reservoir_results_so.csv', index_col=0, parse_dates=True)
+# # results = read_results('cord/data/reservoir_results_so', index_col=0, parse_dates=True)
 # i = 0
 # obs = [observations['ISB_storage'],
 #        observations['SLF_storage'],
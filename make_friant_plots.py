@@ -8,8 +8,8 @@ from cord import *
 ######################################################################################
 ###Plot Simulation Results
 ######################################################################################
-district_results = pd.read_csv('cord/data/annual_district_results_simulation.csv')
-contract_results = pd.read_csv('cord/data/contract_results_annual_simulation.csv')
+district_results = read_results('cord/data/annual_district_results_simulation')
+contract_results = read_results('cord/data/contract_results_annual_simulation')
 
 modelplot = Model('cord/data/cord-data.csv', sd='10-01-1996')
 modelplot.initialize_water_districts()
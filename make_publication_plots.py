@@ -7,8 +7,8 @@ from cord import *
 ######################################################################################
 ###Plot Model Validation Results
 ######################################################################################
-northern_results = pd.read_csv('cord/data/results/reservoir_results_no_validation.csv', index_col=0, parse_dates=True)
-southern_results = pd.read_csv('cord/data/results/reservoir_results_so_validation.csv', index_col=0, parse_dates=True)
+northern_results = read_results('cord/data/results/reservoir_results_no_validation', index_col=0, parse_dates=True)
+southern_results = read_results('cord/data/results/reservoir_results_so_validation', index_col=0, parse_dates=True)
 observations = pd.read_csv('cord/data/input/cord-data.csv', index_col=0, parse_dates=True)
 
 ##############################
@@ -46,8 +46,8 @@ observed_unit = 1.0/1000000.0
 ######################################################################################
 ###Plot Simulation Results
 ######################################################################################
-district_results = pd.read_csv('cord/data/results/annual_district_results_simulation.csv')
-contract_results = pd.read_csv('cord/data/results/contract_results_annual_simulation.csv')
+district_results = read_results('cord/data/results/annual_district_results_simulation')
+contract_results = read_results('cord/data/results/contract_results_annual_simulation')
 
 ######################
 ###PUMPING PDF FIGURES
@@ -8,8 +8,8 @@ from cord import *
 ######################################################################################
 ###Plot Simulation Results
 ######################################################################################
-district_results = pd.read_csv('cord/data/results/annual_district_results_simulation.csv')
-contract_results = pd.read_csv('cord/data/results/contract_results_annual_simulation.csv')
+district_results = read_results('cord/data/results/annual_district_results_simulation')
+contract_results = read_results('cord/data/results/contract_results_annual_simulation')
 
 modelplot = Model('cord/data/input/cord-data.csv', 'cord/data/input/cord-data.csv', '10-01-1996', 'simulation')
 modelplot.initialize_water_districts()
@@ -0,0 +1,21 @@
+from cord import *
+
+######################################################################################
+###Preprocess GCM/RCP Projections
+######################################################################################
+# writes cord-data-*.csv model inputs for each full-natural flow projection in file_folder (see cord/preprocess.py)
+# projections w/ up-to-date inputs are skipped, so this only processes new or changed projection files
+# main.py (model_mode = 'forecast', use_preprocessed_inputs = True) then simulates each projection from these files
+
+file_folder = 'cord/data/CA_FNF_climate_change/'
+base_data_file = 'cord/data/input/cord-data.csv'
+expected_release_datafile = 'cord/data/input/cord-data.csv'
+model_name_list = ['canesm2', 'ccsm4', 'cnrm-cm5', 'csiro-mk3-6-0', 'gfdl-cm3', 'gfdl-esm2m', 'hadgem2-cc', 'hadgem2-es', 'inmcm4', 'ipsl-cm5a-mr', 'miroc5']
+proj_list = ['rcp45', 'rcp85']
+# worker processes for the stochastic generation (None - one for each cpu), & threads for reading projection files
+num_processes = None
+num_threads = 4
+
+if __name__ == '__main__':
+  file_names = [projection_file_name(model_name, projection) for model_name in model_name_list for projection in proj_list]
+  preprocess_projections(file_folder, file_names, base_data_file, expected_release_datafile, 'forecast', 'cord/data/cache/', num_processes = num_processes, num_threads = num_threads)